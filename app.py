@@ -1,38 +1,79 @@
-import pickle
+import os
+import time
 from pathlib import Path
 
 from flask_cors import CORS
-from flask import Flask, jsonify, render_template, request, send_file
+from flask import Flask, Response, g, jsonify, render_template, request, stream_with_context
 
-from src.history_db import clear_history, export_history_to_csv, fetch_history, init_db, save_history
-from src.hybrid_service import analyze_news
-from src.preprocess import ensure_nltk_resources
+from src import config
+from src.bulk import ORDERINGS, iter_records, stream_analyze, to_ndjson
+from src.history_db import (
+    approximate_count,
+    clear_history,
+    fetch_history_page,
+    iter_history,
+    parse_history_date,
+    save_history,
+    save_history_batch,
+)
+from src.history_export import (
+    EXPORT_FORMATS,
+    MIMETYPES,
+    export_chunks,
+    export_filename,
+    gzip_chunks,
+    parquet_available,
+)
+from src.hybrid_service import analyze_news_async, analyze_news_batch
+from src.metrics import EMBEDDING_SECONDS, REQUEST_SECONDS, REQUESTS_TOTAL, registry, render_metrics
+from src.portal_verifier import portal_health, rss_cache
+from src.result_cache import result_cache
+from src.similarity import embedding_registry
+from src.warmup import startup_state, warm_shared, warm_worker, worker_warmup_deferred
 
 
 app = Flask(__name__)
 CORS(app)
 ROOT = Path(__file__).resolve().parent
-MODEL_PATH = ROOT / "models" / "best_model.pkl"
 
-model_bundle = None
+# Startup runs at import: under gunicorn with preload_app this happens once in
+# the master and workers inherit the loaded state through fork; the per-worker
+# phase then runs from post_worker_init.
+model_bundle = warm_shared()
+if not worker_warmup_deferred():
+    warm_worker()
 
 
-def load_model():
-    if not MODEL_PATH.exists():
-        raise FileNotFoundError(
-            "Model file not found at models/best_model.pkl. Run `python -m src.train` first."
-        )
-    with open(MODEL_PATH, "rb") as f:
-        return pickle.load(f)
+def _process_gauges():
+    # Reported by whichever worker answers the scrape.
+    pid = os.getpid()
+    yield "fnd_worker_ready", "1 when the scraped worker finished warm-up.", {"pid": pid}, float(startup_state.ready)
+    yield "fnd_result_cache_entries", "Entries in the scraped worker's result cache.", {"pid": pid}, len(result_cache)
+    yield "fnd_rss_cache_entries", "Entries in the scraped worker's RSS cache.", {"pid": pid}, len(rss_cache)
+
+
+registry.add_collector(_process_gauges)
+embedding_registry.set_timing_hook(lambda op, _model, seconds: EMBEDDING_SECONDS.observe(seconds, op=op))
 
 
 @app.before_request
-def setup():
-    global model_bundle
-    if model_bundle is None:
-        ensure_nltk_resources()
-        model_bundle = load_model()
-        init_db()
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    start = g.get("request_start")
+    if start is not None:
+        # Route templates, not raw paths, keep label cardinality bounded.
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+        REQUESTS_TOTAL.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+
+def _model_unavailable():
+    return jsonify({"error": "Model is not loaded; see /ready."}), 503
 
 
 @app.route("/", methods=["GET"])
@@ -42,10 +83,42 @@ def home():
 
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok"})
+    # Always 200 while the process is alive; "degraded" means Google News is
+    # being bypassed by the circuit breaker and verdicts come from the model.
+    portal = portal_health()
+    status = "ok" if portal["breaker"]["state"] in {"closed", "disabled"} else "degraded"
+    return jsonify({"status": status, "upstream": {"google_news": portal}})
+
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    # Liveness stays on /health; this reports whether warm-up finished and how
+    # long each component took.
+    state = startup_state.as_dict()
+    return jsonify(state), 200 if state["ready"] else 503
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    # Prometheus text format, summed over every worker of this server.
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
 
+def _truthy(value) -> bool:
+    return str(value).strip().lower() in {"1", "true", "yes", "on"}
 
-def _handle_analysis_request():
+
+def _wants_explanation(payload: dict) -> bool:
+    # Full explanation mode computes every score even when the verdict is
+    # already decided by a cheaper stage.
+    return _truthy(payload.get("explain", request.args.get("explain", "")))
+
+
+def _wants_timings(payload: dict) -> bool:
+    return _truthy(payload.get("debug", request.args.get("debug", "")))
+
+
+async def _handle_analysis_request():
     payload = request.get_json(silent=True) or {}
     text = payload.get("text") or request.form.get("text", "")
     source_url = payload.get("source_url") or request.form.get("source_url", "")
@@ -54,26 +127,130 @@ def _handle_analysis_request():
 
     if not text:
         return jsonify({"error": "Please provide news text."}), 400
+    if model_bundle is None:
+        return _model_unavailable()
 
-    result = analyze_news(text=text, source_url=source_url, model_bundle=model_bundle)
+    analysis_start = time.perf_counter()
+    result = await analyze_news_async(
+        text=text,
+        source_url=source_url,
+        model_bundle=model_bundle,
+        full_explanation=_wants_explanation(payload),
+    )
+    history_start = time.perf_counter()
+    # With FND_HISTORY_WRITE_BEHIND (the default) this only queues the row.
     save_history(
         news_text=text,
         source_url=source_url,
         result=result.get("result", "Unverified"),
         method=result.get("verification_method", "Machine Learning"),
     )
+    if _wants_timings(payload):
+        done = time.perf_counter()
+        result["timings"] = {
+            "total_ms": round((done - g.get("request_start", analysis_start)) * 1000, 3),
+            "analysis_ms": round((history_start - analysis_start) * 1000, 3),
+            "history_submit_ms": round((done - history_start) * 1000, 3),
+            "stages_ms": {s["name"]: s["ms"] for s in result.get("stages", []) if s.get("ran")},
+        }
     return jsonify(result)
 
 
 @app.route("/analyze", methods=["POST"])
-def analyze():
-    return _handle_analysis_request()
+async def analyze():
+    return await _handle_analysis_request()
 
 
 @app.route("/predict", methods=["POST"])
-def predict():
+async def predict():
     # Alias endpoint for compatibility with earlier versions.
-    return _handle_analysis_request()
+    return await _handle_analysis_request()
+
+
+def _batch_items(payload: dict):
+    items = payload.get("items")
+    if items is None and isinstance(payload.get("texts"), list):
+        items = payload["texts"]
+    if not isinstance(items, list):
+        return None
+    normalized = []
+    for item in items:
+        if isinstance(item, str):
+            normalized.append({"text": item.strip(), "source_url": ""})
+        elif isinstance(item, dict):
+            normalized.append(
+                {
+                    "text": str(item.get("text") or "").strip(),
+                    "source_url": str(item.get("source_url") or "").strip(),
+                }
+            )
+        else:
+            normalized.append({"text": "", "source_url": ""})
+    return normalized
+
+
+@app.route("/analyze/batch", methods=["POST"])
+def analyze_batch():
+    payload = request.get_json(silent=True) or {}
+    items = _batch_items(payload)
+    if not items:
+        return jsonify({"error": "Please provide a non-empty list of items."}), 400
+    if len(items) > config.BATCH_MAX_ITEMS:
+        return jsonify({"error": f"A batch may contain at most {config.BATCH_MAX_ITEMS} items."}), 413
+    if model_bundle is None:
+        return _model_unavailable()
+
+    results = analyze_news_batch(items, model_bundle=model_bundle, full_explanation=_wants_explanation(payload))
+    save_history_batch(
+        [
+            (
+                item["text"],
+                item["source_url"],
+                result.get("result", "Unverified"),
+                result.get("verification_method", "Machine Learning"),
+            )
+            for item, result in zip(items, results)
+            if "error" not in result
+        ]
+    )
+    return jsonify({"results": results, "count": len(results)})
+
+
+@app.route("/analyze/stream", methods=["POST"])
+def analyze_stream():
+    # Body: NDJSON {text, source_url} records. Results stream back as NDJSON while
+    # the body is still being read.
+    ordering = request.args.get("order", "ordered")
+    if ordering not in ORDERINGS:
+        return jsonify({"error": f"order must be one of {', '.join(ORDERINGS)}."}), 400
+    record_history = request.args.get("history", "1") != "0"
+    if model_bundle is None:
+        return _model_unavailable()
+
+    results = stream_analyze(
+        iter_records(request.stream),
+        model_bundle,
+        ordering=ordering,
+        record_history=record_history,
+        full_explanation=_wants_explanation({}),
+    )
+    return Response(stream_with_context(to_ndjson(results)), mimetype="application/x-ndjson")
+
+
+def _history_filters():
+    # Shared by /history and /history/export. Raises ValueError on bad input.
+    result_filter = (request.args.get("result", "") or "").strip()
+    if result_filter not in {"", "Real", "Fake", "Unverified"}:
+        result_filter = ""
+    method = (request.args.get("method", "") or "").strip()[:100]
+    date_from = request.args.get("from", "").strip()
+    date_to = request.args.get("to", "").strip()
+    return {
+        "result_filter": result_filter or None,
+        "method": method or None,
+        "date_from": parse_history_date(date_from) if date_from else None,
+        "date_to": parse_history_date(date_to, end_of_day=True) if date_to else None,
+    }
 
 
 @app.route("/history", methods=["GET"])
@@ -86,13 +263,26 @@ def history():
         limit = max(1, min(100, int(request.args.get("limit", 10))))
     except ValueError:
         limit = 10
+    cursor = (request.args.get("cursor", "") or "").strip() or None
 
-    result_filter = (request.args.get("result", "") or "").strip()
-    if result_filter not in {"", "Real", "Fake", "Unverified"}:
-        result_filter = ""
-    offset = (page - 1) * limit
-    items = fetch_history(limit=limit, offset=offset, result_filter=result_filter or None)
-    return jsonify({"items": items, "page": page, "limit": limit, "result_filter": result_filter or None})
+    try:
+        filters = _history_filters()
+        data = fetch_history_page(limit=limit, cursor=cursor, offset=(page - 1) * limit, **filters)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(
+        {
+            "items": data["items"],
+            "page": page,
+            "limit": limit,
+            "next_cursor": data["next_cursor"],
+            "approx_total": approximate_count(**filters),
+            "result_filter": filters["result_filter"],
+            "method": filters["method"],
+            "from": filters["date_from"],
+            "to": filters["date_to"],
+        }
+    )
 
 
 @app.route("/history", methods=["DELETE"])
@@ -103,9 +293,27 @@ def history_clear():
 
 @app.route("/history/export", methods=["GET"])
 def history_export():
-    export_path = ROOT / "data" / "history_export.csv"
-    csv_file = export_history_to_csv(export_path)
-    return send_file(csv_file, as_attachment=True, download_name="history_export.csv", mimetype="text/csv")
+    # Streamed straight from keyset batches of the history table: no temp file,
+    # and memory stays flat whatever the table size.
+    fmt = (request.args.get("format", "csv") or "csv").strip().lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}."}), 400
+    if fmt == "parquet" and not parquet_available():
+        return jsonify({"error": "Parquet export requires pyarrow."}), 400
+    try:
+        filters = _history_filters()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    gzip = _truthy(request.args.get("gzip", ""))
+
+    chunks = export_chunks(iter_history(**filters), fmt)
+    if gzip:
+        chunks = gzip_chunks(chunks)
+    return Response(
+        stream_with_context(chunks),
+        mimetype="application/gzip" if gzip else MIMETYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(fmt, gzip)}"'},
+    )
 
 
 if __name__ == "__main__":
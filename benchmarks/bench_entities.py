@@ -0,0 +1,92 @@
+"""Latency and agreement of the entity extraction modes (off / fast / nltk).
+
+Run with ``python -m benchmarks.bench_entities [--rounds N] [--repeat K]``.
+``--repeat`` concatenates each sample K times to mimic full-length articles;
+the entity memo is cleared between rounds so every call does the work.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+from benchmarks.bench_preprocess import SAMPLE_PATH, _summary
+from src import preprocess
+
+
+def _time_mode(mode: str, texts: List[str], rounds: int) -> List[float]:
+    samples = []
+    for _ in range(rounds):
+        preprocess._entity_cache.clear()
+        for text in texts:
+            start = time.perf_counter()
+            preprocess.extract_entities(text, mode=mode)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _time_unbounded_nltk(texts: List[str], rounds: int) -> List[float]:
+    # The previous behaviour: the whole text tagged, nothing memoized.
+    samples = []
+    for _ in range(rounds):
+        for text in texts:
+            start = time.perf_counter()
+            preprocess._nltk_entities(" ".join(text.split()))
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _overlap(texts: List[str], mode: str, reference: str) -> float:
+    # Mean Jaccard overlap of the entity sets (case-insensitive) against the
+    # reference mode; texts where both modes find nothing count as agreement.
+    scores = []
+    for text in texts:
+        got = {e.lower() for e in preprocess.extract_entities(text, mode=mode)}
+        want = {e.lower() for e in preprocess.extract_entities(text, mode=reference)}
+        union = got | want
+        scores.append(len(got & want) / len(union) if union else 1.0)
+    return statistics.mean(scores) if scores else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    preprocess.ensure_nltk_resources()
+    texts = pd.read_csv(SAMPLE_PATH)["text"].astype(str).tolist()
+    texts = [" ".join([text] * max(1, args.repeat)) for text in texts]
+
+    # Warm the tagger, chunker and gazetteer before timing.
+    for mode in ("fast", "nltk"):
+        preprocess.extract_entities(texts[0], mode=mode)
+
+    results: Dict[str, List[float]] = {}
+    runners: Dict[str, Callable[[], List[float]]] = {
+        "nltk (unbounded)": lambda: _time_unbounded_nltk(texts, args.rounds),
+        "nltk (windowed)": lambda: _time_mode("nltk", texts, args.rounds),
+        "fast": lambda: _time_mode("fast", texts, args.rounds),
+        "off": lambda: _time_mode("off", texts, args.rounds),
+    }
+    for name, run in runners.items():
+        results[name] = run()
+
+    print(f"texts: {len(texts)}  rounds: {args.rounds}  window: {preprocess.config.ENTITY_WINDOW_CHARS} chars")
+    for name, samples in results.items():
+        print(f"{name:<17} {_summary(samples)}")
+    print(f"fast vs nltk entity overlap (Jaccard): {_overlap(texts, 'fast', 'nltk'):.2f}")
+
+    preprocess._entity_cache.clear()
+    preprocess.extract_entities(texts[0], mode="nltk")
+    start = time.perf_counter()
+    preprocess.extract_entities(texts[0], mode="nltk")
+    print(f"memoized repeat: {(time.perf_counter() - start) * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Concurrency benchmark for the history store: N writer and M reader processes.
+
+Run with ``python -m benchmarks.bench_history [--writers N] [--readers M] [--seconds S]``.
+Each process plays a gunicorn worker. Three variants share one workload:
+
+* ``legacy``       connection per call, rollback journal, one commit per row
+* ``wal``          WAL + persistent per-thread connections, synchronous inserts
+* ``write_behind`` WAL + queued inserts flushed in batched transactions
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.load_test import _percentile
+from src import config
+from src import history_db
+
+
+VARIANTS = ("legacy", "wal", "write_behind")
+
+
+def _legacy_connection(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _legacy_save(path: Path, text: str) -> None:
+    with _legacy_connection(path) as conn:
+        conn.execute(
+            "INSERT INTO verification_history (created_at, news_summary, source_url, result, method) VALUES (?, ?, ?, ?, ?)",
+            (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), text, None, "Fake", "Machine Learning"),
+        )
+        conn.commit()
+
+
+def _legacy_fetch(path: Path) -> None:
+    with _legacy_connection(path) as conn:
+        conn.execute(
+            "SELECT id, created_at, news_summary, source_url, result, method FROM verification_history "
+            "ORDER BY id DESC LIMIT 10 OFFSET 0"
+        ).fetchall()
+
+
+def _worker(variant: str, role: str, path: str, seconds: float, results) -> None:
+    db_path = Path(path)
+    history_db.DB_PATH = db_path
+    config.HISTORY_WRITE_BEHIND = variant == "write_behind"
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if role == "writer":
+                text = f"benchmark claim {n} from pid {mp.current_process().pid}"
+                if variant == "legacy":
+                    _legacy_save(db_path, text)
+                else:
+                    history_db.save_history(text, "", "Fake", "Machine Learning")
+            elif variant == "legacy":
+                _legacy_fetch(db_path)
+            else:
+                # Readers in other workers do not flush anyone else's queue.
+                history_db.get_connection().execute(
+                    "SELECT id, created_at, news_summary, source_url, result, method FROM verification_history "
+                    "ORDER BY id DESC LIMIT 10 OFFSET 0"
+                ).fetchall()
+        except sqlite3.OperationalError:
+            errors += 1
+        latencies.append((time.perf_counter() - start) * 1000)
+        n += 1
+    history_db.flush_history()
+    results.put({"role": role, "ops": n, "errors": errors, "latencies": latencies})
+
+
+def run_variant(variant: str, writers: int, readers: int, seconds: float) -> Dict[str, float]:
+    ctx = mp.get_context("fork")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "history.db"
+        history_db.DB_PATH = path
+        history_db.init_db()
+        history_db.close_connection()
+        if variant == "legacy":
+            with sqlite3.connect(path) as conn:
+                conn.execute("PRAGMA journal_mode=DELETE")
+
+        results = ctx.Queue()
+        procs = [ctx.Process(target=_worker, args=(variant, "writer", str(path), seconds, results)) for _ in range(writers)]
+        procs += [ctx.Process(target=_worker, args=(variant, "reader", str(path), seconds, results)) for _ in range(readers)]
+        for proc in procs:
+            proc.start()
+        reports = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+
+        with sqlite3.connect(path) as conn:
+            stored = conn.execute("SELECT COUNT(*) FROM verification_history").fetchone()[0]
+
+    summary: Dict[str, float] = {"rows_stored": stored}
+    for role in ("writer", "reader"):
+        role_reports = [r for r in reports if r["role"] == role]
+        latencies = [x for r in role_reports for x in r["latencies"]]
+        ops = sum(r["ops"] for r in role_reports)
+        summary[f"{role}_ops_per_s"] = ops / seconds
+        summary[f"{role}_errors"] = sum(r["errors"] for r in role_reports)
+        summary[f"{role}_p50_ms"] = _percentile(latencies, 50)
+        summary[f"{role}_p99_ms"] = _percentile(latencies, 99)
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    args = parser.parse_args()
+
+    print(f"writers={args.writers} readers={args.readers} seconds={args.seconds}")
+    for variant in args.variants:
+        s = run_variant(variant, args.writers, args.readers, args.seconds)
+        print(
+            f"{variant:<13} writes/s={s['writer_ops_per_s']:8.0f} (p50 {s['writer_p50_ms']:.2f}ms, "
+            f"p99 {s['writer_p99_ms']:.2f}ms, errors {s['writer_errors']:.0f})  "
+            f"reads/s={s['reader_ops_per_s']:8.0f} (p50 {s['reader_p50_ms']:.2f}ms, "
+            f"p99 {s['reader_p99_ms']:.2f}ms, errors {s['reader_errors']:.0f})  rows={s['rows_stored']:.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
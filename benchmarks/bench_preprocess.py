@@ -0,0 +1,106 @@
+"""Per-request preprocessing cost before and after the shared TextAnalyzer.
+
+Run with ``python -m benchmarks.bench_preprocess [--rounds N]``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, List
+
+import pandas as pd
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+
+from src.preprocess import analyze_text, clean_text, ensure_nltk_resources, get_analyzer, tokenize_and_lemmatize
+
+
+ROOT = Path(__file__).resolve().parents[1]
+SAMPLE_PATH = ROOT / "data" / "sample_fake_news.csv"
+
+_LEGACY_RESOURCES = [
+    "tokenizers/punkt",
+    "corpora/stopwords",
+    "corpora/wordnet",
+    "corpora/omw-1.4",
+    "taggers/averaged_perceptron_tagger",
+    "chunkers/maxent_ne_chunker",
+    "corpora/words",
+]
+
+
+def _legacy_preprocess(text: str) -> str:
+    # Mirrors the previous preprocess_text: resource lookups, stopword set and
+    # lemmatizer rebuilt on every call.
+    import nltk
+
+    for resource_path in _LEGACY_RESOURCES:
+        nltk.data.find(resource_path)
+    stop_words = set(stopwords.words("english"))
+    lemmatizer = WordNetLemmatizer()
+    return " ".join(tokenize_and_lemmatize(clean_text(text), stop_words, lemmatizer))
+
+
+def _legacy_keywords(text: str, top_k: int) -> List[str]:
+    tokens = _legacy_preprocess(text).split()
+    return [word for word, _ in Counter(tokens).most_common(top_k)]
+
+
+def legacy_request(text: str) -> None:
+    # analyze_news, extract_keywords and the portal query builder each
+    # preprocessed the text independently.
+    _legacy_preprocess(text)
+    _legacy_keywords(text, 8)
+    _legacy_keywords(text, 6)
+
+
+def shared_request(text: str) -> None:
+    analysis = analyze_text(text)
+    _ = analysis.processed
+    analysis.keywords(8)
+    analysis.keywords(6)
+
+
+def _time_per_request(fn: Callable[[str], None], texts: List[str], rounds: int) -> List[float]:
+    samples = []
+    for _ in range(rounds):
+        for text in texts:
+            start = time.perf_counter()
+            fn(text)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _summary(samples: List[float]) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"mean={statistics.mean(samples):.3f}ms p50={statistics.median(samples):.3f}ms p95={p95:.3f}ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    ensure_nltk_resources()
+    get_analyzer()
+    texts = pd.read_csv(SAMPLE_PATH)["text"].astype(str).tolist()
+
+    # Warm WordNet's lazy loader so both variants are measured hot.
+    legacy_request(texts[0])
+    shared_request(texts[0])
+
+    before = _time_per_request(legacy_request, texts, args.rounds)
+    after = _time_per_request(shared_request, texts, args.rounds)
+    print(f"requests per variant: {len(before)}")
+    print(f"before (3x preprocess_text): {_summary(before)}")
+    print(f"after  (1x TextAnalyzer):    {_summary(after)}")
+    print(f"speedup: {statistics.mean(before) / max(statistics.mean(after), 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
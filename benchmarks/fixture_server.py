@@ -0,0 +1,96 @@
+"""Local stand-in for the Google News RSS search endpoint.
+
+Serves a deterministic RSS feed for any ``?q=`` query, with an optional delay to
+model a slow upstream. Point the app at it with
+``FND_GOOGLE_NEWS_RSS_URL=http://127.0.0.1:<port>/rss/search``.
+
+Run with ``python -m benchmarks.fixture_server --port 8765 --delay 0.5``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+
+DOMAINS = ["bbc.com", "reuters.com", "thehindu.com", "ndtv.com"]
+
+
+def render_feed(query: str, items: int = 8) -> bytes:
+    terms = [t for t in query.replace("(", " ").replace(")", " ").split() if not t.startswith("site:") and t != "OR"]
+    digest = hashlib.sha1(query.encode("utf-8")).hexdigest()
+    entries = []
+    for i in range(items):
+        domain = DOMAINS[i % len(DOMAINS)]
+        # Rotate the query terms so candidates overlap the query to varying degrees.
+        words = terms[i % max(len(terms), 1):] + terms[: i % max(len(terms), 1)]
+        title = " ".join(words[: max(1, len(words) - i)]) or "official update"
+        entries.append(
+            "<item>"
+            f"<title>{escape(title)}</title>"
+            f"<link>https://www.{domain}/news/{digest[:12]}-{i}</link>"
+            f"<description>{escape(' '.join(words))} report</description>"
+            f'<source url="https://www.{domain}">{domain}</source>'
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>fixture</title>{''.join(entries)}</channel></rss>"
+    ).encode("utf-8")
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    items = 8
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+        if self.delay:
+            time.sleep(self.delay)
+        body = render_feed(query, self.items)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def start_fixture_server(port: int = 0, delay: float = 0.0, items: int = 8) -> ThreadingHTTPServer:
+    handler = type("ConfiguredFixtureHandler", (FixtureHandler,), {"delay": delay, "items": items})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fixture-rss", daemon=True).start()
+    return server
+
+
+def fixture_url(server: ThreadingHTTPServer) -> str:
+    return f"http://127.0.0.1:{server.server_port}/rss/search"
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before each response.")
+    parser.add_argument("--items", type=int, default=8)
+    args = parser.parse_args(argv)
+    server = start_fixture_server(args.port, args.delay, args.items)
+    print(f"Fixture RSS server on {fixture_url(server)} (delay={args.delay}s)", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
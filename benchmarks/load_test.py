@@ -0,0 +1,98 @@
+"""Concurrent load test for the /analyze endpoint.
+
+Start the fixture RSS server with a delay to model a slow Google News, start the
+app against it, then compare worker configurations, e.g.::
+
+    python -m benchmarks.fixture_server --delay 2 &
+    export FND_GOOGLE_NEWS_RSS_URL=http://127.0.0.1:8765/rss/search FND_RSS_CACHE_ENABLED=0
+    GUNICORN_WORKER_CLASS=sync GUNICORN_THREADS=1 gunicorn -c gunicorn.conf.py app:app &  # baseline
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --concurrency 32 --duration 30
+    gunicorn -c gunicorn.conf.py app:app &  # default gthread workers
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --concurrency 32 --duration 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+import requests
+
+
+ROOT = Path(__file__).resolve().parents[1]
+SAMPLE_PATH = ROOT / "data" / "sample_fake_news.csv"
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def run_load(url: str, texts: List[str], concurrency: int, duration: float, endpoint: str = "/analyze") -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker(offset: int) -> None:
+        session = requests.Session()
+        i = offset
+        while time.perf_counter() < stop_at:
+            # Vary the text so result/RSS caches do not hide upstream latency.
+            payload = {"text": f"{texts[i % len(texts)]} #{offset}-{i}", "source_url": ""}
+            start = time.perf_counter()
+            try:
+                response = session.post(url.rstrip("/") + endpoint, json=payload, timeout=120)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+            i += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / wall if wall else 0.0,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--endpoint", default="/analyze")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0)
+    args = parser.parse_args()
+
+    texts = pd.read_csv(SAMPLE_PATH)["text"].astype(str).tolist()
+    result = run_load(args.url, texts, args.concurrency, args.duration, args.endpoint)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
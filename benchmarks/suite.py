@@ -0,0 +1,512 @@
+"""Reproducible offline benchmark suite for the verification pipeline.
+
+Run with ``python -m benchmarks.suite [--quick] [--only SECTION ...]``.
+
+Everything runs against the fixture RSS server and a synthetic corpus built
+from ``data/sample_fake_news.csv``, with all state (model, history DB, article
+index, caches) in a temporary directory, so two runs on the same machine see
+the same workload. Sections:
+
+* ``train``      batch (``train_and_compare``) and streaming training time; always
+                 runs first because it produces the model the other sections serve
+* ``cold_start`` interpreter start + ``import app`` (warm-up) and the first /analyze
+* ``analyze``    end-to-end and per-stage latency of ``analyze_news`` (p50/p95/p99)
+* ``http``       /analyze throughput of gunicorn under concurrent load
+* ``history``    /history query latency against a database of ``--history-rows`` rows
+
+Results are written as JSON (``--out``) and compared with a stored baseline
+(``--baseline``); the exit status is 1 when a metric regressed by more than
+``--tolerance``. Record a baseline on the reference machine with ``--save-baseline``,
+or compare two existing result files with ``--compare RESULTS``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pickle
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import requests
+
+from benchmarks.fixture_server import fixture_url, start_fixture_server
+from benchmarks.load_test import _percentile, run_load
+
+# src modules read their configuration from the environment at import time,
+# so they are imported inside the sections, after _configure_env has pointed
+# every path at the temporary directory.
+
+ROOT = Path(__file__).resolve().parents[1]
+SAMPLE_PATH = ROOT / "data" / "sample_fake_news.csv"
+RESULTS_PATH = ROOT / "benchmarks" / "results" / "latest.json"
+BASELINE_PATH = ROOT / "benchmarks" / "baseline.json"
+
+SECTIONS = ("train", "cold_start", "analyze", "http", "history")
+
+# Regressions smaller than these absolute deltas are treated as noise.
+NOISE_FLOORS = {"_ms": 1.0, "_s": 0.05, "_errors": 0.0}
+
+_FILLER = [
+    "officials said on Monday",
+    "according to a statement",
+    "sources familiar with the matter said",
+    "the report added",
+    "in a press briefing",
+    "reports claimed",
+    "analysts noted",
+    "the ministry confirmed",
+]
+
+_COLD_START_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+client = app.app.test_client()
+t = time.perf_counter()
+response = client.post("/analyze", json={"text": sys.argv[1]})
+first = time.perf_counter() - t
+state = app.startup_state.as_dict()
+print("BENCH_RESULT " + json.dumps({
+    "import_s": imported,
+    "first_request_ms": first * 1000,
+    "status": response.status_code,
+    "components": {name: c["seconds"] for name, c in state["components"].items()},
+}))
+"""
+
+
+def synthetic_corpus(n: int, seed: int) -> pd.DataFrame:
+    # Each document stitches 2-4 sample sentences of one class together with
+    # filler clauses and a unique reference number, so texts are distinct but
+    # keep the sample's vocabulary and label signal.
+    sample = pd.read_csv(SAMPLE_PATH)
+    by_label: Dict[str, List[str]] = {}
+    for text, label in zip(sample["text"].astype(str), sample["label"].astype(str).str.upper()):
+        by_label.setdefault(label, []).append(text)
+    labels = sorted(by_label)
+    rng = random.Random(seed)
+    texts, out_labels = [], []
+    for i in range(n):
+        label = labels[i % len(labels)]
+        parts = rng.sample(by_label[label], k=min(len(by_label[label]), rng.randint(2, 4)))
+        clauses = [f"{part} {rng.choice(_FILLER).capitalize()}." for part in parts]
+        texts.append(" ".join(clauses) + f" Reference {seed}-{i}.")
+        out_labels.append(label)
+    return pd.DataFrame({"text": texts, "label": out_labels})
+
+
+def _configure_env(tmp: Path, rss_url: str) -> Dict[str, str]:
+    env = {
+        "FND_GOOGLE_NEWS_RSS_URL": rss_url,
+        "FND_MODEL_PATH": str(tmp / "best_model.pkl"),
+        "FND_MODEL_FORMAT": "pickle",
+        "FND_COMPACT_MODEL_DIR": str(tmp / "best_model"),
+        "FND_HISTORY_DB_PATH": str(tmp / "history.db"),
+        "FND_ARTICLE_INDEX_PATH": str(tmp / "official_articles.db"),
+        "FND_TFIDF_SPACE_PATH": str(tmp / "portal_tfidf.pkl"),
+        "FND_EMBEDDING_INDEX_DIR": str(tmp / "embedding_index"),
+        "FND_PREPROCESS_CACHE_DIR": str(tmp / "preprocess_cache"),
+        "FND_REPUTATION_INDEX_PATH": str(tmp / "domain_reputation.idx"),
+        "FND_METRICS_DIR": str(tmp / "metrics"),
+        "FND_RSS_CACHE_PATH": "",
+        # Caches would turn repeated workload items into hits and hide the
+        # pipeline; the ingester and embedding warm-up add background noise.
+        "FND_RSS_CACHE_ENABLED": "0",
+        "FND_RESULT_CACHE_ENABLED": "0",
+        "FND_INGEST_ENABLED": "0",
+        "FND_WARM_EMBEDDING_MODEL": "0",
+    }
+    os.environ.update(env)
+    return env
+
+
+def _latency_summary(prefix: str, seconds: Sequence[float]) -> Dict[str, float]:
+    return {
+        f"{prefix}.p50_ms": _percentile(list(seconds), 50) * 1000,
+        f"{prefix}.p95_ms": _percentile(list(seconds), 95) * 1000,
+        f"{prefix}.p99_ms": _percentile(list(seconds), 99) * 1000,
+    }
+
+
+def _timed(fn: Callable[[], object]) -> Tuple[float, object]:
+    start = time.perf_counter()
+    value = fn()
+    return time.perf_counter() - start, value
+
+
+# --- sections -------------------------------------------------------------------
+
+
+def bench_train(args: argparse.Namespace, tmp: Path) -> Dict[str, float]:
+    from src import train
+
+    train.FIGURES_DIR = tmp / "figures"
+    train.FIGURES_DIR.mkdir(parents=True, exist_ok=True)
+    corpus = synthetic_corpus(args.train_docs, args.seed)
+    df = corpus.assign(label=corpus["label"].map(train.LABEL_MAP))
+
+    batch_s, (_, bundle) = _timed(lambda: train.train_and_compare(df, use_cache=False, workers=args.train_workers))
+    with open(os.environ["FND_MODEL_PATH"], "wb") as f:
+        pickle.dump(bundle, f)
+
+    csv_path = tmp / "train_stream.csv"
+    corpus.to_csv(csv_path, index=False)
+    stream_s, _ = _timed(lambda: train.train_streaming(paths=[csv_path], workers=args.train_workers))
+    return {
+        "train.docs": float(len(df)),
+        "train.batch_s": batch_s,
+        "train.stream_s": stream_s,
+    }
+
+
+def bench_cold_start(args: argparse.Namespace, tmp: Path) -> Dict[str, float]:
+    text = synthetic_corpus(1, args.seed + 1)["text"][0]
+    runs: List[Dict[str, object]] = []
+    walls: List[float] = []
+    for _ in range(args.cold_runs):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", _COLD_START_CHILD, text],
+            cwd=ROOT,
+            env=os.environ.copy(),
+            capture_output=True,
+            text=True,
+            timeout=600,
+        )
+        walls.append(time.perf_counter() - start)
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("BENCH_RESULT ")]
+        if proc.returncode != 0 or not lines:
+            raise RuntimeError(f"cold-start child failed:\n{proc.stderr[-2000:]}")
+        runs.append(json.loads(lines[-1][len("BENCH_RESULT "):]))
+
+    # Medians: the first run also pays for the OS page cache.
+    results = {
+        "cold_start.process_s": _percentile(walls, 50),
+        "cold_start.import_s": _percentile([r["import_s"] for r in runs], 50),
+        "cold_start.first_request_ms": _percentile([r["first_request_ms"] for r in runs], 50),
+    }
+    for name in runs[0]["components"]:
+        results[f"cold_start.{name}_s"] = _percentile([r["components"].get(name, 0.0) for r in runs], 50)
+    return results
+
+
+def bench_analyze(args: argparse.Namespace, tmp: Path) -> Dict[str, float]:
+    from src.hybrid_service import analyze_news
+    from src.model_loader import load_model
+
+    bundle = load_model()
+    texts = synthetic_corpus(args.analyze_requests + args.warmup, args.seed + 2)["text"].tolist()
+    for text in texts[: args.warmup]:
+        analyze_news(text, "", bundle, use_cache=False)
+
+    totals: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    for text in texts[args.warmup:]:
+        elapsed, result = _timed(lambda: analyze_news(text, "", bundle, use_cache=False))
+        totals.append(elapsed)
+        for stage in result.get("stages", []):
+            if stage.get("ran"):
+                stages.setdefault(str(stage["name"]), []).append(float(stage["ms"]) / 1000)
+
+    results = {"analyze.requests": float(len(totals))}
+    results.update(_latency_summary("analyze.e2e", totals))
+    for name, samples in sorted(stages.items()):
+        results.update(_latency_summary(f"analyze.stage.{name}", samples))
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if requests.get(url + "/ready", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"server at {url} did not become ready within {timeout:.0f}s")
+
+
+def bench_http(args: argparse.Namespace, tmp: Path) -> Dict[str, float]:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = os.environ.copy()
+    env.update({"GUNICORN_BIND": f"127.0.0.1:{port}", "GUNICORN_WORKERS": str(args.http_workers)})
+    log = open(tmp / "gunicorn.log", "w")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=ROOT,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    try:
+        _wait_ready(url, timeout=120)
+        texts = synthetic_corpus(500, args.seed + 3)["text"].tolist()
+        load = run_load(url, texts, args.http_concurrency, args.http_duration)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        log.close()
+    return {
+        "http.requests": float(load["requests"]),
+        "http.errors": float(load["errors"]),
+        "http.analyze_rps": load["rps"],
+        "http.p50_ms": load["p50_ms"],
+        "http.p95_ms": load["p95_ms"],
+        "http.p99_ms": load["p99_ms"],
+    }
+
+
+def _fill_history(path: Path, rows: int, seed: int) -> Tuple[str, str]:
+    # One year of synthetic history with ascending created_at, inserted in a
+    # single transaction (the per-day counts trigger still runs per row).
+    # Returns the first and last day.
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    step = timedelta(days=365) / rows
+    results = ("Real", "Fake", "Unverified")
+    methods = ("Official Source Comparison", "Machine Learning")
+    conn = sqlite3.connect(path)
+
+    def generate():
+        for i in range(rows):
+            created = (start + step * i).strftime("%Y-%m-%d %H:%M:%S")
+            yield created, f"benchmark claim {i}", None, rng.choice(results), rng.choice(methods)
+
+    with conn:
+        conn.executemany(
+            "INSERT INTO verification_history (created_at, news_summary, source_url, result, method) "
+            "VALUES (?, ?, ?, ?, ?)",
+            generate(),
+        )
+    conn.close()
+    return start.strftime("%Y-%m-%d"), (start + step * (rows - 1)).strftime("%Y-%m-%d")
+
+
+def bench_history(args: argparse.Namespace, tmp: Path) -> Dict[str, float]:
+    from src import history_db
+
+    history_db.close_connection()
+    history_db.DB_PATH = tmp / "history_bench.db"
+    history_db.init_db()
+    fill_s, _ = _timed(lambda: _fill_history(history_db.DB_PATH, args.history_rows, args.seed))
+
+    middle = args.history_rows // 2
+    week_from = (datetime(2025, 1, 1) + timedelta(days=180)).strftime("%Y-%m-%d")
+    week_to = (datetime(2025, 1, 1) + timedelta(days=186)).strftime("%Y-%m-%d")
+    cursor = history_db.encode_cursor(middle)
+    queries: Dict[str, Callable[[], object]] = {
+        "newest_page": lambda: history_db.fetch_history_page(limit=50),
+        "deep_cursor_page": lambda: history_db.fetch_history_page(limit=50, cursor=cursor),
+        "deep_offset_page": lambda: history_db.fetch_history_page(limit=50, offset=middle),
+        "result_filter_page": lambda: history_db.fetch_history_page(limit=50, cursor=cursor, result_filter="Fake"),
+        "date_range_page": lambda: history_db.fetch_history_page(limit=50, date_from=week_from, date_to=week_to),
+        "approximate_count": lambda: history_db.approximate_count(
+            result_filter="Fake", date_from=week_from, date_to=week_to
+        ),
+    }
+    results = {"history.rows": float(args.history_rows), "history.fill_s": fill_s}
+    for name, query in queries.items():
+        query()
+        samples = [_timed(query)[0] for _ in range(args.history_repeats)]
+        results.update(_latency_summary(f"history.{name}", samples))
+    history_db.close_connection()
+    return results
+
+
+SECTION_RUNNERS: Dict[str, Callable[[argparse.Namespace, Path], Dict[str, float]]] = {
+    "train": bench_train,
+    "cold_start": bench_cold_start,
+    "analyze": bench_analyze,
+    "http": bench_http,
+    "history": bench_history,
+}
+
+
+# --- results and baseline comparison ----------------------------------------------
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _meta(args: argparse.Namespace, sections: Sequence[str]) -> Dict[str, object]:
+    params = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in {"out", "baseline", "save_baseline", "compare", "tolerance", "only", "quick"}
+    }
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "sections": list(sections),
+        "params": params,
+    }
+
+
+def _direction(name: str) -> Optional[str]:
+    if name.endswith("_rps"):
+        return "higher"
+    if name.endswith(("_ms", "_s", "errors")):
+        return "lower"
+    return None  # sizes and counts are informational
+
+
+def _noise_floor(name: str) -> float:
+    for suffix, floor in NOISE_FLOORS.items():
+        if name.endswith(suffix):
+            return floor
+    return 0.0
+
+
+def compare_results(
+    current: Dict[str, object], baseline: Dict[str, object], tolerance: float
+) -> Tuple[List[Dict[str, object]], int]:
+    rows: List[Dict[str, object]] = []
+    regressions = 0
+    base_values: Dict[str, float] = baseline.get("results", {})
+    for name, value in sorted(current.get("results", {}).items()):
+        if name not in base_values:
+            continue
+        base = base_values[name]
+        change = (value - base) / base if base else (0.0 if value == base else float("inf"))
+        direction = _direction(name)
+        worse = value - base if direction == "lower" else base - value
+        status = "ok"
+        if direction is None:
+            status = "info"
+        elif worse > _noise_floor(name) and worse > tolerance * abs(base):
+            status = "REGRESSION"
+            regressions += 1
+        elif -worse > tolerance * abs(base) and -worse > _noise_floor(name):
+            status = "improved"
+        rows.append({"metric": name, "baseline": base, "current": value, "change": change, "status": status})
+    return rows, regressions
+
+
+def print_comparison(current: Dict[str, object], baseline: Dict[str, object], tolerance: float) -> int:
+    if current["meta"].get("params") != baseline["meta"].get("params"):
+        print("warning: baseline was recorded with different parameters; comparison is indicative only")
+    if current["meta"].get("cpu_count") != baseline["meta"].get("cpu_count"):
+        print("warning: baseline was recorded on a machine with a different CPU count")
+    rows, regressions = compare_results(current, baseline, tolerance)
+    print(f"\n{'metric':<48} {'baseline':>12} {'current':>12} {'change':>9}  status")
+    for row in rows:
+        print(
+            f"{row['metric']:<48} {row['baseline']:>12.3f} {row['current']:>12.3f} "
+            f"{row['change'] * 100:>8.1f}%  {row['status']}"
+        )
+    print(f"\n{regressions} regression(s) beyond {tolerance:.0%} (baseline {baseline['meta'].get('git_commit')})")
+    return regressions
+
+
+def _load_json(path: Path) -> Dict[str, object]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path: Path, payload: Dict[str, object]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=SECTIONS, help="Run only these sections (train always runs).")
+    parser.add_argument("--quick", action="store_true", help="Smaller workload for a fast smoke run.")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--train-docs", type=int, default=20000)
+    parser.add_argument("--train-workers", type=int, default=1)
+    parser.add_argument("--cold-runs", type=int, default=3)
+    parser.add_argument("--analyze-requests", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--http-workers", type=int, default=2)
+    parser.add_argument("--http-concurrency", type=int, default=16)
+    parser.add_argument("--http-duration", type=float, default=15.0)
+    parser.add_argument("--history-rows", type=int, default=1_000_000)
+    parser.add_argument("--history-repeats", type=int, default=30)
+    parser.add_argument("--rss-delay", type=float, default=0.0, help="Fixture RSS response delay in seconds.")
+    parser.add_argument("--out", type=Path, default=RESULTS_PATH)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Also store these results as the baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown per metric.")
+    parser.add_argument("--compare", type=Path, help="Compare an existing results file with the baseline and exit.")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.train_docs = min(args.train_docs, 3000)
+        args.cold_runs = min(args.cold_runs, 1)
+        args.analyze_requests = min(args.analyze_requests, 50)
+        args.http_duration = min(args.http_duration, 5.0)
+        args.history_rows = min(args.history_rows, 100_000)
+        args.history_repeats = min(args.history_repeats, 10)
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.compare:
+        if not args.baseline.exists():
+            sys.exit(f"No baseline at {args.baseline}")
+        sys.exit(1 if print_comparison(_load_json(args.compare), _load_json(args.baseline), args.tolerance) else 0)
+
+    sections = ["train"] + [s for s in SECTIONS[1:] if not args.only or s in args.only]
+    results: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory(prefix="fnd-bench-") as tmp_dir:
+        tmp = Path(tmp_dir)
+        server = start_fixture_server(delay=args.rss_delay)
+        _configure_env(tmp, fixture_url(server))
+        try:
+            for section in sections:
+                print(f"[{section}] running...", flush=True)
+                elapsed, section_results = _timed(lambda: SECTION_RUNNERS[section](args, tmp))
+                results.update(section_results)
+                print(f"[{section}] done in {elapsed:.1f}s", flush=True)
+        finally:
+            server.shutdown()
+
+    payload = {"meta": _meta(args, sections), "results": results}
+    _write_json(args.out, payload)
+    print(f"Results written to {args.out}")
+    for name, value in sorted(results.items()):
+        print(f"  {name:<48} {value:.3f}")
+
+    if args.save_baseline:
+        _write_json(args.baseline, payload)
+        print(f"Baseline stored at {args.baseline}")
+    elif args.baseline.exists():
+        sys.exit(1 if print_comparison(payload, _load_json(args.baseline), args.tolerance) else 0)
+    else:
+        print(f"No baseline at {args.baseline}; record one with --save-baseline.")
+
+
+if __name__ == "__main__":
+    main()
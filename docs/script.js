@@ -17,6 +17,8 @@ const exportCsvLink = document.getElementById("exportCsvLink");
 exportCsvLink.href = apiUrl("/history/export");
 
 let currentPage = 1;
+// pageCursors[n - 1] is the keyset cursor that loads page n.
+let pageCursors = [null];
 const pageSize = 10;
 let currentFilter = "";
 
@@ -61,7 +63,9 @@ function renderHistory(items) {
 }
 
 async function loadHistory(page = 1) {
+  if (page === 1) pageCursors = [null];
   const params = new URLSearchParams({ page: String(page), limit: String(pageSize) });
+  if (pageCursors[page - 1]) params.set("cursor", pageCursors[page - 1]);
   if (currentFilter) params.set("result", currentFilter);
   const response = await fetch(apiUrl(`/history?${params.toString()}`));
   const data = await response.json();
@@ -69,7 +73,8 @@ async function loadHistory(page = 1) {
   currentPage = data.page || page;
   pageInfo.textContent = `Page ${currentPage}`;
   prevPageBtn.disabled = currentPage <= 1;
-  nextPageBtn.disabled = !(data.items && data.items.length === pageSize);
+  pageCursors[currentPage] = data.next_cursor || null;
+  nextPageBtn.disabled = !data.next_cursor;
 }
 
 checkBtn.addEventListener("click", async () => {
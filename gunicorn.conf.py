@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+import tempfile
+
+# Per-master runtime dir. Workers write metric snapshots there and /metrics
+# sums them, so a scrape reports the whole server rather than the one worker
+# that answered it; the Google News circuit breaker state is a shared file
+# there too, so one worker's failures open the breaker for all of them.
+_RUNTIME_DIR = tempfile.mkdtemp(prefix="fnd-")
+os.environ.setdefault("FND_METRICS_DIR", os.path.join(_RUNTIME_DIR, "metrics"))
+os.environ.setdefault("FND_PORTAL_BREAKER_STATE_PATH", os.path.join(_RUNTIME_DIR, "portal_breaker"))
+
+# Imported under another name: `config` is itself a gunicorn setting.
+from src import config as fnd_config
+
+
+# gthread workers serve several requests per process, so a slow Google News
+# fetch ties up one thread instead of the whole worker. /analyze additionally
+# overlaps portal I/O with CPU work inside each request (see analyze_news_async).
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("GUNICORN_WORKERS", min(4, multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+# Load the app (NLTK corpora, model, DB schema) once in the master; workers
+# share those pages copy-on-write and start serving immediately.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() in {"1", "true", "yes", "on"}
+
+# app.py runs only the fork-safe warm-up phase at import; the per-worker phase
+# runs in post_worker_init below.
+os.environ["FND_DEFER_WORKER_WARMUP"] = "1"
+
+
+def on_starting(server):
+    from src.metrics import clear_metrics_dir
+
+    clear_metrics_dir()
+
+
+def post_fork(server, worker):
+    from src.executors import reset_after_fork
+
+    reset_after_fork()
+
+
+def post_worker_init(worker):
+    # Per-worker warm-up (embedding model, ingester) before the worker accepts
+    # traffic, so the first /analyze request does not pay for it.
+    from src.warmup import startup_state, warm_worker
+
+    warm_worker()
+    report = startup_state.as_dict()
+    timings = ", ".join(f"{name} {status['seconds']:.2f}s" for name, status in report["components"].items())
+    worker.log.info("Warm-up finished (%s)", timings)
+    for name, status in report["components"].items():
+        if not status["ok"]:
+            worker.log.warning("Warm-up %s failed: %s", name, status.get("error"))
+    if not report["ready"]:
+        worker.log.warning("Worker %s is not ready; see /ready", report["pid"])
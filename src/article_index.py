@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from src import config
+from src.portal_verifier import OfficialArticle
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _default_path() -> Path:
+    path = Path(config.ARTICLE_INDEX_PATH)
+    return path if path.is_absolute() else ROOT / path
+
+
+class ArticleIndex:
+    # SQLite FTS5 store of official articles. Articles live in a plain table keyed
+    # by link; an external-content FTS table over title/summary is kept in sync
+    # by triggers and ranked with bm25.
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = Path(path) if path else _default_path()
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._create_schema(conn)
+                    self._initialized = True
+        return conn
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection) -> None:
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS official_articles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                link TEXT NOT NULL UNIQUE,
+                title TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                source_domain TEXT,
+                fetched_at TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS official_articles_fts USING fts5(
+                title, summary,
+                content='official_articles', content_rowid='id',
+                tokenize='porter unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS official_articles_ai AFTER INSERT ON official_articles BEGIN
+                INSERT INTO official_articles_fts(rowid, title, summary)
+                VALUES (new.id, new.title, new.summary);
+            END;
+            CREATE TRIGGER IF NOT EXISTS official_articles_ad AFTER DELETE ON official_articles BEGIN
+                INSERT INTO official_articles_fts(official_articles_fts, rowid, title, summary)
+                VALUES ('delete', old.id, old.title, old.summary);
+            END;
+            """
+        )
+        conn.commit()
+
+    def add_articles(self, articles: Iterable[OfficialArticle]) -> int:
+        fetched_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [
+            (a.link, a.title, a.summary, a.source_domain or None, fetched_at)
+            for a in articles
+            if a.link and (a.title or a.summary)
+        ]
+        if not rows:
+            return 0
+        conn = self._connection()
+        with conn:
+            cursor = conn.executemany(
+                """
+                INSERT OR IGNORE INTO official_articles (link, title, summary, source_domain, fetched_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+        return max(cursor.rowcount, 0)
+
+    def search(self, terms: Sequence[str], k: int = 12) -> List[OfficialArticle]:
+        # Terms come from TextAnalysis and are plain lowercase words; quote them
+        # anyway so FTS5 never parses them as operators.
+        safe_terms = [t.replace('"', "") for t in terms if t and t.strip()]
+        if not safe_terms:
+            return []
+        match = " OR ".join(f'"{t}"' for t in safe_terms)
+        try:
+            rows = self._connection().execute(
+                """
+                SELECT a.title, a.summary, a.link, a.source_domain
+                FROM official_articles_fts f
+                JOIN official_articles a ON a.id = f.rowid
+                WHERE official_articles_fts MATCH ?
+                ORDER BY bm25(official_articles_fts)
+                LIMIT ?
+                """,
+                (match, k),
+            ).fetchall()
+        except sqlite3.Error:
+            return []
+        return [self._to_article(row) for row in rows]
+
+    @staticmethod
+    def _to_article(row: sqlite3.Row) -> OfficialArticle:
+        return OfficialArticle(
+            title=row["title"],
+            summary=row["summary"],
+            link=row["link"],
+            source_domain=row["source_domain"] or "",
+        )
+
+    def get_by_links(self, links: Sequence[str]) -> List[OfficialArticle]:
+        if not links:
+            return []
+        placeholders = ", ".join("?" for _ in links)
+        rows = self._connection().execute(
+            f"SELECT title, summary, link, source_domain FROM official_articles WHERE link IN ({placeholders})",
+            list(links),
+        ).fetchall()
+        by_link = {row["link"]: self._to_article(row) for row in rows}
+        return [by_link[link] for link in links if link in by_link]
+
+    def iter_articles(self, batch_size: int = 1000) -> Iterator[List[OfficialArticle]]:
+        last_id = 0
+        while True:
+            rows = self._connection().execute(
+                """
+                SELECT id, title, summary, link, source_domain FROM official_articles
+                WHERE id > ? ORDER BY id LIMIT ?
+                """,
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1]["id"]
+            yield [self._to_article(row) for row in rows]
+
+    def count(self) -> int:
+        return int(self._connection().execute("SELECT COUNT(*) FROM official_articles").fetchone()[0])
+
+    def prune(self, max_rows: int) -> int:
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                """
+                DELETE FROM official_articles
+                WHERE id <= (SELECT id FROM official_articles ORDER BY id DESC LIMIT 1 OFFSET ?)
+                """,
+                (max_rows,),
+            )
+        return cursor.rowcount
+
+
+_INDEX: Optional[ArticleIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_article_index() -> ArticleIndex:
+    global _INDEX
+    if _INDEX is None:
+        with _INDEX_LOCK:
+            if _INDEX is None:
+                _INDEX = ArticleIndex()
+    return _INDEX
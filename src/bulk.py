@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Iterable, Iterator, Optional, Set
+
+from src import config
+from src.history_db import init_db, save_history
+from src.hybrid_service import analyze_news
+from src.model_loader import load_model
+
+
+ORDERINGS = ("ordered", "completion")
+
+
+def parse_record(line_no: int, line: str) -> Dict[str, object]:
+    try:
+        payload = json.loads(line)
+    except json.JSONDecodeError as exc:
+        return {"line": line_no, "error": f"Invalid JSON: {exc.msg}"}
+    if not isinstance(payload, dict):
+        return {"line": line_no, "error": "Each line must be a JSON object."}
+    # `text`/`source_url` is the native shape; `body`/`request_id` lets backlog
+    # style records (e.g. requests.jsonl) be fed in unchanged.
+    text = str(payload.get("text") or payload.get("body") or "").strip()
+    record = {
+        "line": line_no,
+        "id": payload.get("id", payload.get("request_id")),
+        "text": text,
+        "source_url": str(payload.get("source_url") or "").strip(),
+    }
+    if not text:
+        record["error"] = "Please provide news text."
+    return record
+
+
+def iter_records(lines: Iterable) -> Iterator[Dict[str, object]]:
+    for line_no, raw in enumerate(lines, start=1):
+        line = raw.decode("utf-8", errors="replace") if isinstance(raw, bytes) else raw
+        if line.strip():
+            yield parse_record(line_no, line)
+
+
+def _analyze_record(
+    record: Dict[str, object],
+    model_bundle: Dict[str, object],
+    record_history: bool,
+    full_explanation: bool = False,
+) -> Dict[str, object]:
+    output = {"line": record["line"], "id": record.get("id")}
+    if "error" in record:
+        output["error"] = record["error"]
+        return output
+    try:
+        result = analyze_news(
+            text=record["text"],
+            source_url=record["source_url"],
+            model_bundle=model_bundle,
+            full_explanation=full_explanation,
+        )
+    except Exception as exc:
+        output["error"] = f"Analysis failed: {exc}"
+        return output
+    if record_history:
+        save_history(
+            news_text=record["text"],
+            source_url=record["source_url"],
+            result=result.get("result", "Unverified"),
+            method=result.get("verification_method", "Machine Learning"),
+        )
+    output.update(result)
+    return output
+
+
+def stream_analyze(
+    records: Iterable[Dict[str, object]],
+    model_bundle: Dict[str, object],
+    workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    ordering: str = "ordered",
+    record_history: bool = False,
+    full_explanation: bool = False,
+    analyze: Optional[Callable[[Dict[str, object]], Dict[str, object]]] = None,
+) -> Iterator[Dict[str, object]]:
+    # At most ``max_in_flight`` records are read ahead of the consumer, so memory
+    # stays flat however long the input is: the input iterator is only advanced
+    # when a slot frees up. "ordered" yields in input order; "completion" yields
+    # each result as soon as it is ready.
+    if ordering not in ORDERINGS:
+        raise ValueError(f"ordering must be one of {ORDERINGS}")
+    workers = workers or config.BULK_WORKERS
+    max_in_flight = max(workers, max_in_flight or config.BULK_MAX_IN_FLIGHT)
+    run = analyze or (lambda record: _analyze_record(record, model_bundle, record_history, full_explanation))
+    source = iter(records)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk") as executor:
+        if ordering == "ordered":
+            queue: Deque[Future] = deque()
+            for record in source:
+                queue.append(executor.submit(run, record))
+                if len(queue) >= max_in_flight:
+                    yield queue.popleft().result()
+            while queue:
+                yield queue.popleft().result()
+            return
+
+        pending: Set[Future] = set()
+        for record in source:
+            pending.add(executor.submit(run, record))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def to_ndjson(results: Iterable[Dict[str, object]]) -> Iterator[str]:
+    for result in results:
+        yield json.dumps(result, ensure_ascii=False) + "\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Verify an NDJSON stream of {text, source_url} records.")
+    parser.add_argument("input", nargs="?", default="-", help="NDJSON file, or - for stdin.")
+    parser.add_argument("-o", "--output", default="-", help="Output NDJSON file, or - for stdout.")
+    parser.add_argument("--workers", type=int, default=config.BULK_WORKERS)
+    parser.add_argument("--max-in-flight", type=int, default=config.BULK_MAX_IN_FLIGHT)
+    parser.add_argument("--order", choices=ORDERINGS, default="ordered")
+    parser.add_argument("--history", action="store_true", help="Record each verdict in verification_history.")
+    parser.add_argument("--explain", action="store_true", help="Compute every score instead of exiting early.")
+    args = parser.parse_args()
+
+    model_bundle = load_model()
+    if args.history:
+        init_db()
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        results = stream_analyze(
+            iter_records(source),
+            model_bundle,
+            workers=args.workers,
+            max_in_flight=args.max_in_flight,
+            ordering=args.order,
+            record_history=args.history,
+            full_explanation=args.explain,
+        )
+        for line in to_ndjson(results):
+            sink.write(line)
+            sink.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import atexit
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+
+V = TypeVar("V")
+
+
+@dataclass
+class CacheEntry(Generic[V]):
+    value: V
+    stored_at: float
+
+
+class TTLCache(Generic[V]):
+    # Bounded LRU cache whose entries expire after ``ttl`` seconds. Entries younger
+    # than ``ttl + stale_ttl`` can still be served by get_or_load while a
+    # background refresh replaces them (stale-while-revalidate).
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 900.0,
+        stale_ttl: float = 0.0,
+        persist_path: Optional[Path] = None,
+        persist_every: int = 25,
+        on_evict: Optional[Callable[[Hashable, V], None]] = None,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.persist_every = persist_every
+        # Called with (key, value) whenever an entry leaves the cache, so callers
+        # can keep secondary indexes in sync.
+        self.on_evict = on_evict
+        self._data: "OrderedDict[Hashable, CacheEntry[V]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._refreshing: set = set()
+        self._unsaved = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        if self.persist_path is not None:
+            self.load()
+            atexit.register(self.save)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        # Lock-free (and blind to expiry) so an on_evict owner can call it while
+        # holding its own lock without inverting the lock order.
+        return key in self._data
+
+    def _lookup(self, key: Hashable, now: float) -> Tuple[Optional[CacheEntry[V]], bool]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None, False
+        age = now - entry.stored_at
+        if age >= self.ttl + self.stale_ttl:
+            del self._data[key]
+            self.expirations += 1
+            self._evicted(key, entry.value)
+            return None, False
+        self._data.move_to_end(key)
+        return entry, age >= self.ttl
+
+    def get(self, key: Hashable, default: Optional[V] = None) -> Optional[V]:
+        with self._lock:
+            entry, stale = self._lookup(key, time.time())
+            if entry is None or stale:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entry.value
+
+    def set(self, key: Hashable, value: V) -> None:
+        with self._lock:
+            self._data[key] = CacheEntry(value=value, stored_at=time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                old_key, old_entry = self._data.popitem(last=False)
+                self.evictions += 1
+                self._evicted(old_key, old_entry.value)
+            self._unsaved += 1
+            should_save = self.persist_path is not None and self._unsaved >= self.persist_every
+        if should_save:
+            self.save()
+
+    def _evicted(self, key: Hashable, value: V) -> None:
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self._evicted(key, entry.value)
+
+    def clear(self) -> None:
+        with self._lock:
+            entries = list(self._data.items())
+            self._data.clear()
+            for key, entry in entries:
+                self._evicted(key, entry.value)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Optional[V]]) -> Optional[V]:
+        # ``loader`` returning None means "do not cache" (e.g. an upstream failure).
+        with self._lock:
+            entry, stale = self._lookup(key, time.time())
+            if entry is not None and not stale:
+                self.hits += 1
+                return entry.value
+            if entry is not None:
+                self.stale_hits += 1
+                start_refresh = key not in self._refreshing
+                if start_refresh:
+                    self._refreshing.add(key)
+            else:
+                self.misses += 1
+
+        if entry is not None:
+            if start_refresh:
+                threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+            return entry.value
+
+        value = loader()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Optional[V]]) -> None:
+        try:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+            with self._lock:
+                self.refreshes += 1
+        except Exception:
+            with self._lock:
+                self.refresh_errors += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+            }
+
+    def save(self) -> None:
+        if self.persist_path is None:
+            return
+        with self._lock:
+            snapshot = [(key, entry.value, entry.stored_at) for key, entry in self._data.items()]
+            self._unsaved = 0
+        try:
+            self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.persist_path.with_suffix(self.persist_path.suffix + f".{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.persist_path)
+        except OSError:
+            pass
+
+    def load(self) -> int:
+        if self.persist_path is None or not self.persist_path.exists():
+            return 0
+        try:
+            with open(self.persist_path, "rb") as f:
+                snapshot = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return 0
+
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for key, value, stored_at in snapshot:
+                if now - stored_at < self.ttl + self.stale_ttl:
+                    self._data[key] = CacheEntry(value=value, stored_at=stored_at)
+                    loaded += 1
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return loaded
@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import pickle
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import scipy.sparse as sp
+
+from src import config
+from src.preprocess import preprocess_text
+
+
+FORMAT_NAME = "fnd-compact-model"
+FORMAT_VERSION = 1
+
+ROOT = Path(__file__).resolve().parents[1]
+MANIFEST_NAME = "manifest.json"
+
+# TfidfVectorizer settings the compact transform reproduces exactly.
+_TFIDF_DEFAULTS = {
+    "analyzer": "word",
+    "binary": False,
+    "lowercase": True,
+    "preprocessor": None,
+    "tokenizer": None,
+    "strip_accents": None,
+    "stop_words": None,
+    "sublinear_tf": False,
+    "use_idf": True,
+}
+
+
+class CompactModelError(ValueError):
+    pass
+
+
+# Largest class-probability difference from the sklearn bundle an export may show.
+PARITY_TOLERANCE = 1e-9
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CompactTfidfVectorizer:
+    # Word n-gram TF-IDF transform over a fixed vocabulary; the IDF vector is
+    # memory-mapped, so forked workers share it through the page cache.
+    def __init__(self, vocabulary: List[str], idf: np.ndarray, ngram_range, token_pattern: str, norm: Optional[str]) -> None:
+        self.vocabulary_ = {term: i for i, term in enumerate(vocabulary)}
+        self.idf_ = idf
+        self.ngram_range = tuple(ngram_range)
+        self.norm = norm
+        self._token_re = re.compile(token_pattern)
+
+    def _ngrams(self, text: str) -> List[str]:
+        tokens = self._token_re.findall(text.lower())
+        low, high = self.ngram_range
+        if low == 1 and high == 1:
+            return tokens
+        grams = list(tokens) if low == 1 else []
+        for n in range(max(2, low), high + 1):
+            grams.extend(" ".join(tokens[i : i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def transform(self, texts: Sequence[str]) -> sp.csr_matrix:
+        vocabulary = self.vocabulary_
+        indptr = [0]
+        indices: List[int] = []
+        values: List[float] = []
+        for text in texts:
+            counts: Dict[int, int] = {}
+            for gram in self._ngrams(text):
+                idx = vocabulary.get(gram)
+                if idx is not None:
+                    counts[idx] = counts.get(idx, 0) + 1
+            cols = sorted(counts)
+            indices.extend(cols)
+            values.extend(counts[c] for c in cols)
+            indptr.append(len(indices))
+        cols = np.asarray(indices, dtype=np.int32)
+        data = np.asarray(values, dtype=np.float64) * self.idf_[cols]
+        X = sp.csr_matrix((data, cols, np.asarray(indptr, dtype=np.int64)), shape=(len(texts), len(self.idf_)))
+        if self.norm == "l2":
+            norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+            norms[norms == 0] = 1.0
+            X = sp.diags(1.0 / norms) @ X
+        elif self.norm == "l1":
+            norms = np.asarray(abs(X).sum(axis=1)).ravel()
+            norms[norms == 0] = 1.0
+            X = sp.diags(1.0 / norms) @ X
+        return sp.csr_matrix(X)
+
+
+class CompactLinearClassifier:
+    # predict_proba for LogisticRegression / SGDClassifier(log_loss) coefficients.
+    def __init__(self, coef: np.ndarray, intercept: np.ndarray, classes: np.ndarray) -> None:
+        self.coef_ = coef
+        self.intercept_ = intercept
+        self.classes_ = classes
+
+    def decision_function(self, X) -> np.ndarray:
+        return np.asarray(X @ self.coef_.T) + self.intercept_
+
+    def predict_proba(self, X) -> np.ndarray:
+        scores = self.decision_function(X)
+        if scores.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        scores = scores - scores.max(axis=1, keepdims=True)
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class CompactNaiveBayes:
+    # predict_proba for MultinomialNB from its log probabilities.
+    def __init__(self, feature_log_prob: np.ndarray, class_log_prior: np.ndarray, classes: np.ndarray) -> None:
+        self.feature_log_prob_ = feature_log_prob
+        self.class_log_prior_ = class_log_prior
+        self.classes_ = classes
+
+    def predict_proba(self, X) -> np.ndarray:
+        joint = np.asarray(X @ self.feature_log_prob_.T) + self.class_log_prior_
+        joint = joint - joint.max(axis=1, keepdims=True)
+        exp = np.exp(joint)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _vectorizer_spec(vectorizer) -> Dict[str, object]:
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+
+    params = vectorizer.get_params()
+    if isinstance(vectorizer, TfidfVectorizer):
+        unsupported = [key for key, value in _TFIDF_DEFAULTS.items() if params.get(key) != value]
+        if unsupported:
+            raise CompactModelError(f"TfidfVectorizer settings not supported by the compact format: {unsupported}")
+        return {
+            "kind": "tfidf",
+            "ngram_range": list(params["ngram_range"]),
+            "token_pattern": params["token_pattern"],
+            "norm": params["norm"],
+        }
+    if isinstance(vectorizer, HashingVectorizer):
+        # Stateless: only its parameters are stored and sklearn rebuilds it.
+        keep = ["n_features", "ngram_range", "alternate_sign", "norm", "lowercase", "token_pattern", "analyzer", "binary"]
+        spec = {key: params[key] for key in keep}
+        spec["ngram_range"] = list(spec["ngram_range"])
+        return {"kind": "hashing", "params": spec}
+    raise CompactModelError(f"Unsupported vectorizer: {type(vectorizer).__name__}")
+
+
+def _model_arrays(model) -> Dict[str, object]:
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    from sklearn.naive_bayes import MultinomialNB
+
+    if isinstance(model, SGDClassifier) and model.loss not in ("log_loss", "log"):
+        raise CompactModelError("SGDClassifier needs loss='log_loss' for predict_proba")
+    if isinstance(model, (LogisticRegression, SGDClassifier)):
+        one_vs_rest = isinstance(model, SGDClassifier) or getattr(model, "multi_class", "auto") == "ovr"
+        if one_vs_rest and len(model.classes_) > 2:
+            raise CompactModelError("Multi-class one-vs-rest models are not supported")
+        return {
+            "kind": "linear",
+            "arrays": {
+                "coef": np.asarray(model.coef_, dtype=np.float64),
+                "intercept": np.asarray(model.intercept_, dtype=np.float64),
+                "classes": np.asarray(model.classes_),
+            },
+        }
+    if isinstance(model, MultinomialNB):
+        return {
+            "kind": "multinomial_nb",
+            "arrays": {
+                "feature_log_prob": np.asarray(model.feature_log_prob_, dtype=np.float64),
+                "class_log_prior": np.asarray(model.class_log_prior_, dtype=np.float64),
+                "classes": np.asarray(model.classes_),
+            },
+        }
+    raise CompactModelError(f"Unsupported model: {type(model).__name__}")
+
+
+def export_compact_model(bundle: Dict[str, object], out_dir: Union[str, Path]) -> Path:
+    # Writes one .npy file per array plus a manifest with the format version and
+    # a SHA-256 per file. The directory is swapped in atomically.
+    out_dir = Path(out_dir)
+    vectorizer_spec = _vectorizer_spec(bundle["vectorizer"])
+    model_spec = _model_arrays(bundle["model"])
+    arrays: Dict[str, np.ndarray] = dict(model_spec.pop("arrays"))
+    if vectorizer_spec["kind"] == "tfidf":
+        vectorizer = bundle["vectorizer"]
+        arrays["idf"] = np.asarray(vectorizer.idf_, dtype=np.float64)
+        vocabulary = [""] * len(vectorizer.vocabulary_)
+        for term, idx in vectorizer.vocabulary_.items():
+            vocabulary[idx] = term
+
+    out_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=out_dir.name + ".", dir=out_dir.parent))
+    try:
+        files: Dict[str, str] = {}
+        for name, array in arrays.items():
+            filename = f"{name}.npy"
+            np.save(tmp_dir / filename, np.ascontiguousarray(array), allow_pickle=False)
+            files[filename] = _sha256(tmp_dir / filename)
+        if vectorizer_spec["kind"] == "tfidf":
+            with open(tmp_dir / "vocabulary.json", "w", encoding="utf-8") as f:
+                json.dump(vocabulary, f, ensure_ascii=False)
+            files["vocabulary.json"] = _sha256(tmp_dir / "vocabulary.json")
+
+        manifest = {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "vectorizer_name": bundle.get("vectorizer_name"),
+            "model_name": bundle.get("model_name"),
+            "label_map": {str(k): v for k, v in bundle.get("label_map", {0: "Fake", 1: "Real"}).items()},
+            "vectorizer": vectorizer_spec,
+            "model": model_spec,
+            "files": files,
+        }
+        manifest["checksum"] = hashlib.sha256(json.dumps(files, sort_keys=True).encode("utf-8")).hexdigest()
+        with open(tmp_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        old_dir = None
+        if out_dir.exists():
+            old_dir = out_dir.with_name(out_dir.name + ".old")
+            shutil.rmtree(old_dir, ignore_errors=True)
+            os.replace(out_dir, old_dir)
+        os.replace(tmp_dir, out_dir)
+        if old_dir is not None:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return out_dir
+
+
+def read_manifest(model_dir: Union[str, Path]) -> Dict[str, object]:
+    model_dir = Path(model_dir)
+    try:
+        with open(model_dir / MANIFEST_NAME, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as exc:
+        raise CompactModelError(f"Cannot read compact model manifest in {model_dir}: {exc}") from exc
+    if manifest.get("format") != FORMAT_NAME:
+        raise CompactModelError(f"{model_dir} is not a compact model directory")
+    if manifest.get("version") != FORMAT_VERSION:
+        raise CompactModelError(
+            f"Compact model version {manifest.get('version')} is not supported (expected {FORMAT_VERSION})"
+        )
+    return manifest
+
+
+def load_compact_model(model_dir: Union[str, Path], verify: bool = True) -> Dict[str, object]:
+    # Returns a bundle with the same keys app/hybrid_service use for pickled
+    # bundles. Arrays are opened with mmap_mode="r".
+    model_dir = Path(model_dir)
+    manifest = read_manifest(model_dir)
+    files: Dict[str, str] = manifest["files"]
+    expected = hashlib.sha256(json.dumps(files, sort_keys=True).encode("utf-8")).hexdigest()
+    if manifest.get("checksum") != expected:
+        raise CompactModelError(f"Manifest checksum mismatch in {model_dir}")
+    if verify:
+        for filename, digest in files.items():
+            if _sha256(model_dir / filename) != digest:
+                raise CompactModelError(f"Checksum mismatch for {model_dir / filename}")
+
+    def array(name: str) -> np.ndarray:
+        return np.load(model_dir / f"{name}.npy", mmap_mode="r", allow_pickle=False)
+
+    vec_spec = manifest["vectorizer"]
+    if vec_spec["kind"] == "tfidf":
+        with open(model_dir / "vocabulary.json", "r", encoding="utf-8") as f:
+            vocabulary = json.load(f)
+        vectorizer = CompactTfidfVectorizer(
+            vocabulary, array("idf"), vec_spec["ngram_range"], vec_spec["token_pattern"], vec_spec["norm"]
+        )
+    else:
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        params = dict(vec_spec["params"])
+        params["ngram_range"] = tuple(params["ngram_range"])
+        vectorizer = HashingVectorizer(**params)
+
+    model_kind = manifest["model"]["kind"]
+    classes = np.asarray(array("classes"))
+    if model_kind == "linear":
+        model = CompactLinearClassifier(array("coef"), np.asarray(array("intercept")), classes)
+    elif model_kind == "multinomial_nb":
+        model = CompactNaiveBayes(array("feature_log_prob"), np.asarray(array("class_log_prior")), classes)
+    else:
+        raise CompactModelError(f"Unknown model kind {model_kind!r}")
+
+    return {
+        "vectorizer_name": manifest.get("vectorizer_name"),
+        "model_name": manifest.get("model_name"),
+        "vectorizer": vectorizer,
+        "model": model,
+        "label_map": {int(k): v for k, v in manifest["label_map"].items()},
+        "format": "compact",
+    }
+
+
+def check_parity(reference: Dict[str, object], compact: Dict[str, object], texts: Sequence[str]) -> float:
+    # Largest absolute difference between the two bundles' class probabilities;
+    # raises if any predicted label differs.
+    texts = list(texts)
+    ref_probs = reference["model"].predict_proba(reference["vectorizer"].transform(texts))
+    new_probs = compact["model"].predict_proba(compact["vectorizer"].transform(texts))
+    ref_labels = np.asarray(reference["model"].classes_)[np.argmax(ref_probs, axis=1)]
+    new_labels = np.asarray(compact["model"].classes_)[np.argmax(new_probs, axis=1)]
+    mismatches = int(np.sum(ref_labels != new_labels))
+    if mismatches:
+        raise CompactModelError(f"{mismatches} of {len(texts)} predictions differ from the reference bundle")
+    return float(np.max(np.abs(ref_probs - new_probs))) if len(texts) else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export a pickled model bundle to the compact format and check parity.")
+    parser.add_argument("--pickle", type=Path, default=ROOT / config.MODEL_PATH)
+    parser.add_argument("--out", type=Path, default=ROOT / config.COMPACT_MODEL_DIR)
+    parser.add_argument("--check-only", action="store_true", help="Only compare an existing export with the pickle")
+    parser.add_argument("--data", type=Path, default=ROOT / "data" / "sample_fake_news.csv")
+    parser.add_argument("--tolerance", type=float, default=PARITY_TOLERANCE)
+    args = parser.parse_args()
+
+    with open(args.pickle, "rb") as f:
+        bundle = pickle.load(f)
+    if not args.check_only:
+        export_compact_model(bundle, args.out)
+        print(f"Exported compact model to {args.out}")
+
+    with open(args.data, "r", encoding="utf-8", newline="") as f:
+        texts = [preprocess_text(row["text"] or "") for row in csv.DictReader(f)]
+    diff = check_parity(bundle, load_compact_model(args.out), texts)
+    print(f"Parity on {len(texts)} texts: max |dp| = {diff:.3e}")
+    if diff > args.tolerance:
+        raise SystemExit(f"Probability difference {diff:.3e} exceeds tolerance {args.tolerance:.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import logging
+import os
+from typing import Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+def _env_str(name: str, default: str) -> str:
+    value = os.environ.get(name)
+    return value.strip() if value and value.strip() else default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _env_choice(name: str, default: str, choices: Tuple[str, ...]) -> str:
+    # An unknown value falls back to the default at startup instead of
+    # failing every request that reads the setting.
+    value = _env_str(name, default).lower()
+    if value not in choices:
+        logger.warning("Ignoring %s=%r; expected one of %s. Using %r.", name, value, ", ".join(choices), default)
+        return default
+    return value
+
+
+# Sentence-transformer model used for embedding similarity.
+EMBEDDING_MODEL_NAME = _env_str("FND_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = max(1, _env_int("FND_EMBEDDING_BATCH_SIZE", 32))
+EMBEDDING_DEVICE = os.environ.get("FND_EMBEDDING_DEVICE") or None
+WARM_EMBEDDING_MODEL = _env_bool("FND_WARM_EMBEDDING_MODEL", False)
+
+# Persistent TF-IDF space for portal similarity.
+TFIDF_SPACE_PATH = _env_str("FND_TFIDF_SPACE_PATH", "models/portal_tfidf.pkl")
+TFIDF_CORPUS_SIZE = max(1, _env_int("FND_TFIDF_CORPUS_SIZE", 5000))
+TFIDF_VECTOR_CACHE_SIZE = max(1, _env_int("FND_TFIDF_VECTOR_CACHE_SIZE", 20000))
+TFIDF_SAVE_EVERY = max(1, _env_int("FND_TFIDF_SAVE_EVERY", 50))
+
+# Google News RSS lookup cache.
+RSS_CACHE_ENABLED = _env_bool("FND_RSS_CACHE_ENABLED", True)
+RSS_CACHE_SIZE = max(1, _env_int("FND_RSS_CACHE_SIZE", 2048))
+RSS_CACHE_TTL = max(0.0, _env_float("FND_RSS_CACHE_TTL", 900.0))
+RSS_CACHE_STALE_TTL = max(0.0, _env_float("FND_RSS_CACHE_STALE_TTL", 3600.0))
+RSS_CACHE_PATH = os.environ.get("FND_RSS_CACHE_PATH", "")
+
+# Official portal fetching.
+GOOGLE_NEWS_RSS_URL = _env_str("FND_GOOGLE_NEWS_RSS_URL", "https://news.google.com/rss/search")
+PORTAL_FETCH_MODE = _env_str("FND_PORTAL_FETCH_MODE", "aggregate").lower()
+PORTAL_FETCH_WORKERS = max(1, _env_int("FND_PORTAL_FETCH_WORKERS", 8))
+PORTAL_SOURCE_DEADLINE = max(0.1, _env_float("FND_PORTAL_SOURCE_DEADLINE", 4.0))
+HTTP_POOL_SIZE = max(1, _env_int("FND_HTTP_POOL_SIZE", 16))
+
+# Domain reputation list ("domain,status" rows: official, trusted, known_fake),
+# compiled into a memory-mapped index shared by all workers. Changes to the
+# list are picked up within REPUTATION_RELOAD_INTERVAL seconds.
+REPUTATION_SOURCE_PATH = _env_str("FND_REPUTATION_SOURCE_PATH", "data/domain_reputation.csv")
+REPUTATION_INDEX_PATH = _env_str("FND_REPUTATION_INDEX_PATH", "models/domain_reputation.idx")
+REPUTATION_RELOAD_INTERVAL = max(0.0, _env_float("FND_REPUTATION_RELOAD_INTERVAL", 30.0))
+# Optional Public Suffix List file (publicsuffix.org format); a built-in list
+# of common multi-label suffixes is always used.
+PUBLIC_SUFFIX_PATH = os.environ.get("FND_PUBLIC_SUFFIX_PATH", "")
+
+# Google News resilience. The breaker opens after PORTAL_BREAKER_FAILURES
+# consecutive failed fetches and sends requests straight to the ML path for
+# PORTAL_BREAKER_COOLDOWN seconds; gunicorn.conf.py points the state file at
+# a per-master temp dir so all workers share it. Timeouts adapt to the p99 of
+# recent fetches (never above the caller's timeout), and an optional hedged
+# request fires once the first one is slower than p95.
+PORTAL_BREAKER_ENABLED = _env_bool("FND_PORTAL_BREAKER_ENABLED", True)
+PORTAL_BREAKER_FAILURES = max(1, _env_int("FND_PORTAL_BREAKER_FAILURES", 5))
+PORTAL_BREAKER_COOLDOWN = max(1.0, _env_float("FND_PORTAL_BREAKER_COOLDOWN", 30.0))
+PORTAL_BREAKER_STATE_PATH = os.environ.get("FND_PORTAL_BREAKER_STATE_PATH", "")
+PORTAL_ADAPTIVE_TIMEOUT = _env_bool("FND_PORTAL_ADAPTIVE_TIMEOUT", True)
+PORTAL_TIMEOUT_MIN = max(0.1, _env_float("FND_PORTAL_TIMEOUT_MIN", 1.0))
+PORTAL_TIMEOUT_FACTOR = max(1.0, _env_float("FND_PORTAL_TIMEOUT_FACTOR", 2.0))
+PORTAL_LATENCY_WINDOW = max(10, _env_int("FND_PORTAL_LATENCY_WINDOW", 200))
+PORTAL_LATENCY_MIN_SAMPLES = max(1, _env_int("FND_PORTAL_LATENCY_MIN_SAMPLES", 20))
+PORTAL_HEDGE_ENABLED = _env_bool("FND_PORTAL_HEDGE_ENABLED", False)
+
+# Local official-article index and its RSS ingester.
+ARTICLE_INDEX_ENABLED = _env_bool("FND_ARTICLE_INDEX_ENABLED", True)
+ARTICLE_INDEX_PATH = _env_str("FND_ARTICLE_INDEX_PATH", "data/official_articles.db")
+ARTICLE_INDEX_TOP_K = max(1, _env_int("FND_ARTICLE_INDEX_TOP_K", 12))
+ARTICLE_INDEX_MAX_ROWS = max(1000, _env_int("FND_ARTICLE_INDEX_MAX_ROWS", 200000))
+LOCAL_MATCH_THRESHOLD = _env_float("FND_LOCAL_MATCH_THRESHOLD", 0.62)
+INGEST_ENABLED = _env_bool("FND_INGEST_ENABLED", False)
+INGEST_INTERVAL = max(30.0, _env_float("FND_INGEST_INTERVAL", 900.0))
+# Only the process holding this lock ingests; the others stand by.
+INGEST_LOCK_PATH = _env_str("FND_INGEST_LOCK_PATH", "data/ingest.lock")
+
+# Precomputed embeddings of official articles.
+EMBEDDING_INDEX_ENABLED = _env_bool("FND_EMBEDDING_INDEX_ENABLED", True)
+EMBEDDING_INDEX_DIR = _env_str("FND_EMBEDDING_INDEX_DIR", "models/embedding_index")
+EMBEDDING_INDEX_TOP_K = max(1, _env_int("FND_EMBEDDING_INDEX_TOP_K", 5))
+EMBEDDING_IVF_LISTS = max(0, _env_int("FND_EMBEDDING_IVF_LISTS", 0))
+EMBEDDING_IVF_PROBES = max(1, _env_int("FND_EMBEDDING_IVF_PROBES", 8))
+
+# Batch analysis.
+BATCH_MAX_ITEMS = max(1, _env_int("FND_BATCH_MAX_ITEMS", 1000))
+BATCH_FETCH_WORKERS = max(1, _env_int("FND_BATCH_FETCH_WORKERS", 8))
+
+# Streaming NDJSON bulk verification.
+BULK_WORKERS = max(1, _env_int("FND_BULK_WORKERS", 8))
+BULK_MAX_IN_FLIGHT = max(1, _env_int("FND_BULK_MAX_IN_FLIGHT", 32))
+
+# Executors used by the async analysis path.
+IO_WORKERS = max(1, _env_int("FND_IO_WORKERS", 32))
+CPU_WORKERS = max(1, _env_int("FND_CPU_WORKERS", os.cpu_count() or 2))
+
+# Result cache for repeated claims.
+RESULT_CACHE_ENABLED = _env_bool("FND_RESULT_CACHE_ENABLED", True)
+RESULT_CACHE_SIZE = max(1, _env_int("FND_RESULT_CACHE_SIZE", 10000))
+RESULT_CACHE_TTL = max(0.0, _env_float("FND_RESULT_CACHE_TTL", 3600.0))
+RESULT_CACHE_NEAR_DUPLICATES = _env_bool("FND_RESULT_CACHE_NEAR_DUPLICATES", True)
+RESULT_CACHE_MAX_DISTANCE = min(15, max(0, _env_int("FND_RESULT_CACHE_MAX_DISTANCE", 3)))
+
+# Named-entity extraction: "off", "fast" (capitalization + gazetteer) or "nltk".
+ENTITY_MODES = ("off", "fast", "nltk")
+ENTITY_MODE = _env_choice("FND_ENTITY_MODE", "nltk", ENTITY_MODES)
+ENTITY_WINDOW_CHARS = max(100, _env_int("FND_ENTITY_WINDOW_CHARS", 2000))
+ENTITY_CACHE_SIZE = max(1, _env_int("FND_ENTITY_CACHE_SIZE", 4096))
+ENTITY_GAZETTEER_PATH = os.environ.get("FND_ENTITY_GAZETTEER_PATH", "")
+
+# Offline training (python -m src.train).
+TRAIN_WORKERS = max(1, _env_int("FND_TRAIN_WORKERS", os.cpu_count() or 2))
+TRAIN_CHUNK_SIZE = max(1, _env_int("FND_TRAIN_CHUNK_SIZE", 2000))
+PREPROCESS_CACHE_DIR = _env_str("FND_PREPROCESS_CACHE_DIR", "models/preprocess_cache")
+TRAIN_STREAM_CHUNK_SIZE = max(2, _env_int("FND_TRAIN_STREAM_CHUNK_SIZE", 5000))
+TRAIN_HASH_FEATURES_LOG2 = min(24, max(10, _env_int("FND_TRAIN_HASH_FEATURES_LOG2", 20)))
+TRAIN_STREAM_HOLDOUT_MAX = max(0, _env_int("FND_TRAIN_STREAM_HOLDOUT_MAX", 20000))
+TRAIN_CV_FOLDS = max(2, _env_int("FND_TRAIN_CV_FOLDS", 5))
+# JSON grid for --mode search; empty uses model_search.DEFAULT_GRID.
+TRAIN_SEARCH_GRID = _env_str("FND_TRAIN_SEARCH_GRID", "")
+
+# Model artifact: "auto" prefers the compact export when it is at least as new
+# as the pickle, "compact" requires it, "pickle" ignores it.
+MODEL_FORMAT = _env_str("FND_MODEL_FORMAT", "auto").lower()
+MODEL_PATH = _env_str("FND_MODEL_PATH", "models/best_model.pkl")
+COMPACT_MODEL_DIR = _env_str("FND_COMPACT_MODEL_DIR", "models/best_model")
+MODEL_VERIFY_CHECKSUM = _env_bool("FND_MODEL_VERIFY_CHECKSUM", True)
+
+# Verification history (SQLite, WAL). With write-behind on, inserts are queued
+# and flushed in batched transactions by a background thread.
+HISTORY_DB_PATH = _env_str("FND_HISTORY_DB_PATH", "data/history.db")
+HISTORY_WRITE_BEHIND = _env_bool("FND_HISTORY_WRITE_BEHIND", True)
+HISTORY_BATCH_SIZE = max(1, _env_int("FND_HISTORY_BATCH_SIZE", 256))
+HISTORY_FLUSH_INTERVAL = max(0.01, _env_float("FND_HISTORY_FLUSH_INTERVAL", 0.5))
+HISTORY_QUEUE_SIZE = max(1, _env_int("FND_HISTORY_QUEUE_SIZE", 10000))
+HISTORY_BUSY_TIMEOUT = max(0.1, _env_float("FND_HISTORY_BUSY_TIMEOUT", 10.0))
+HISTORY_CACHE_KB = max(1024, _env_int("FND_HISTORY_CACHE_KB", 16384))
+HISTORY_MMAP_BYTES = max(0, _env_int("FND_HISTORY_MMAP_BYTES", 134217728))
+
+# Prometheus metrics. FND_METRICS_DIR holds one snapshot file per process so
+# /metrics can sum across gunicorn workers (gunicorn.conf.py sets a fresh one
+# per master); empty means single-process, in-memory only.
+METRICS_ENABLED = _env_bool("FND_METRICS_ENABLED", True)
+METRICS_DIR = os.environ.get("FND_METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = max(0.1, _env_float("FND_METRICS_FLUSH_INTERVAL", 1.0))
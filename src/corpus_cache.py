@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+import nltk
+import pandas as pd
+
+from src import config
+from src.preprocess import PREPROCESS_VERSION, get_analyzer, preprocess_text
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@contextmanager
+def timed_stage(label: str) -> Iterator[None]:
+    # Console timing for the offline training pipeline.
+    start = time.perf_counter()
+    print(f"[{label}] started", flush=True)
+    try:
+        yield
+    finally:
+        print(f"[{label}] done in {time.perf_counter() - start:.2f}s", flush=True)
+
+
+def _has_parquet() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def preprocess_settings() -> str:
+    # Anything that changes preprocess_text output must be part of the cache key.
+    return f"v{PREPROCESS_VERSION}|nltk={nltk.__version__}"
+
+
+def corpus_key(texts: Iterable[str]) -> str:
+    digest = hashlib.sha1(preprocess_settings().encode("utf-8"))
+    for text in texts:
+        digest.update(text.encode("utf-8", "surrogatepass"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _cache_path(key: str, cache_dir: Path) -> Path:
+    suffix = ".parquet" if _has_parquet() else ".pkl"
+    return cache_dir / f"corpus-{key}{suffix}"
+
+
+def _read_cached(path: Path) -> Optional[List[str]]:
+    try:
+        if path.suffix == ".parquet":
+            return pd.read_parquet(path)["processed_text"].tolist()
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError, KeyError):
+        return None
+
+
+def _write_cached(path: Path, processed: List[str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    if path.suffix == ".parquet":
+        pd.DataFrame({"processed_text": processed}).to_parquet(tmp_path, index=False)
+    else:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(processed, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _init_worker() -> None:
+    # Load stopwords and WordNet once per worker process, not once per chunk.
+    get_analyzer()
+
+
+def _preprocess_chunk(chunk: List[str]) -> List[str]:
+    return [preprocess_text(text) for text in chunk]
+
+
+@contextmanager
+def preprocess_pool(workers: Optional[int] = None) -> Iterator[Optional[ProcessPoolExecutor]]:
+    # One pool for many preprocess_corpus calls (e.g. every chunk of a
+    # streaming run), so stopwords and WordNet load once per worker process.
+    workers = workers or config.TRAIN_WORKERS
+    if workers <= 1:
+        yield None
+        return
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    try:
+        yield executor
+    finally:
+        executor.shutdown()
+
+
+def preprocess_corpus(
+    texts: Sequence[str],
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    executor: Optional[ProcessPoolExecutor] = None,
+) -> List[str]:
+    # Uses `executor` when given (and leaves it running); otherwise starts and
+    # stops a pool of `workers` processes for this call.
+    workers = workers or config.TRAIN_WORKERS
+    chunk_size = max(1, chunk_size or config.TRAIN_CHUNK_SIZE)
+    chunks = [list(texts[i : i + chunk_size]) for i in range(0, len(texts), chunk_size)]
+    if not chunks:
+        return []
+
+    processed: List[str] = []
+    report_every = max(1, len(chunks) // 20)
+    own_executor = None
+    if executor is not None:
+        results: Iterable[List[str]] = executor.map(_preprocess_chunk, chunks)
+    elif workers <= 1 or len(chunks) == 1:
+        results = map(_preprocess_chunk, chunks)
+    else:
+        own_executor = ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=_init_worker)
+        results = own_executor.map(_preprocess_chunk, chunks)
+    try:
+        for done, chunk_result in enumerate(results, start=1):
+            processed.extend(chunk_result)
+            if done % report_every == 0 or done == len(chunks):
+                print(f"  preprocessed {len(processed)}/{len(texts)} texts ({done}/{len(chunks)} chunks)", flush=True)
+    finally:
+        if own_executor is not None:
+            own_executor.shutdown()
+    return processed
+
+
+def load_or_preprocess(
+    texts: Sequence[str],
+    cache_dir: Optional[Path] = None,
+    use_cache: bool = True,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> List[str]:
+    cache_dir = Path(cache_dir or ROOT / config.PREPROCESS_CACHE_DIR)
+    texts = list(texts)
+    path = None
+    if use_cache:
+        path = _cache_path(corpus_key(texts), cache_dir)
+        if path.exists():
+            cached = _read_cached(path)
+            if cached is not None and len(cached) == len(texts):
+                print(f"  using cached preprocessed corpus: {path}", flush=True)
+                return cached
+
+    processed = preprocess_corpus(texts, workers=workers, chunk_size=chunk_size)
+    if path is not None:
+        _write_cached(path, processed)
+        print(f"  cached preprocessed corpus: {path}", flush=True)
+    return processed
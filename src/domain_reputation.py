@@ -0,0 +1,433 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import ipaddress
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+from urllib.parse import urlparse
+
+from src import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent rebuilds are not serialized.
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+
+TRUSTED = "trusted"
+UNTRUSTED = "untrusted"
+KNOWN_FAKE = "known_fake"
+
+# Status codes stored in the index, ordered by severity: when a domain is
+# listed twice the higher code wins.
+_CODES = {"trusted": 1, "official": 2, "known_fake": 3}
+_STATUS_BY_CODE = {0: UNTRUSTED, 1: TRUSTED, 2: TRUSTED, 3: KNOWN_FAKE}
+OFFICIAL_CODE = _CODES["official"]
+
+# Used when the reputation file is missing.
+DEFAULT_ENTRIES: List[Tuple[str, str]] = [
+    ("bbc.com", "official"),
+    ("reuters.com", "official"),
+    ("thehindu.com", "official"),
+    ("ndtv.com", "official"),
+]
+
+# Multi-label public suffixes used when no FND_PUBLIC_SUFFIX_PATH list is
+# configured: the common country second-level domains plus shared hosting
+# platforms where every subdomain belongs to a different owner.
+_BUILTIN_PUBLIC_SUFFIXES = """
+co.uk org.uk gov.uk ac.uk ltd.uk plc.uk me.uk net.uk sch.uk nhs.uk police.uk
+com.au net.au org.au gov.au edu.au asn.au id.au
+co.in net.in org.in gov.in ac.in edu.in nic.in res.in gen.in firm.in ind.in
+co.nz org.nz govt.nz ac.nz net.nz
+co.za org.za gov.za ac.za net.za
+com.br gov.br org.br net.br
+co.jp ne.jp or.jp go.jp ac.jp
+com.cn gov.cn org.cn net.cn edu.cn
+com.sg gov.sg org.sg edu.sg
+com.my gov.my com.pk gov.pk org.pk com.bd gov.bd com.np gov.np com.lk gov.lk
+com.ng gov.ng co.ke go.ke com.gh com.eg
+com.mx gob.mx com.ar gob.ar com.co gov.co co.kr go.kr com.tr gov.tr com.hk gov.hk com.tw gov.tw
+com.ph gov.ph co.id go.id co.th go.th com.vn gov.vn com.sa gov.sa co.il gov.il
+blogspot.com github.io gitlab.io herokuapp.com appspot.com wordpress.com
+netlify.app vercel.app pages.dev web.app firebaseapp.com azurewebsites.net cloudfront.net
+""".split()
+
+
+class PublicSuffixList:
+    # Public Suffix List rules: plain ("co.uk"), wildcard ("*.ck") and
+    # exception ("!www.ck"). The implicit "*" rule makes any single label a
+    # public suffix.
+    def __init__(self, rules: Iterable[str]) -> None:
+        self.exact = set()
+        self.wildcards = set()
+        self.exceptions = set()
+        for rule in rules:
+            rule = rule.strip().lower()
+            if not rule or rule.startswith("//"):
+                continue
+            rule = rule.split()[0]
+            if rule.startswith("!"):
+                self.exceptions.add(rule[1:])
+            elif rule.startswith("*."):
+                self.wildcards.add(rule[2:])
+            else:
+                self.exact.add(rule)
+
+    @classmethod
+    def from_file(cls, path: Path) -> "PublicSuffixList":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f)
+
+    def suffix_labels(self, labels: Sequence[str]) -> int:
+        # Number of trailing labels that form the public suffix.
+        n = len(labels)
+        best = 1
+        for i in range(n):
+            suffix = ".".join(labels[i:])
+            if suffix in self.exceptions:
+                return n - i - 1
+            if suffix in self.exact or (i + 1 < n and ".".join(labels[i + 1:]) in self.wildcards):
+                best = max(best, n - i)
+        return best
+
+
+_PSL: Optional[PublicSuffixList] = None
+_PSL_LOCK = threading.Lock()
+
+
+def public_suffixes() -> PublicSuffixList:
+    global _PSL
+    if _PSL is None:
+        with _PSL_LOCK:
+            if _PSL is None:
+                rules: List[str] = list(_BUILTIN_PUBLIC_SUFFIXES)
+                if config.PUBLIC_SUFFIX_PATH:
+                    path = Path(config.PUBLIC_SUFFIX_PATH)
+                    path = path if path.is_absolute() else ROOT / path
+                    with open(path, "r", encoding="utf-8") as f:
+                        rules.extend(f)
+                _PSL = PublicSuffixList(rules)
+    return _PSL
+
+
+def normalize_host(value: str) -> str:
+    # URL or bare host -> lowercase ASCII host without port, userinfo,
+    # trailing dot or leading "www." label.
+    raw = (value or "").strip().lower()
+    if not raw:
+        return ""
+    if "://" not in raw:
+        raw = "https://" + raw
+    try:
+        host = urlparse(raw).hostname or ""
+    except ValueError:
+        return ""
+    host = host.rstrip(".")
+    if not host.isascii():
+        try:
+            host = host.encode("idna").decode("ascii")
+        except UnicodeError:
+            pass
+    while host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+def registrable_domain(host: str) -> str:
+    # "news.bbc.co.uk" -> "bbc.co.uk"; "" when the host is itself a public suffix.
+    if not host or _is_ip(host):
+        return host
+    labels = host.split(".")
+    suffix = public_suffixes().suffix_labels(labels)
+    if len(labels) <= suffix:
+        return ""
+    return ".".join(labels[-(suffix + 1):])
+
+
+# --- on-disk index ------------------------------------------------------------------
+#
+# Open-addressing hash table over domain names, memory-mapped read-only by
+# every worker so a list of millions of domains costs one copy in the page
+# cache. Layout: header, slots, key blob, newline-separated official domains.
+
+MAGIC = b"FNDREP01"
+_HEADER = struct.Struct("<8sQQQQQQ")  # magic, slots, entries, blob off/len, official off/len
+_SLOT = struct.Struct("<QIHBx")  # key hash, blob offset, key length, status code
+
+
+def _hash(key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def build_index_bytes(entries: Iterable[Tuple[str, str]]) -> Tuple[bytes, Dict[str, int]]:
+    # Returns the index and build stats. Entries are normalized like lookups;
+    # public suffixes ("co.uk", "blogspot.com") are rejected because listing
+    # them would cover unrelated owners.
+    codes: Dict[str, int] = {}
+    official: List[str] = []
+    stats = {"read": 0, "invalid": 0, "public_suffix": 0}
+    for domain, status in entries:
+        stats["read"] += 1
+        host = normalize_host(domain)
+        code = _CODES.get((status or "").strip().lower())
+        if not host or code is None or not host.isascii():
+            stats["invalid"] += 1
+            continue
+        if not registrable_domain(host):
+            stats["public_suffix"] += 1
+            continue
+        codes[host] = max(code, codes.get(host, 0))
+        if code == OFFICIAL_CODE and host not in official:
+            official.append(host)
+
+    slot_count = 8
+    while slot_count < 2 * len(codes):
+        slot_count *= 2
+    mask = slot_count - 1
+    slots = bytearray(slot_count * _SLOT.size)
+    blob = bytearray()
+    for host, code in codes.items():
+        key = host.encode("ascii")
+        h = _hash(key)
+        i = h & mask
+        while _SLOT.unpack_from(slots, i * _SLOT.size)[2]:
+            i = (i + 1) & mask
+        _SLOT.pack_into(slots, i * _SLOT.size, h, len(blob), len(key), code)
+        blob += key
+
+    official_bytes = "\n".join(d for d in official if codes.get(d) == OFFICIAL_CODE).encode("ascii")
+    blob_offset = _HEADER.size + len(slots)
+    official_offset = blob_offset + len(blob)
+    header = _HEADER.pack(
+        MAGIC, slot_count, len(codes), blob_offset, len(blob), official_offset, len(official_bytes)
+    )
+    stats["entries"] = len(codes)
+    return header + bytes(slots) + bytes(blob) + official_bytes, stats
+
+
+def read_entries(path: Path) -> List[Tuple[str, str]]:
+    # "domain,status" rows; blank lines, "#" comments and a header row are skipped.
+    entries: List[Tuple[str, str]] = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(line for line in f if line.strip() and not line.lstrip().startswith("#")):
+            if len(row) < 2 or row[0].strip().lower() == "domain":
+                continue
+            entries.append((row[0], row[1]))
+    return entries
+
+
+def build_index(source: Optional[Path], out: Path) -> Dict[str, int]:
+    entries = read_entries(source) if source is not None and source.exists() else DEFAULT_ENTRIES
+    data, stats = build_index_bytes(entries)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out.with_name(f"{out.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    # Readers keep their mapping of the old file until they notice the swap.
+    os.replace(tmp_path, out)
+    return stats
+
+
+class _Table(NamedTuple):
+    data: Union[mmap.mmap, bytes]
+    mask: int
+    blob_offset: int
+    entries: int
+    official: Tuple[str, ...]
+    file_id: Optional[Tuple[int, int, int]]
+
+
+def _open_table(data: Union[mmap.mmap, bytes], file_id: Optional[Tuple[int, int, int]]) -> _Table:
+    magic, slots, entries, blob_offset, _, official_offset, official_len = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("not a domain reputation index")
+    official = bytes(data[official_offset:official_offset + official_len]).decode("ascii")
+    return _Table(data, slots - 1, blob_offset, entries, tuple(d for d in official.split("\n") if d), file_id)
+
+
+@dataclass
+class DomainVerdict:
+    status: str
+    domain: str
+    matched: Optional[str] = None
+    official: bool = False
+
+
+class DomainReputationIndex:
+    # Built from the reputation file into `index_path` and memory-mapped. At
+    # most every `reload_interval` seconds a lookup checks both files: a newer
+    # source is rebuilt (one worker at a time, under a lock file) and a
+    # replaced index is mapped again, so list updates need no restart.
+    def __init__(self, source_path: Optional[Path], index_path: Path, reload_interval: float) -> None:
+        self.source_path = source_path
+        self.index_path = index_path
+        self.reload_interval = reload_interval
+        self._table: Optional[_Table] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def _index_stale(self) -> bool:
+        if not self.index_path.exists():
+            return True
+        if self.source_path is None or not self.source_path.exists():
+            return False
+        return self.source_path.stat().st_mtime_ns > self.index_path.stat().st_mtime_ns
+
+    def _rebuild(self) -> None:
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = self.index_path.with_name(self.index_path.name + ".lock")
+        with open(lock_path, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            if self._index_stale():  # another worker may have rebuilt it meanwhile
+                stats = build_index(self.source_path, self.index_path)
+                logger.info("Rebuilt domain reputation index: %s", stats)
+
+    def _map(self) -> None:
+        st = self.index_path.stat()
+        file_id = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if self._table is not None and self._table.file_id == file_id:
+            return
+        with open(self.index_path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # The previous mapping is closed once in-flight lookups drop it.
+        self._table = _open_table(data, file_id)
+        self.reloads += 1
+
+    def _refresh(self) -> _Table:
+        table = self._table
+        now = time.monotonic()
+        if table is not None and now < self._next_check:
+            return table
+        with self._lock:
+            if self._table is not None and now < self._next_check:
+                return self._table
+            self._next_check = now + self.reload_interval
+            try:
+                if self._index_stale():
+                    self._rebuild()
+                self._map()
+            except (OSError, ValueError) as exc:
+                # Read-only or corrupt index: serve from memory rather than fail requests.
+                logger.warning("Domain reputation index unavailable (%s); building in memory", exc)
+                if self._table is None or self._table.file_id is not None:
+                    source = self.source_path
+                    entries = read_entries(source) if source is not None and source.exists() else DEFAULT_ENTRIES
+                    self._table = _open_table(build_index_bytes(entries)[0], None)
+            return self._table
+
+    def _find(self, table: _Table, key: bytes) -> int:
+        data = table.data
+        h = _hash(key)
+        i = h & table.mask
+        while True:
+            slot_hash, offset, length, code = _SLOT.unpack_from(data, _HEADER.size + i * _SLOT.size)
+            if not length:
+                return 0
+            if slot_hash == h and length == len(key):
+                start = table.blob_offset + offset
+                if data[start:start + length] == key:
+                    return code
+            i = (i + 1) & table.mask
+
+    def lookup(self, url_or_host: str) -> DomainVerdict:
+        # Checks the host and each parent domain down to the registrable
+        # domain, most specific first: one hash probe per label.
+        host = normalize_host(url_or_host)
+        if not host:
+            return DomainVerdict(UNTRUSTED, "")
+        table = self._refresh()
+        registrable = registrable_domain(host)
+        if not registrable:
+            return DomainVerdict(UNTRUSTED, host)
+        labels = host.split(".")
+        for i in range(len(labels) - registrable.count(".")):
+            candidate = ".".join(labels[i:])
+            code = self._find(table, candidate.encode("ascii", "ignore"))
+            if code:
+                return DomainVerdict(_STATUS_BY_CODE[code], host, candidate, code == OFFICIAL_CODE)
+        return DomainVerdict(UNTRUSTED, host)
+
+    def official_domains(self) -> List[str]:
+        return list(self._refresh().official)
+
+    def stats(self) -> Dict[str, object]:
+        table = self._refresh()
+        return {
+            "entries": table.entries,
+            "official": len(table.official),
+            "memory_mapped": table.file_id is not None,
+            "reloads": self.reloads,
+        }
+
+
+def _resolve(path: str) -> Path:
+    p = Path(path)
+    return p if p.is_absolute() else ROOT / p
+
+
+_INDEX: Optional[DomainReputationIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def domain_index() -> DomainReputationIndex:
+    global _INDEX
+    if _INDEX is None:
+        with _INDEX_LOCK:
+            if _INDEX is None:
+                source = _resolve(config.REPUTATION_SOURCE_PATH) if config.REPUTATION_SOURCE_PATH else None
+                _INDEX = DomainReputationIndex(
+                    source, _resolve(config.REPUTATION_INDEX_PATH), config.REPUTATION_RELOAD_INTERVAL
+                )
+    return _INDEX
+
+
+def domain_reputation(url_or_host: str) -> DomainVerdict:
+    return domain_index().lookup(url_or_host)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the domain reputation index or look up domains.")
+    parser.add_argument("--source", type=Path, default=_resolve(config.REPUTATION_SOURCE_PATH))
+    parser.add_argument("--out", type=Path, default=_resolve(config.REPUTATION_INDEX_PATH))
+    parser.add_argument("--lookup", nargs="+", metavar="DOMAIN", help="Print the verdict for these domains.")
+    args = parser.parse_args(argv)
+
+    if args.lookup:
+        index = DomainReputationIndex(args.source, args.out, reload_interval=0.0)
+        for domain in args.lookup:
+            verdict = index.lookup(domain)
+            official = " (official)" if verdict.official else ""
+            print(f"{domain}: {verdict.status}{official} matched={verdict.matched or '-'}")
+        return
+
+    start = time.perf_counter()
+    stats = build_index(args.source, args.out)
+    print(f"Built {args.out} in {time.perf_counter() - start:.2f}s: {stats}")
+
+
+if __name__ == "__main__":
+    main()
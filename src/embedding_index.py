@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src import config
+from src.portal_verifier import OfficialArticle
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent writers are not serialized.
+    fcntl = None
+
+
+ROOT = Path(__file__).resolve().parents[1]
+INDEX_VERSION = 1
+
+
+def _default_dir() -> Path:
+    path = Path(config.EMBEDDING_INDEX_DIR)
+    return path if path.is_absolute() else ROOT / path
+
+
+def _write_json(path: Path, payload: object) -> None:
+    tmp_path = path.with_suffix(path.suffix + f".{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _kmeans(data: np.ndarray, n_clusters: int, iterations: int = 15, seed: int = 42) -> np.ndarray:
+    # Spherical k-means: embeddings are L2-normalized, so assign by dot product
+    # and renormalize centroids after each update.
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(data @ centroids.T, axis=1)
+        for cluster in range(n_clusters):
+            members = data[assignments == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+            else:
+                centroids[cluster] = data[rng.integers(len(data))]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        centroids /= np.maximum(norms, 1e-12)
+    return centroids.astype(np.float32)
+
+
+class EmbeddingIndex:
+    # Official-article embeddings in a memory-mapped float32 matrix (one row per
+    # article id) with exact top-k search by a single matrix product. An optional
+    # IVF layer (k-means centroids + inverted lists) restricts the scan to the
+    # closest lists for large corpora; rows added after the IVF build are always
+    # scanned exactly until the next build.
+    def __init__(self, directory: Optional[Path] = None) -> None:
+        self.directory = Path(directory) if directory else _default_dir()
+        self.dim = 0
+        self.count = 0
+        self.capacity = 0
+        self.model_name = ""
+        self.ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._matrix: Optional[np.memmap] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._list_offsets: Optional[np.ndarray] = None
+        self._list_rows: Optional[np.ndarray] = None
+        self._ivf_count = 0
+        self._meta_mtime = 0.0
+        self._lock = threading.RLock()
+        self.reload()
+
+    @property
+    def meta_path(self) -> Path:
+        return self.directory / "meta.json"
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.directory / "vectors.f32"
+
+    @property
+    def ids_path(self) -> Path:
+        return self.directory / "ids.json"
+
+    @property
+    def ivf_path(self) -> Path:
+        return self.directory / "ivf.npz"
+
+    @property
+    def lock_path(self) -> Path:
+        return self.directory / "write.lock"
+
+    def __len__(self) -> int:
+        return self.count
+
+    def reload(self) -> None:
+        with self._lock:
+            if not self.meta_path.exists():
+                return
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            if meta.get("version") != INDEX_VERSION:
+                return
+            self._meta_mtime = self.meta_path.stat().st_mtime
+            self.dim = int(meta["dim"])
+            self.count = int(meta["count"])
+            self.capacity = int(meta["capacity"])
+            self.model_name = meta.get("model_name", "")
+            self.ids = json.loads(self.ids_path.read_text(encoding="utf-8"))[: self.count]
+            self._rows = {item_id: row for row, item_id in enumerate(self.ids)}
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.capacity, self.dim))
+            self._load_ivf()
+
+    def reload_if_changed(self) -> None:
+        try:
+            mtime = self.meta_path.stat().st_mtime
+        except OSError:
+            return
+        if mtime != self._meta_mtime:
+            self.reload()
+
+    def _load_ivf(self) -> None:
+        self._centroids = self._list_offsets = self._list_rows = None
+        self._ivf_count = 0
+        if not self.ivf_path.exists():
+            return
+        with np.load(self.ivf_path) as data:
+            if int(data["ivf_count"]) > self.count:
+                return
+            self._centroids = data["centroids"]
+            self._list_offsets = data["offsets"]
+            self._list_rows = data["rows"]
+            self._ivf_count = int(data["ivf_count"])
+
+    def _ensure_capacity(self, needed: int, dim: int) -> None:
+        if self._matrix is not None and needed <= self.capacity:
+            return
+        capacity = max(1024, self.capacity)
+        while capacity < needed:
+            capacity *= 2
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(capacity * dim * 4)
+        self.capacity = capacity
+        self.dim = dim
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        # Writers in other processes (every worker's ingester, the CLI) may have
+        # appended since this process last looked, so the on-disk count and ids
+        # are picked up under an exclusive flock before any row is written.
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_path, "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+                self._sync_from_disk()
+                yield
+
+    def _sync_from_disk(self) -> None:
+        try:
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if int(meta.get("count", 0)) != self.count or int(meta.get("capacity", 0)) != self.capacity:
+            self.reload()
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray, model_name: str = "") -> int:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(ids) != len(vectors):
+            raise ValueError("ids and vectors must align and vectors must be 2-D")
+        with self._write_lock():
+            if model_name and self.model_name and model_name != self.model_name:
+                raise ValueError(f"Index holds {self.model_name} embeddings, not {model_name}")
+            if self.dim and vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+            new_rows = [(item_id, vec) for item_id, vec in zip(ids, vectors) if item_id and item_id not in self._rows]
+            if not new_rows:
+                return 0
+            if self._matrix is not None and self._matrix.mode == "r":
+                self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dim))
+            self._ensure_capacity(self.count + len(new_rows), vectors.shape[1])
+            start = self.count
+            self._matrix[start : start + len(new_rows)] = np.stack([vec for _, vec in new_rows])
+            self._matrix.flush()
+            for offset, (item_id, _) in enumerate(new_rows):
+                self.ids.append(item_id)
+                self._rows[item_id] = start + offset
+            self.count += len(new_rows)
+            self.model_name = self.model_name or model_name
+            self._write_meta()
+            return len(new_rows)
+
+    def _write_meta(self) -> None:
+        _write_json(self.ids_path, self.ids)
+        _write_json(
+            self.meta_path,
+            {
+                "version": INDEX_VERSION,
+                "dim": self.dim,
+                "count": self.count,
+                "capacity": self.capacity,
+                "model_name": self.model_name,
+            },
+        )
+        self._meta_mtime = self.meta_path.stat().st_mtime
+
+    def vectors_for(self, ids: Sequence[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            if self._matrix is None:
+                return {}
+            return {item_id: np.asarray(self._matrix[self._rows[item_id]]) for item_id in ids if item_id in self._rows}
+
+    def build_ivf(self, n_lists: int, sample_size: int = 50000) -> None:
+        with self._write_lock():
+            if self._matrix is None or self.count < n_lists * 4:
+                return
+            data = np.asarray(self._matrix[: self.count])
+            rng = np.random.default_rng(42)
+            sample = data if self.count <= sample_size else data[rng.choice(self.count, sample_size, replace=False)]
+            centroids = _kmeans(sample, n_lists)
+            assignments = np.argmax(data @ centroids.T, axis=1)
+            order = np.argsort(assignments, kind="stable").astype(np.int64)
+            offsets = np.zeros(n_lists + 1, dtype=np.int64)
+            np.cumsum(np.bincount(assignments, minlength=n_lists), out=offsets[1:])
+            np.savez(self.ivf_path, centroids=centroids, offsets=offsets, rows=order, ivf_count=self.count)
+            self._load_ivf()
+
+    def _candidate_rows(self, query: np.ndarray, probes: int) -> Optional[np.ndarray]:
+        if self._centroids is None:
+            return None
+        probes = min(probes, len(self._centroids))
+        nearest = np.argpartition(-(self._centroids @ query), probes - 1)[:probes]
+        rows = [self._list_rows[self._list_offsets[c] : self._list_offsets[c + 1]] for c in nearest]
+        rows.append(np.arange(self._ivf_count, self.count, dtype=np.int64))
+        return np.concatenate(rows)
+
+    def search(self, query: np.ndarray, k: int = 5, probes: Optional[int] = None) -> List[Tuple[str, float]]:
+        with self._lock:
+            if self._matrix is None or self.count == 0:
+                return []
+            query = np.asarray(query, dtype=np.float32).ravel()
+            rows = self._candidate_rows(query, probes or config.EMBEDDING_IVF_PROBES)
+            if rows is None:
+                scores = self._matrix[: self.count] @ query
+                rows = np.arange(self.count)
+            else:
+                rows = np.sort(rows)
+                scores = self._matrix[rows] @ query
+            k = min(k, len(scores))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.ids[int(rows[i])], float(scores[i])) for i in top]
+
+    def search_batch(self, queries: np.ndarray, k: int = 5, chunk_size: int = 256) -> List[List[Tuple[str, float]]]:
+        queries = np.asarray(queries, dtype=np.float32)
+        with self._lock:
+            if self._matrix is None or self.count == 0:
+                return [[] for _ in range(len(queries))]
+            if self._centroids is not None:
+                return [self.search(query, k) for query in queries]
+            matrix = self._matrix[: self.count]
+            k = min(k, self.count)
+            results: List[List[Tuple[str, float]]] = []
+            for start in range(0, len(queries), chunk_size):
+                scores = queries[start : start + chunk_size] @ matrix.T
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                for row, candidates in enumerate(top):
+                    ordered = candidates[np.argsort(-scores[row, candidates])]
+                    results.append([(self.ids[int(i)], float(scores[row, i])) for i in ordered])
+            return results
+
+
+_INDEX: Optional[EmbeddingIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_embedding_index() -> EmbeddingIndex:
+    global _INDEX
+    if _INDEX is None:
+        with _INDEX_LOCK:
+            if _INDEX is None:
+                _INDEX = EmbeddingIndex()
+    _INDEX.reload_if_changed()
+    return _INDEX
+
+
+def embed_articles(articles: Sequence[OfficialArticle], index: Optional[EmbeddingIndex] = None) -> int:
+    # Writers serialize on the index's lock file (see EmbeddingIndex.add);
+    # request workers read it through the memory map.
+    from src.similarity import embedding_registry
+
+    index = index or get_embedding_index()
+    pending = [a for a in articles if a.link and a.link not in index._rows]
+    if not pending:
+        return 0
+    vectors = embedding_registry.encode([a.combined_text for a in pending])
+    if vectors is None:
+        return 0
+    return index.add([a.link for a in pending], vectors, model_name=config.EMBEDDING_MODEL_NAME)
+
+
+def main() -> None:
+    from src.article_index import get_article_index
+
+    parser = argparse.ArgumentParser(description="Build the official-article embedding index.")
+    parser.add_argument("--batch-size", type=int, default=1024, help="Articles encoded per pass.")
+    parser.add_argument(
+        "--ivf-lists",
+        type=int,
+        default=config.EMBEDDING_IVF_LISTS,
+        help="Build an IVF layer with this many lists (0 = exact search only).",
+    )
+    args = parser.parse_args()
+
+    index = get_embedding_index()
+    added = 0
+    for batch in get_article_index().iter_articles(batch_size=args.batch_size):
+        added += embed_articles(batch, index=index)
+        print(f"Encoded {added} new articles ({len(index)} total)", flush=True)
+    if args.ivf_lists:
+        index.build_ivf(args.ivf_lists)
+        print(f"Built IVF layer with {args.ivf_lists} lists over {len(index)} vectors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from src import config
+
+
+_IO_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_CPU_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_LOCK = threading.Lock()
+
+
+def io_executor() -> ThreadPoolExecutor:
+    # Portal fetches and SQLite writes: mostly waiting, so a wide pool is cheap.
+    global _IO_EXECUTOR
+    if _IO_EXECUTOR is None:
+        with _LOCK:
+            if _IO_EXECUTOR is None:
+                _IO_EXECUTOR = ThreadPoolExecutor(max_workers=config.IO_WORKERS, thread_name_prefix="fnd-io")
+    return _IO_EXECUTOR
+
+
+def cpu_executor() -> ThreadPoolExecutor:
+    # NLTK/sklearn work, sized to the core count. Running it here keeps the event
+    # loop free while numpy/scipy release the GIL for the heavy kernels.
+    global _CPU_EXECUTOR
+    if _CPU_EXECUTOR is None:
+        with _LOCK:
+            if _CPU_EXECUTOR is None:
+                _CPU_EXECUTOR = ThreadPoolExecutor(max_workers=config.CPU_WORKERS, thread_name_prefix="fnd-cpu")
+    return _CPU_EXECUTOR
+
+
+def reset_after_fork() -> None:
+    # Executors created in a gunicorn master must not be reused by forked workers.
+    global _IO_EXECUTOR, _CPU_EXECUTOR
+    _IO_EXECUTOR = None
+    _CPU_EXECUTOR = None
@@ -1,23 +1,79 @@
 from __future__ import annotations
 
-import csv
+import atexit
+import base64
+import binascii
+import json
+import logging
+import os
+import queue
 import sqlite3
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src import config
+from src.history_export import export_chunks
+from src.metrics import HISTORY_ROWS, HISTORY_WRITE_SECONDS
 
 
 ROOT = Path(__file__).resolve().parents[1]
-DB_PATH = ROOT / "data" / "history.db"
+DB_PATH = ROOT / config.HISTORY_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+
+_local = threading.local()
+
+# created_at is taken inside the INSERT, i.e. under SQLite's write lock, so new
+# rows arrive in created_at order. Older rows (stamped before connecting) and
+# DST fall-back hours with 'localtime' can be out of order, by much less than
+# this slack; date filters use it to widen their id-range seek hint.
+_CREATED_AT_SLACK = "1 day"
+_INSERT_SQL = """
+    INSERT INTO verification_history (created_at, news_summary, source_url, result, method)
+    VALUES (strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'), ?, ?, ?, ?)
+"""
+
+HistoryRow = Tuple[str, Optional[str], str, str]
+
+_DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d")
+
+
+def _configure(conn: sqlite3.Connection) -> None:
+    # WAL lets readers run alongside the single writer; NORMAL sync is durable
+    # at checkpoints and avoids an fsync per commit.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute(f"PRAGMA cache_size=-{config.HISTORY_CACHE_KB}")
+    conn.execute(f"PRAGMA mmap_size={config.HISTORY_MMAP_BYTES}")
 
 
 def get_connection() -> sqlite3.Connection:
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    # One persistent connection per thread (and per process: a connection
+    # inherited through fork is never reused). Callers must not close it.
+    key = (os.getpid(), str(DB_PATH))
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "key", None) != key:
+        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(DB_PATH, timeout=config.HISTORY_BUSY_TIMEOUT)
+        conn.row_factory = sqlite3.Row
+        _configure(conn)
+        _local.conn = conn
+        _local.key = key
     return conn
 
 
+def close_connection() -> None:
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
 def init_db() -> None:
     with get_connection() as conn:
         conn.execute(
@@ -32,6 +88,41 @@ def init_db() -> None:
             )
             """
         )
+        has_counts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'verification_history_counts'"
+        ).fetchone()
+        # Keyset pages walk (filter, id) indexes backwards; created_at bounds a
+        # date range to an id range. Row counts per (day, result, method) are
+        # kept by a trigger so totals never need a COUNT(*) scan.
+        conn.executescript(
+            """
+            CREATE INDEX IF NOT EXISTS idx_history_result_id ON verification_history(result, id);
+            CREATE INDEX IF NOT EXISTS idx_history_method_id ON verification_history(method, id);
+            CREATE INDEX IF NOT EXISTS idx_history_created_at ON verification_history(created_at);
+            CREATE TABLE IF NOT EXISTS verification_history_counts (
+                day TEXT NOT NULL,
+                result TEXT NOT NULL,
+                method TEXT NOT NULL,
+                n INTEGER NOT NULL,
+                PRIMARY KEY (day, result, method)
+            ) WITHOUT ROWID;
+            CREATE TRIGGER IF NOT EXISTS verification_history_count_ai
+            AFTER INSERT ON verification_history BEGIN
+                INSERT INTO verification_history_counts (day, result, method, n)
+                VALUES (substr(new.created_at, 1, 10), new.result, new.method, 1)
+                ON CONFLICT (day, result, method) DO UPDATE SET n = n + 1;
+            END;
+            """
+        )
+        if not has_counts:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO verification_history_counts (day, result, method, n)
+                SELECT substr(created_at, 1, 10), result, method, COUNT(*)
+                FROM verification_history
+                GROUP BY 1, 2, 3
+                """
+            )
         conn.commit()
 
 
@@ -42,58 +133,369 @@ def summarize_text(text: str, max_len: int = 140) -> str:
     return clean[: max_len - 3] + "..."
 
 
+def _history_row(news_text: str, source_url: str, result: str, method: str) -> HistoryRow:
+    return (summarize_text(news_text), source_url or None, result, method)
+
+
+def _insert_rows(rows: Sequence[HistoryRow]) -> None:
+    if not rows:
+        return
+    with HISTORY_WRITE_SECONDS.time():
+        with get_connection() as conn:
+            conn.executemany(_INSERT_SQL, rows)
+    HISTORY_ROWS.inc(len(rows))
+
+
+class HistoryWriter:
+    # Write-behind queue: request threads enqueue rows and a daemon thread
+    # inserts them in batched transactions. A full queue falls back to a
+    # synchronous insert. A failed batch is retried with backoff and then held
+    # for the next pass, so a busy or locked database delays rows instead of
+    # dropping them.
+    RETRIES = 3
+    RETRY_DELAY = 0.05
+
+    def __init__(self, batch_size: int, flush_interval: float, max_queued: int) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[HistoryRow]" = queue.Queue(maxsize=max_queued)
+        self._held: List[HistoryRow] = []
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.pid = os.getpid()
+        self.batches = 0
+        self.rows_written = 0
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, rows: Sequence[HistoryRow]) -> None:
+        for row in rows:
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                self.flush()
+                _insert_rows([row])
+
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._held)
+
+    def _drain(self, first: Optional[HistoryRow] = None) -> List[HistoryRow]:
+        # Held rows from a failed pass go first; called under _flush_lock.
+        batch = list(self._held)
+        if first is not None:
+            batch.append(first)
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self) -> int:
+        # Writes everything queued so far; safe to call from any thread.
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain()
+                if not batch:
+                    return written
+                written += self._write(batch)
+                if self._held:
+                    # The database is still failing; the next pass retries.
+                    return written
+
+    def _write(self, batch: List[HistoryRow]) -> int:
+        for attempt in range(self.RETRIES):
+            try:
+                _insert_rows(batch)
+            except sqlite3.Error:
+                if attempt < self.RETRIES - 1:
+                    time.sleep(self.RETRY_DELAY * (2**attempt))
+                else:
+                    logger.exception("History insert of %d rows failed; holding them for the next pass", len(batch))
+            else:
+                self._held = []
+                self.batches += 1
+                self.rows_written += len(batch)
+                return len(batch)
+        # At most one batch is held: while it is, the queue is not drained
+        # past it, so a full queue pushes new rows to the synchronous insert
+        # in submit() and the error reaches the caller there.
+        self._held = batch
+        return 0
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self._held:
+                # Retry the held batch before taking anything new off the queue.
+                self._stop.wait(self.flush_interval)
+                self.flush()
+                continue
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            with self._flush_lock:
+                self._write(self._drain(first))
+
+    def close(self) -> None:
+        self._stop.set()
+        self.flush()
+        if self._held:
+            logger.error("Exiting with %d unwritten history rows", len(self._held))
+
+
+_WRITER: Optional[HistoryWriter] = None
+_WRITER_LOCK = threading.Lock()
+
+
+def history_writer() -> HistoryWriter:
+    # Created lazily in the process that uses it; a writer inherited from a
+    # preloading gunicorn master has no thread and is replaced.
+    global _WRITER
+    if _WRITER is None or _WRITER.pid != os.getpid():
+        with _WRITER_LOCK:
+            if _WRITER is None or _WRITER.pid != os.getpid():
+                _WRITER = HistoryWriter(
+                    batch_size=config.HISTORY_BATCH_SIZE,
+                    flush_interval=config.HISTORY_FLUSH_INTERVAL,
+                    max_queued=config.HISTORY_QUEUE_SIZE,
+                )
+    return _WRITER
+
+
+def flush_history() -> None:
+    writer = _WRITER
+    if writer is not None and writer.pid == os.getpid():
+        writer.flush()
+
+
+atexit.register(flush_history)
+
+
+def _save_rows(rows: Sequence[HistoryRow]) -> None:
+    if config.HISTORY_WRITE_BEHIND:
+        history_writer().submit(rows)
+    else:
+        _insert_rows(rows)
+
+
 def save_history(news_text: str, source_url: str, result: str, method: str) -> None:
-    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    summary = summarize_text(news_text)
-    with get_connection() as conn:
-        conn.execute(
-            """
-            INSERT INTO verification_history (created_at, news_summary, source_url, result, method)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (created_at, summary, source_url or None, result, method),
-        )
-        conn.commit()
+    _save_rows([_history_row(news_text, source_url, result, method)])
 
 
-def fetch_history(limit: int = 50, offset: int = 0, result_filter: Optional[str] = None) -> List[Dict[str, str]]:
-    query = """
-        SELECT id, created_at, news_summary, source_url, result, method
-        FROM verification_history
-    """
-    params = []
+def save_history_batch(rows: Sequence[Tuple[str, str, str, str]]) -> None:
+    # rows: (news_text, source_url, result, method), written in one transaction.
+    if not rows:
+        return
+    _save_rows([_history_row(news_text, source_url, result, method) for news_text, source_url, result, method in rows])
+
+
+def parse_history_date(value: str, end_of_day: bool = False) -> str:
+    # Accepts "YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS"; a bare end date covers the whole day.
+    value = (value or "").strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if fmt == "%Y-%m-%d" and end_of_day:
+            parsed = parsed.replace(hour=23, minute=59, second=59)
+        return parsed.strftime("%Y-%m-%d %H:%M:%S")
+    raise ValueError(f"Invalid date {value!r}; use YYYY-MM-DD or YYYY-MM-DD HH:MM:SS.")
+
+
+def encode_cursor(last_id: int) -> str:
+    payload = json.dumps({"v": 1, "before": int(last_id)}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return int(payload["before"])
+    except (ValueError, KeyError, TypeError, binascii.Error) as exc:
+        raise ValueError("Invalid cursor.") from exc
+
+
+def _id_bounds(conn: sqlite3.Connection, date_from: Optional[str], date_to: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    # Seek hint only: one lookup on idx_history_created_at at each end finds a
+    # row at least _CREATED_AT_SLACK outside the range, so every row inside it
+    # lies between those ids even when created_at is not monotonic in id.
+    # The exact created_at predicates are applied on top.
+    low = high = None
+    if date_from:
+        row = conn.execute(
+            "SELECT id FROM verification_history WHERE created_at < datetime(?, ?) "
+            "ORDER BY created_at DESC, id DESC LIMIT 1",
+            (date_from, f"-{_CREATED_AT_SLACK}"),
+        ).fetchone()
+        low = row[0] if row else None
+    if date_to:
+        row = conn.execute(
+            "SELECT id FROM verification_history WHERE created_at > datetime(?, ?) ORDER BY created_at, id LIMIT 1",
+            (date_to, f"+{_CREATED_AT_SLACK}"),
+        ).fetchone()
+        high = row[0] if row else None
+    return low, high
+
+
+def _history_where(
+    conn: sqlite3.Connection,
+    result_filter: Optional[str],
+    method: Optional[str],
+    date_from: Optional[str],
+    date_to: Optional[str],
+    before_id: Optional[int],
+) -> Tuple[str, List[object]]:
+    clauses: List[str] = []
+    params: List[object] = []
     if result_filter:
-        query += " WHERE result = ?"
+        clauses.append("result = ?")
         params.append(result_filter)
-    query += " ORDER BY id DESC LIMIT ? OFFSET ?"
-    params.extend([limit, offset])
+    if method:
+        clauses.append("method = ?")
+        params.append(method)
+    low, high = _id_bounds(conn, date_from, date_to)
+    if low is not None:
+        clauses.append("id > ?")
+        params.append(low)
+    if high is not None:
+        clauses.append("id < ?")
+        params.append(high)
+    if date_from:
+        clauses.append("created_at >= ?")
+        params.append(date_from)
+    if date_to:
+        clauses.append("created_at <= ?")
+        params.append(date_to)
+    if before_id is not None:
+        clauses.append("id < ?")
+        params.append(before_id)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
 
-    with get_connection() as conn:
-        rows = conn.execute(query, params).fetchall()
+
+def fetch_history(
+    limit: int = 50,
+    offset: int = 0,
+    result_filter: Optional[str] = None,
+    method: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    before_id: Optional[int] = None,
+) -> List[Dict[str, str]]:
+    # Rows still waiting in this process's write-behind queue become visible first.
+    flush_history()
+    conn = get_connection()
+    where, params = _history_where(conn, result_filter, method, date_from, date_to, before_id)
+    query = f"""
+        SELECT id, created_at, news_summary, source_url, result, method
+        FROM verification_history{where}
+        ORDER BY id DESC LIMIT ?
+    """
+    params.append(limit)
+    if offset:
+        query += " OFFSET ?"
+        params.append(offset)
+    rows = conn.execute(query, params).fetchall()
     return [dict(row) for row in rows]
 
 
+def fetch_history_page(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    result_filter: Optional[str] = None,
+    method: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+) -> Dict[str, object]:
+    # Keyset pagination: the cursor carries the last id served, so every page
+    # is an index seek regardless of depth. offset is kept for page-number
+    # clients and is only applied when no cursor is given.
+    before_id = decode_cursor(cursor) if cursor else None
+    rows = fetch_history(
+        limit=limit + 1,
+        offset=0 if cursor else offset,
+        result_filter=result_filter,
+        method=method,
+        date_from=date_from,
+        date_to=date_to,
+        before_id=before_id,
+    )
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(items[-1]["id"]) if has_more and items else None,
+    }
+
+
+def approximate_count(
+    result_filter: Optional[str] = None,
+    method: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+) -> int:
+    # Summed from the per-day counter table: exact for whole-day ranges,
+    # approximate when a range starts or ends inside a day.
+    clauses: List[str] = []
+    params: List[object] = []
+    if result_filter:
+        clauses.append("result = ?")
+        params.append(result_filter)
+    if method:
+        clauses.append("method = ?")
+        params.append(method)
+    if date_from:
+        clauses.append("day >= ?")
+        params.append(date_from[:10])
+    if date_to:
+        clauses.append("day <= ?")
+        params.append(date_to[:10])
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    flush_history()
+    row = get_connection().execute(f"SELECT COALESCE(SUM(n), 0) FROM verification_history_counts{where}", params).fetchone()
+    return int(row[0])
+
+
 def clear_history() -> None:
+    flush_history()
     with get_connection() as conn:
         conn.execute("DELETE FROM verification_history")
+        conn.execute("DELETE FROM verification_history_counts")
         conn.commit()
 
 
+def iter_history(
+    result_filter: Optional[str] = None,
+    method: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    batch_size: int = 2000,
+) -> Iterator[Dict[str, str]]:
+    # Walks the table newest-first in keyset batches. Each batch is a short
+    # read, so a long export never pins a WAL snapshot or blocks checkpoints.
+    before_id = None
+    while True:
+        rows = fetch_history(
+            limit=batch_size,
+            result_filter=result_filter,
+            method=method,
+            date_from=date_from,
+            date_to=date_to,
+            before_id=before_id,
+        )
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        before_id = rows[-1]["id"]
+
+
 def export_history_to_csv(csv_path: Path) -> Path:
-    rows = fetch_history(limit=1_000_000, offset=0, result_filter=None)
     csv_path.parent.mkdir(parents=True, exist_ok=True)
-    with csv_path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["Date", "News Summary", "Source", "Result", "Method"])
-        for row in rows:
-            writer.writerow(
-                [
-                    row["created_at"],
-                    row["news_summary"],
-                    row["source_url"] or "",
-                    row["result"],
-                    row["method"],
-                ]
-            )
+    with csv_path.open("wb") as f:
+        for chunk in export_chunks(iter_history(), "csv"):
+            f.write(chunk)
     return csv_path
-
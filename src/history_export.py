@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+MIMETYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+CSV_HEADER = ["Date", "News Summary", "Source", "Result", "Method"]
+FIELDS = ["id", "created_at", "news_summary", "source_url", "result", "method"]
+
+# Rows are buffered until roughly this many bytes before a chunk is emitted.
+CHUNK_BYTES = 64 * 1024
+PARQUET_ROW_GROUP = 50_000
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _csv_chunks(rows: Iterable[Dict[str, object]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    for row in rows:
+        writer.writerow(
+            [
+                row["created_at"],
+                row["news_summary"],
+                row["source_url"] or "",
+                row["result"],
+                row["method"],
+            ]
+        )
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_chunks(rows: Iterable[Dict[str, object]]) -> Iterator[bytes]:
+    parts: List[str] = []
+    size = 0
+    for row in rows:
+        line = json.dumps({field: row[field] for field in FIELDS}, ensure_ascii=False) + "\n"
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(parts).encode("utf-8")
+            parts, size = [], 0
+    if parts:
+        yield "".join(parts).encode("utf-8")
+
+
+class _DrainableSink(io.RawIOBase):
+    # Write-only file object for pyarrow; bytes written so far are taken out
+    # with drain() and sent, so the whole file is never held in memory.
+    def __init__(self) -> None:
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._parts.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet_chunks(rows: Iterable[Dict[str, object]]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            ("id", pa.int64()),
+            ("created_at", pa.string()),
+            ("news_summary", pa.string()),
+            ("source_url", pa.string()),
+            ("result", pa.string()),
+            ("method", pa.string()),
+        ]
+    )
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    batch: Dict[str, List[object]] = {field: [] for field in FIELDS}
+
+    def write_batch() -> Optional[bytes]:
+        if not batch["id"]:
+            return None
+        writer.write_table(pa.Table.from_pydict(batch, schema=schema))
+        for values in batch.values():
+            values.clear()
+        return sink.drain()
+
+    for row in rows:
+        for field in FIELDS:
+            batch[field].append(row[field])
+        if len(batch["id"]) >= PARQUET_ROW_GROUP:
+            data = write_batch()
+            if data:
+                yield data
+    data = write_batch()
+    if data:
+        yield data
+    writer.close()
+    tail = sink.drain()
+    if tail:
+        yield tail
+
+
+def export_chunks(rows: Iterable[Dict[str, object]], fmt: str = "csv") -> Iterator[bytes]:
+    if fmt == "csv":
+        return _csv_chunks(rows)
+    if fmt == "ndjson":
+        return _ndjson_chunks(rows)
+    if fmt == "parquet":
+        return _parquet_chunks(rows)
+    raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}.")
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_filename(fmt: str, gzip: bool) -> str:
+    return f"history_export.{fmt}" + (".gz" if gzip else "")
@@ -1,12 +1,27 @@
 from __future__ import annotations
 
-from typing import Dict, Optional
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
+
+from src import config
+from src.article_index import get_article_index
 from src.decision_engine import make_final_decision
-from src.portal_verifier import fetch_official_articles
-from src.preprocess import extract_entities, extract_keywords, preprocess_text
-from src.similarity import embedding_similarity_score, tfidf_similarity_score
-from src.source_verifier import is_trusted_source, normalize_domain
+from src.domain_reputation import TRUSTED, UNTRUSTED
+from src.embedding_index import get_embedding_index
+from src.executors import cpu_executor, io_executor
+from src.metrics import MODEL_INFERENCE_SECONDS, MODEL_PREDICTIONS, observe_stage
+from src.portal_verifier import OfficialArticle, fetch_official_articles, portal_breaker
+from src.preprocess import TextAnalysis, analyze_text, extract_entities
+from src.result_cache import result_cache
+from src.similarity import embedding_registry
+from src.source_verifier import normalize_domain, source_reputation
+from src.stages import StageRecorder
+from src.tfidf_space import portal_tfidf_similarity
 
 
 def _result_category(final_label: str) -> str:
@@ -26,24 +41,225 @@ def _method_label(decision_path: str) -> str:
     return "Machine Learning"
 
 
-def analyze_news(text: str, source_url: str, model_bundle: Dict[str, object]) -> Dict[str, object]:
-    source_domain = normalize_domain(source_url) if source_url else None
-    cleaned_for_model = preprocess_text(text)
-    keywords = extract_keywords(text)
-    entities = extract_entities(text)
+def _gather_official_articles(
+    text: str, analysis: TextAnalysis
+) -> Tuple[List[OfficialArticle], str, Optional[Tuple[float, int]]]:
+    # The third item is the TF-IDF (score, idx) when it was already computed
+    # for the returned articles (local index hits), so it is not scored twice.
+    local: List[OfficialArticle] = []
+    local_scored: Optional[Tuple[float, int]] = None
+    if config.ARTICLE_INDEX_ENABLED:
+        local = get_article_index().search(analysis.keywords(), k=config.ARTICLE_INDEX_TOP_K)
+        if local:
+            local_scored = portal_tfidf_similarity(text, local)
+            if local_scored[0] >= config.LOCAL_MATCH_THRESHOLD:
+                return local, "local_index", local_scored
+
+    articles = fetch_official_articles(text, analysis=analysis)
+    if not articles:
+        if local:
+            return local, "local_index", local_scored
+        # With the breaker open nothing was fetched; the verdict falls to the classifier.
+        return local, "circuit_open" if portal_breaker.is_open() else "live", None
+    if config.ARTICLE_INDEX_ENABLED:
+        get_article_index().add_articles(articles)
+    return articles, "live", None
+
+
+# Stage note when the local-index lookup already scored the candidates.
+_LOCAL_SCORED = "scored during the local index lookup"
+
+# Similarity at or above this marks a claim as verified by an official portal.
+PORTAL_THRESHOLD = 0.62
+
+
+@dataclass
+class _Evidence:
+    text: str
+    source_url: str
+    source_domain: Optional[str]
+    analysis: TextAnalysis
+    keywords: List[str]
+    entities: List[str]
+    source_reputation: str
+    full_explanation: bool
+    stages: StageRecorder
+    articles: List[OfficialArticle] = field(default_factory=list)
+    portal_source: Optional[str] = None
+    # None means the stage was skipped because the outcome was already decided.
+    tfidf_score: Optional[float] = None
+    tfidf_idx: int = -1
+    emb_score: Optional[float] = None
+    emb_idx: int = -1
+
+    @property
+    def trusted_source(self) -> bool:
+        return self.source_reputation == TRUSTED
+
+    @property
+    def best_similarity(self) -> float:
+        return max(self.tfidf_score or 0.0, self.emb_score or 0.0)
+
+    @property
+    def portal_needed(self) -> bool:
+        # A trusted source URL already fixes the verdict.
+        return self.full_explanation or not self.trusted_source
+
+    @property
+    def embedding_needed(self) -> bool:
+        if not self.portal_needed:
+            return False
+        return self.full_explanation or (self.tfidf_score or 0.0) < PORTAL_THRESHOLD
+
+    @property
+    def ml_needed(self) -> bool:
+        # The trusted-source verdict never consults the classifier, and once
+        # portal similarity clears the threshold make_final_decision ignores it.
+        if self.trusted_source:
+            return False
+        return self.full_explanation or self.best_similarity < PORTAL_THRESHOLD
+
+
+def _skip_reason(ev: _Evidence) -> str:
+    if ev.trusted_source:
+        return "trusted_source_url"
+    return "portal_similarity_above_threshold"
+
 
-    trusted_source = is_trusted_source(source_url) if source_url else False
-    articles = fetch_official_articles(text)
-    article_texts = [a.combined_text for a in articles]
+def _start_evidence(
+    text: str,
+    source_url: str,
+    analysis: TextAnalysis,
+    entities: List[str],
+    reputation: str,
+    full_explanation: bool,
+    stages: StageRecorder,
+) -> _Evidence:
+    return _Evidence(
+        text=text,
+        source_url=source_url,
+        source_domain=normalize_domain(source_url) if source_url else None,
+        analysis=analysis,
+        keywords=analysis.keywords(),
+        entities=entities,
+        source_reputation=reputation,
+        full_explanation=full_explanation,
+        stages=stages,
+    )
+
+
+def _collect_evidence(text: str, source_url: str, full_explanation: bool = False) -> _Evidence:
+    # Cheap stages first; the portal fetch and TF-IDF only run when a trusted
+    # source URL has not already decided the verdict.
+    stages = StageRecorder()
+    with stages.stage("preprocess"):
+        analysis = analyze_text(text)
+    with stages.stage("source_check"):
+        reputation = source_reputation(source_url) if source_url else UNTRUSTED
+    entities: List[str] = []
+    if config.ENTITY_MODE == "off":
+        stages.skip("entities", "entity extraction disabled")
+    else:
+        with stages.stage("entities"):
+            entities = extract_entities(text)
+    ev = _start_evidence(text, source_url, analysis, entities, reputation, full_explanation, stages)
+
+    if not ev.portal_needed:
+        stages.skip("portal_fetch", _skip_reason(ev))
+        stages.skip("tfidf_similarity", _skip_reason(ev))
+        return ev
+    with stages.stage("portal_fetch"):
+        ev.articles, ev.portal_source, scored = _gather_official_articles(text, analysis)
+    if scored is not None:
+        ev.tfidf_score, ev.tfidf_idx = scored
+        stages.skip("tfidf_similarity", _LOCAL_SCORED)
+    else:
+        with stages.stage("tfidf_similarity"):
+            ev.tfidf_score, ev.tfidf_idx = portal_tfidf_similarity(text, ev.articles)
+    return ev
+
+
+def _attach_embedding_scores(evidence: Sequence[_Evidence]) -> None:
+    index = get_embedding_index() if config.EMBEDDING_INDEX_ENABLED else None
+    use_index = index is not None and len(index) > 0 and index.model_name == config.EMBEDDING_MODEL_NAME
+    for ev in evidence:
+        ev.emb_score, ev.emb_idx = 0.0, -1
+    active = [ev for ev in evidence if ev.text.strip() and (ev.articles or use_index)]
+    if not active:
+        return
+
+    # One encode call for the whole batch: every query text plus each distinct
+    # candidate that has no stored vector in the embedding index.
+    stored = index.vectors_for([a.link for ev in active for a in ev.articles]) if use_index else {}
+    positions: Dict[str, int] = {}
+    for ev in active:
+        positions.setdefault(ev.text, len(positions))
+        for article in ev.articles:
+            if article.link not in stored:
+                positions.setdefault(article.combined_text, len(positions))
+    try:
+        encoded = embedding_registry.encode(list(positions))
+    except Exception:
+        return
+    if encoded is None:
+        return
+
+    queries = np.stack([encoded[positions[ev.text]] for ev in active])
+    hits_per_query = index.search_batch(queries, k=config.EMBEDDING_INDEX_TOP_K) if use_index else None
+    for row, ev in enumerate(active):
+        query = queries[row]
+        if ev.articles:
+            vectors = np.stack(
+                [stored[a.link] if a.link in stored else encoded[positions[a.combined_text]] for a in ev.articles]
+            )
+            scores = vectors @ query
+            ev.emb_idx = int(np.argmax(scores))
+            ev.emb_score = float(scores[ev.emb_idx])
+        if hits_per_query is None:
+            continue
 
-    tfidf_score, tfidf_idx = tfidf_similarity_score(text, article_texts)
-    emb_score, emb_idx = embedding_similarity_score(text, article_texts)
-    similarity_score = max(tfidf_score, emb_score)
-    best_idx = tfidf_idx if tfidf_score >= emb_score else emb_idx
+        # A stored official article closer than every fetched candidate joins the
+        # candidate list.
+        present = {a.link for a in ev.articles}
+        hits = [(link, score) for link, score in hits_per_query[row] if link not in present]
+        if hits and (ev.emb_idx < 0 or hits[0][1] > ev.emb_score):
+            extra = get_article_index().get_by_links([hits[0][0]])
+            if extra:
+                ev.articles = ev.articles + extra
+                ev.emb_score, ev.emb_idx = hits[0][1], len(ev.articles) - 1
+
+
+def _ml_predictions(processed: Sequence[str], model_bundle: Dict[str, object]) -> List[Tuple[str, float]]:
+    if not processed:
+        return []
+    model = model_bundle["model"]
+    label_map = model_bundle.get("label_map", {0: "Fake", 1: "Real"})
+    with MODEL_INFERENCE_SECONDS.time():
+        vectorized = model_bundle["vectorizer"].transform(list(processed))
+        if hasattr(model, "predict_proba"):
+            probs = model.predict_proba(vectorized)
+            classes = getattr(model, "classes_", np.arange(probs.shape[1]))
+            best = np.argmax(probs, axis=1)
+            preds = [int(classes[i]) for i in best]
+            confidences = [float(probs[row, i]) for row, i in enumerate(best)]
+        else:
+            preds = [int(p) for p in model.predict(vectorized)]
+            confidences = [0.5] * len(preds)
+    MODEL_PREDICTIONS.inc(len(preds))
+    return [(label_map.get(pred, str(pred)), conf) for pred, conf in zip(preds, confidences)]
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 4)
+
+
+def _build_result(ev: _Evidence, ml: Optional[Tuple[str, float]]) -> Dict[str, object]:
+    similarity_score = ev.best_similarity
+    best_idx = ev.tfidf_idx if (ev.tfidf_score or 0.0) >= (ev.emb_score or 0.0) else ev.emb_idx
 
     matched_article: Optional[Dict[str, str]] = None
-    if best_idx >= 0 and best_idx < len(articles):
-        matched = articles[best_idx]
+    if best_idx >= 0 and best_idx < len(ev.articles):
+        matched = ev.articles[best_idx]
         matched_article = {
             "title": matched.title,
             "link": matched.link,
@@ -51,8 +267,16 @@ def analyze_news(text: str, source_url: str, model_bundle: Dict[str, object]) ->
             "similarity_score": round(similarity_score, 4),
         }
 
-    # If URL itself is trusted, we still keep similarity details for explanation.
-    if trusted_source:
+    computed = ev.tfidf_score is not None or ev.emb_score is not None
+    similarity = {
+        "tfidf": _round(ev.tfidf_score),
+        "embedding": _round(ev.emb_score),
+        "best": round(similarity_score, 4) if computed else None,
+    }
+
+    # If URL itself is trusted, similarity details are kept for explanation when
+    # they were computed (full explanation mode).
+    if ev.trusted_source:
         final_label = "Real News (Verified Official Source)"
         decision_path = "trusted_source_url"
         return {
@@ -63,31 +287,24 @@ def analyze_news(text: str, source_url: str, model_bundle: Dict[str, object]) ->
             "reasoning": "Input source URL belongs to trusted official domain.",
             "decision_path": decision_path,
             "confidence": 1.0,
-            "source_domain": source_domain,
-            "keywords": keywords,
-            "entities": entities,
-            "similarity": {
-                "tfidf": round(tfidf_score, 4),
-                "embedding": round(emb_score, 4),
-                "best": round(similarity_score, 4),
-            },
+            "source_domain": ev.source_domain,
+            "source_reputation": ev.source_reputation,
+            "keywords": ev.keywords,
+            "entities": ev.entities,
+            "similarity": similarity,
             "matched_article": matched_article,
-            "official_articles_checked": len(articles),
+            "official_articles_checked": len(ev.articles),
+            "portal_source": ev.portal_source,
         }
 
-    vectorized = model_bundle["vectorizer"].transform([cleaned_for_model])
-    pred_num = int(model_bundle["model"].predict(vectorized)[0])
-    pred_label = model_bundle.get("label_map", {0: "Fake", 1: "Real"}).get(pred_num, str(pred_num))
-    ml_confidence = 0.5
-    if hasattr(model_bundle["model"], "predict_proba"):
-        ml_probs = model_bundle["model"].predict_proba(vectorized)[0]
-        ml_confidence = float(max(ml_probs))
-
+    # ml is None when the classifier was skipped because the portal already
+    # verified the claim; make_final_decision does not read it in that case.
+    pred_label, ml_confidence = ml if ml is not None else (None, None)
     decision = make_final_decision(
         portal_score=similarity_score,
-        portal_threshold=0.62,
-        ml_label=pred_label,
-        ml_confidence=ml_confidence,
+        portal_threshold=PORTAL_THRESHOLD,
+        ml_label=pred_label or "",
+        ml_confidence=ml_confidence or 0.0,
         matched_article=matched_article,
     )
 
@@ -99,14 +316,249 @@ def analyze_news(text: str, source_url: str, model_bundle: Dict[str, object]) ->
         "reasoning": decision["reasoning"],
         "decision_path": decision["decision_path"],
         "confidence": ml_confidence,
-        "source_domain": source_domain,
-        "keywords": keywords,
-        "entities": entities,
-        "similarity": {
-            "tfidf": round(tfidf_score, 4),
-            "embedding": round(emb_score, 4),
-            "best": round(similarity_score, 4),
-        },
+        "source_domain": ev.source_domain,
+        "source_reputation": ev.source_reputation,
+        "keywords": ev.keywords,
+        "entities": ev.entities,
+        "similarity": similarity,
         "matched_article": decision["matched_article"],
-        "official_articles_checked": len(articles),
+        "official_articles_checked": len(ev.articles),
+        "portal_source": ev.portal_source,
     }
+
+
+def _finish(ev: _Evidence, ml: Optional[Tuple[str, float]]) -> Dict[str, object]:
+    with ev.stages.stage("decision"):
+        result = _build_result(ev, ml)
+    result["full_explanation"] = ev.full_explanation
+    result["stages"] = ev.stages.as_list()
+    return result
+
+
+def _cache_lookup(text: str, source_url: str, full_explanation: bool) -> Tuple[Optional[Dict[str, object]], float]:
+    if not config.RESULT_CACHE_ENABLED:
+        return None, 0.0
+    start = time.perf_counter()
+    cached = result_cache.get(text, source_url, full_explanation)
+    elapsed = time.perf_counter() - start
+    if cached is not None:
+        stages = StageRecorder()
+        stages.record("result_cache", elapsed, hit=True)
+        cached["stages"] = stages.as_list()
+    return cached, elapsed
+
+
+def _cache_store(
+    text: str,
+    source_url: str,
+    full_explanation: bool,
+    result: Dict[str, object],
+    lookup_seconds: float,
+) -> Dict[str, object]:
+    if not config.RESULT_CACHE_ENABLED:
+        return result
+    result_cache.put(text, source_url, result, full_explanation)
+    result["cache"] = {"hit": False}
+    observe_stage("result_cache", lookup_seconds)
+    lookup_ms = round(lookup_seconds * 1000, 3)
+    result["stages"].insert(0, {"name": "result_cache", "ran": True, "ms": lookup_ms, "hit": False})
+    return result
+
+
+def analyze_news(
+    text: str,
+    source_url: str,
+    model_bundle: Dict[str, object],
+    full_explanation: bool = False,
+    use_cache: bool = True,
+) -> Dict[str, object]:
+    cached, lookup_seconds = _cache_lookup(text, source_url, full_explanation) if use_cache else (None, 0.0)
+    if cached is not None:
+        return cached
+    result = _analyze_uncached(text, source_url, model_bundle, full_explanation)
+    return _cache_store(text, source_url, full_explanation, result, lookup_seconds) if use_cache else result
+
+
+def _analyze_uncached(
+    text: str,
+    source_url: str,
+    model_bundle: Dict[str, object],
+    full_explanation: bool,
+) -> Dict[str, object]:
+    ev = _collect_evidence(text, source_url, full_explanation)
+    if ev.embedding_needed:
+        with ev.stages.stage("embedding_similarity"):
+            _attach_embedding_scores([ev])
+    else:
+        ev.stages.skip("embedding_similarity", _skip_reason(ev))
+
+    ml = None
+    if ev.ml_needed:
+        with ev.stages.stage("ml_inference"):
+            ml = _ml_predictions([ev.analysis.processed], model_bundle)[0]
+    else:
+        ev.stages.skip("ml_inference", _skip_reason(ev))
+    return _finish(ev, ml)
+
+
+async def analyze_news_async(
+    text: str,
+    source_url: str,
+    model_bundle: Dict[str, object],
+    full_explanation: bool = False,
+    use_cache: bool = True,
+) -> Dict[str, object]:
+    cached, lookup_seconds = _cache_lookup(text, source_url, full_explanation) if use_cache else (None, 0.0)
+    if cached is not None:
+        return cached
+    result = await _analyze_uncached_async(text, source_url, model_bundle, full_explanation)
+    return _cache_store(text, source_url, full_explanation, result, lookup_seconds) if use_cache else result
+
+
+async def _analyze_uncached_async(
+    text: str,
+    source_url: str,
+    model_bundle: Dict[str, object],
+    full_explanation: bool,
+) -> Dict[str, object]:
+    # Same result as analyze_news, but the portal fetch (I/O pool) overlaps entity
+    # extraction and ML inference (CPU pool), and the event loop never blocks.
+    loop = asyncio.get_running_loop()
+    cpu, io = cpu_executor(), io_executor()
+    stages = StageRecorder()
+
+    analysis = await loop.run_in_executor(cpu, stages.timed("preprocess", analyze_text), text)
+    with stages.stage("source_check"):
+        reputation = source_reputation(source_url) if source_url else UNTRUSTED
+    entities_task = None
+    if config.ENTITY_MODE == "off":
+        stages.skip("entities", "entity extraction disabled")
+    else:
+        entities_task = loop.run_in_executor(cpu, stages.timed("entities", extract_entities), text)
+    # The classifier is cheap, so for untrusted sources it runs speculatively
+    # while the portal fetch is in flight; its answer is dropped if the portal
+    # verifies the claim.
+    ml_task = None
+    ml_stages = StageRecorder()
+    if reputation != TRUSTED:
+        predict = ml_stages.timed("ml_inference", _ml_predictions)
+        ml_task = loop.run_in_executor(cpu, predict, [analysis.processed], model_bundle)
+
+    ev = _start_evidence(text, source_url, analysis, [], reputation, full_explanation, stages)
+    if ev.portal_needed:
+        gather = stages.timed("portal_fetch", _gather_official_articles)
+        ev.articles, ev.portal_source, scored = await loop.run_in_executor(io, gather, text, analysis)
+        if scored is not None:
+            ev.tfidf_score, ev.tfidf_idx = scored
+            stages.skip("tfidf_similarity", _LOCAL_SCORED)
+        else:
+            score = stages.timed("tfidf_similarity", portal_tfidf_similarity)
+            ev.tfidf_score, ev.tfidf_idx = await loop.run_in_executor(cpu, score, text, ev.articles)
+    else:
+        stages.skip("portal_fetch", _skip_reason(ev))
+        stages.skip("tfidf_similarity", _skip_reason(ev))
+
+    if ev.embedding_needed:
+        await loop.run_in_executor(cpu, stages.timed("embedding_similarity", _attach_embedding_scores), [ev])
+    else:
+        stages.skip("embedding_similarity", _skip_reason(ev))
+
+    if entities_task is not None:
+        ev.entities = await entities_task
+    ml = None
+    if ml_task is not None and ev.ml_needed:
+        ml = (await ml_task)[0]
+        stages.merge(ml_stages)
+    else:
+        if ml_task is not None:
+            ml_task.cancel()
+        stages.skip("ml_inference", _skip_reason(ev))
+    return _finish(ev, ml)
+
+
+def analyze_news_batch(
+    items: Sequence[Dict[str, str]],
+    model_bundle: Dict[str, object],
+    max_workers: Optional[int] = None,
+    full_explanation: bool = False,
+    use_cache: bool = True,
+) -> List[Dict[str, object]]:
+    # Results (or {"error": ...}) come back in input order. Repeated
+    # (text, source_url) pairs are analyzed once.
+    keys: List[Optional[Tuple[str, str]]] = []
+    unique: Dict[Tuple[str, str], int] = {}
+    for item in items:
+        text = (item.get("text") or "").strip()
+        source_url = (item.get("source_url") or "").strip()
+        if not text:
+            keys.append(None)
+            continue
+        key = (text, source_url)
+        unique.setdefault(key, len(unique))
+        keys.append(key)
+
+    unique_keys = list(unique)
+    evidence: List[Optional[_Evidence]] = [None] * len(unique_keys)
+    errors: Dict[int, str] = {}
+    cached: Dict[int, Dict[str, object]] = {}
+    lookup_seconds: Dict[int, float] = {}
+    if use_cache:
+        for position, (text, source_url) in enumerate(unique_keys):
+            hit, lookup_seconds[position] = _cache_lookup(text, source_url, full_explanation)
+            if hit is not None:
+                cached[position] = hit
+    pending = [position for position in range(len(unique_keys)) if position not in cached]
+
+    def collect(position: int) -> None:
+        text, source_url = unique_keys[position]
+        try:
+            evidence[position] = _collect_evidence(text, source_url, full_explanation)
+        except Exception as exc:
+            errors[position] = f"Analysis failed: {exc}"
+
+    # Evidence gathering is dominated by portal I/O, so it runs on a thread pool;
+    # embeddings and the classifier then run once over the whole batch.
+    workers = max(1, min(max_workers or config.BATCH_FETCH_WORKERS, len(pending) or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-evidence") as executor:
+        list(executor.map(collect, pending))
+
+    ready = [ev for ev in evidence if ev is not None]
+    needs_embedding = [ev for ev in ready if ev.embedding_needed]
+    for ev in ready:
+        if not ev.embedding_needed:
+            ev.stages.skip("embedding_similarity", _skip_reason(ev))
+    if needs_embedding:
+        start = time.perf_counter()
+        _attach_embedding_scores(needs_embedding)
+        elapsed = time.perf_counter() - start
+        for ev in needs_embedding:
+            ev.stages.record("embedding_similarity", elapsed, batched=True)
+
+    needs_ml = [pos for pos, ev in enumerate(evidence) if ev is not None and ev.ml_needed]
+    for ev in ready:
+        if not ev.ml_needed:
+            ev.stages.skip("ml_inference", _skip_reason(ev))
+    start = time.perf_counter()
+    processed = [evidence[pos].analysis.processed for pos in needs_ml]
+    predictions = dict(zip(needs_ml, _ml_predictions(processed, model_bundle)))
+    elapsed = time.perf_counter() - start
+    for pos in needs_ml:
+        evidence[pos].stages.record("ml_inference", elapsed, batched=True)
+
+    unique_results: List[Dict[str, object]] = []
+    for position, ev in enumerate(evidence):
+        if position in cached:
+            unique_results.append(cached[position])
+        elif ev is None:
+            unique_results.append({"error": errors.get(position, "Analysis failed.")})
+        else:
+            result = _finish(ev, predictions.get(position))
+            if use_cache:
+                text, source_url = unique_keys[position]
+                result = _cache_store(text, source_url, full_explanation, result, lookup_seconds[position])
+            unique_results.append(result)
+
+    return [
+        unique_results[unique[key]] if key is not None else {"error": "Please provide news text."}
+        for key in keys
+    ]
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+
+from src import config
+from src.article_index import ArticleIndex, get_article_index
+from src.embedding_index import embed_articles
+from src.portal_verifier import OfficialArticle, feed_url_for, fetch_url, official_domains, parse_feed
+from src.tfidf_space import get_tfidf_space
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process that enables ingestion polls.
+    fcntl = None
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+logger = logging.getLogger(__name__)
+
+# Direct RSS feeds per domain. Domains without a public feed are read through a
+# Google News `site:` search feed instead.
+OFFICIAL_FEEDS: Dict[str, List[str]] = {
+    "bbc.com": [
+        "https://feeds.bbci.co.uk/news/rss.xml",
+        "https://feeds.bbci.co.uk/news/world/rss.xml",
+    ],
+    "thehindu.com": ["https://www.thehindu.com/news/feeder/default.rss"],
+    "ndtv.com": ["https://feeds.feedburner.com/ndtvnews-top-stories"],
+}
+
+
+def ingest_domains() -> List[str]:
+    # Only portals marked "official": the trusted list may hold far more
+    # domains than can be polled.
+    return sorted(official_domains())
+
+
+def feed_urls(domain: str) -> List[str]:
+    return OFFICIAL_FEEDS.get(domain) or [feed_url_for(domain)]
+
+
+def fetch_feed(url: str, domain: str, timeout: float = 15.0, limit: int = 200) -> List[OfficialArticle]:
+    try:
+        content = fetch_url(url, timeout)
+    except (requests.RequestException, OSError) as exc:
+        logger.warning("Feed fetch failed for %s: %s", url, exc)
+        return []
+    return parse_feed(content, limit, default_domain=domain)
+
+
+def ingest_once(index: Optional[ArticleIndex] = None) -> int:
+    index = index or get_article_index()
+    added = 0
+    refreshed = 0
+    for domain in ingest_domains():
+        for url in feed_urls(domain):
+            articles = fetch_feed(url, domain)
+            added += index.add_articles(articles)
+            if articles:
+                # New official articles also feed the rolling TF-IDF statistics
+                # and the precomputed embedding matrix.
+                refreshed += get_tfidf_space().refresh(articles)
+                if config.EMBEDDING_INDEX_ENABLED:
+                    embed_articles(articles)
+    if added:
+        index.prune(config.ARTICLE_INDEX_MAX_ROWS)
+    if refreshed:
+        # Publish the new statistics; workers reload the file when it changes.
+        try:
+            get_tfidf_space().save()
+        except OSError as exc:
+            logger.warning("Could not save the TF-IDF space: %s", exc)
+    return added
+
+
+class IngestLeaderLock:
+    # Non-blocking flock on a shared file: every gunicorn worker starts an
+    # ingester thread, but only the holder polls the feeds and writes the
+    # article, TF-IDF and embedding indexes. The lock is released when its
+    # process exits, and another worker's ingester takes over on its next try.
+    def __init__(self, path: Optional[Path] = None) -> None:
+        path = Path(path or config.INGEST_LOCK_PATH)
+        self.path = path if path.is_absolute() else ROOT / path
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, blocking: bool = False) -> bool:
+        if self._fd is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode("ascii"))
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class ArticleIngester(threading.Thread):
+    def __init__(
+        self, interval: float, index: Optional[ArticleIndex] = None, leader_lock: Optional[IngestLeaderLock] = None
+    ) -> None:
+        super().__init__(name="article-ingester", daemon=True)
+        self.interval = interval
+        self.index = index
+        self.leader_lock = leader_lock or IngestLeaderLock()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            if not self.leader_lock.acquire():
+                # Another process is ingesting; check again in case it exits.
+                self._stop_event.wait(min(self.interval, 60.0))
+                continue
+            start = time.perf_counter()
+            try:
+                added = ingest_once(self.index)
+                logger.info("Ingested %d official articles in %.1fs", added, time.perf_counter() - start)
+            except Exception:
+                logger.exception("Official article ingestion failed")
+            self._stop_event.wait(self.interval)
+        self.leader_lock.release()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+_INGESTER: Optional[ArticleIngester] = None
+_INGESTER_LOCK = threading.Lock()
+
+
+def start_background_ingester(interval: Optional[float] = None) -> ArticleIngester:
+    global _INGESTER
+    with _INGESTER_LOCK:
+        if _INGESTER is None or not _INGESTER.is_alive():
+            _INGESTER = ArticleIngester(interval or config.INGEST_INTERVAL)
+            _INGESTER.start()
+    return _INGESTER
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingest official RSS feeds into the local article index.")
+    parser.add_argument("--once", action="store_true", help="Run a single ingestion pass and exit.")
+    parser.add_argument("--interval", type=float, default=config.INGEST_INTERVAL)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.once:
+        # Waits for a running ingester's pass instead of polling the feeds alongside it.
+        leader_lock = IngestLeaderLock()
+        leader_lock.acquire(blocking=True)
+        try:
+            added = ingest_once()
+        finally:
+            leader_lock.release()
+        print(f"Added {added} articles; index now holds {get_article_index().count()}.")
+        return
+
+    ingester = ArticleIngester(args.interval)
+    ingester.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src import config
+
+
+# Seconds; covers cache hits (sub-millisecond) up to slow portal fetches.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    parts = []
+    for key, value in labels:
+        escaped = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, registry: "MetricsRegistry", name: str, help_text: str) -> None:
+        self.name = name
+        self.help = help_text
+        self._registry = registry
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        if not self._registry.prepare_write():
+            return
+        key = _label_key(labels)
+        with self._registry.lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> List[List[object]]:
+        return [[list(map(list, key)), value] for key, value in self._values.items()]
+
+
+class Histogram:
+    def __init__(self, registry: "MetricsRegistry", name: str, help_text: str, buckets: Sequence[float]) -> None:
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._registry = registry
+        # Per label set: [per-bucket counts (non-cumulative, +Inf last), sum, count]
+        self._values: Dict[LabelKey, List[object]] = {}
+
+    def observe(self, seconds: float, **labels: object) -> None:
+        if not self._registry.prepare_write():
+            return
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, seconds)
+        with self._registry.lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += seconds
+            entry[2] += 1
+
+    def time(self, **labels: object) -> "_Timer":
+        return _Timer(self, labels)
+
+    def snapshot(self) -> List[List[object]]:
+        return [[list(map(list, key)), [list(v[0]), v[1], v[2]]] for key, v in self._values.items()]
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, object]) -> None:
+        self._histogram = histogram
+        self._labels = labels
+        self._start = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._histogram.observe(time.perf_counter() - self._start, **self._labels)
+
+
+class MetricsRegistry:
+    # Counters and histograms live in process memory. With a metrics directory
+    # configured (gunicorn sets one per master), each process also writes its
+    # snapshot to <dir>/metrics-<pid>-<start>.json, at most every flush
+    # interval from a daemon thread and once at exit. A scrape sums every
+    # snapshot in the directory, so totals survive worker restarts and whichever
+    # worker answers /metrics reports the whole server. Gauges come from
+    # collectors evaluated in the scraping process.
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self._counters: Dict[str, Counter] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, Dict[str, object], float]]]] = []
+        self._dirty = threading.Event()
+        self._pid = 0
+        self._snapshot_path: Optional[Path] = None
+        self._flusher: Optional[threading.Thread] = None
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        with self.lock:
+            if name not in self._counters:
+                self._counters[name] = Counter(self, name, help_text)
+            return self._counters[name]
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        with self.lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(self, name, help_text, buckets)
+            return self._histograms[name]
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, Dict[str, object], float]]]) -> None:
+        # collector() yields (name, help, labels, value) gauge samples at scrape time.
+        self._collectors.append(collector)
+
+    # --- multi-process snapshots -------------------------------------------------
+
+    @staticmethod
+    def directory() -> Optional[Path]:
+        path = os.environ.get("FND_METRICS_DIR", config.METRICS_DIR)
+        return Path(path) if path else None
+
+    def prepare_write(self) -> bool:
+        # Called before every update: False when metrics are disabled; otherwise
+        # makes sure this process has its own snapshot file and flusher.
+        if not config.METRICS_ENABLED:
+            return False
+        if self.directory() is not None:
+            if self._pid != os.getpid():
+                self._start_flusher()
+            self._dirty.set()
+        return True
+
+    def _start_flusher(self) -> None:
+        # Runs once per process; a flusher inherited through fork is dead.
+        with self.lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            # A fresh process starts from zero; inherited values were reported
+            # by the parent's own snapshot.
+            for metric in list(self._counters.values()) + list(self._histograms.values()):
+                metric._values.clear()
+            directory = self.directory()
+            directory.mkdir(parents=True, exist_ok=True)
+            self._snapshot_path = directory / f"metrics-{self._pid}-{time.time_ns()}.json"
+            self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flusher", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            self._dirty.wait()
+            time.sleep(config.METRICS_FLUSH_INTERVAL)
+            self._dirty.clear()
+            self.flush()
+
+    def _snapshot(self) -> Dict[str, object]:
+        with self.lock:
+            return {
+                "counters": {name: c.snapshot() for name, c in self._counters.items()},
+                "histograms": {name: h.snapshot() for name, h in self._histograms.items()},
+            }
+
+    def flush(self) -> None:
+        path = self._snapshot_path
+        if path is None or self._pid != os.getpid():
+            return
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._snapshot(), f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def _gather(self) -> List[Dict[str, object]]:
+        snapshots = [self._snapshot()]
+        directory = self.directory()
+        own = self._snapshot_path.name if self._snapshot_path is not None and self._pid == os.getpid() else None
+        if directory is not None and directory.exists():
+            for path in directory.glob("metrics-*.json"):
+                if path.name == own:
+                    continue
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return snapshots
+
+    # --- exposition --------------------------------------------------------------
+
+    def render(self) -> str:
+        counters: Dict[str, Dict[LabelKey, float]] = {}
+        histograms: Dict[str, Dict[LabelKey, List[object]]] = {}
+        for snap in self._gather():
+            for name, samples in snap.get("counters", {}).items():
+                series = counters.setdefault(name, {})
+                for labels, value in samples:
+                    key = tuple(tuple(pair) for pair in labels)
+                    series[key] = series.get(key, 0.0) + value
+            for name, samples in snap.get("histograms", {}).items():
+                series = histograms.setdefault(name, {})
+                for labels, (buckets, total, count) in samples:
+                    key = tuple(tuple(pair) for pair in labels)
+                    entry = series.get(key)
+                    if entry is None:
+                        series[key] = [list(buckets), total, count]
+                    else:
+                        entry[0] = [a + b for a, b in zip(entry[0], buckets)]
+                        entry[1] += total
+                        entry[2] += count
+
+        lines: List[str] = []
+        for name in sorted(self._counters):
+            lines.append(f"# HELP {name} {self._counters[name].help}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(counters.get(name, {}).items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        for name in sorted(self._histograms):
+            hist = self._histograms[name]
+            lines.append(f"# HELP {name} {hist.help}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, (buckets, total, count) in sorted(histograms.get(name, {}).items()):
+                cumulative = 0
+                for bound, n in zip(list(hist.buckets) + [math.inf], buckets):
+                    cumulative += n
+                    le = key + (("le", _format_value(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+
+        gauges: Dict[str, Tuple[str, List[Tuple[LabelKey, float]]]] = {}
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception:
+                continue
+            for name, help_text, labels, value in samples:
+                gauges.setdefault(name, (help_text, []))[1].append((_label_key(labels), value))
+        for name in sorted(gauges):
+            help_text, samples = gauges[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for key, value in samples:
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+atexit.register(registry.flush)
+
+
+def clear_metrics_dir(directory: Optional[Path] = None) -> None:
+    # Called by the gunicorn master at startup so totals restart with the server.
+    directory = directory or MetricsRegistry.directory()
+    if directory is None or not directory.exists():
+        return
+    for path in directory.glob("metrics-*.json"):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+STAGE_SECONDS = registry.histogram("fnd_stage_duration_seconds", "Time spent in each analysis pipeline stage.")
+REQUEST_SECONDS = registry.histogram("fnd_http_request_duration_seconds", "HTTP request latency by endpoint.")
+REQUESTS_TOTAL = registry.counter("fnd_http_requests_total", "HTTP requests by endpoint and status code.")
+PORTAL_FETCHES = registry.counter(
+    "fnd_portal_fetch_total", "Google News RSS fetches by outcome (success, timeout, error, short_circuit)."
+)
+PORTAL_HEDGES = registry.counter(
+    "fnd_portal_hedged_total", "Hedged Google News requests by which request answered first (primary, hedge, none)."
+)
+PORTAL_FETCH_SECONDS = registry.histogram("fnd_portal_fetch_duration_seconds", "Google News RSS fetch latency.")
+MODEL_INFERENCE_SECONDS = registry.histogram(
+    "fnd_model_inference_duration_seconds", "Classifier vectorize + predict_proba time per call."
+)
+MODEL_PREDICTIONS = registry.counter("fnd_model_predictions_total", "Texts scored by the classifier.")
+HISTORY_WRITE_SECONDS = registry.histogram("fnd_history_write_duration_seconds", "History insert transaction time.")
+HISTORY_ROWS = registry.counter("fnd_history_rows_written_total", "History rows committed to SQLite.")
+EMBEDDING_SECONDS = registry.histogram(
+    "fnd_embedding_duration_seconds", "Embedding model load and encode time by operation."
+)
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=name)
+
+
+def render_metrics() -> str:
+    return registry.render()
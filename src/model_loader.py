@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import logging
+import pickle
+from pathlib import Path
+from typing import Dict, Optional
+
+from src import config
+from src.compact_model import CompactModelError, load_compact_model
+
+
+ROOT = Path(__file__).resolve().parents[1]
+MODEL_PATH = ROOT / config.MODEL_PATH
+COMPACT_MODEL_PATH = ROOT / config.COMPACT_MODEL_DIR
+
+logger = logging.getLogger(__name__)
+
+
+def _load_pickle(model_path: Path) -> Dict[str, object]:
+    if not model_path.exists():
+        raise FileNotFoundError(
+            "Model file not found at models/best_model.pkl. Run `python -m src.train` first."
+        )
+    with open(model_path, "rb") as f:
+        return pickle.load(f)
+
+
+def _compact_is_current(compact_dir: Path, pickle_path: Path) -> bool:
+    # A pickle retrained after the last export wins over the stale export.
+    manifest = compact_dir / "manifest.json"
+    if not manifest.exists():
+        return False
+    return not pickle_path.exists() or manifest.stat().st_mtime >= pickle_path.stat().st_mtime
+
+
+def load_model(path: Optional[Path] = None) -> Dict[str, object]:
+    if path is not None:
+        model_path = Path(path)
+        if model_path.is_dir():
+            return load_compact_model(model_path, verify=config.MODEL_VERIFY_CHECKSUM)
+        return _load_pickle(model_path)
+
+    mode = config.MODEL_FORMAT
+    if mode == "compact":
+        return load_compact_model(COMPACT_MODEL_PATH, verify=config.MODEL_VERIFY_CHECKSUM)
+    if mode == "auto" and _compact_is_current(COMPACT_MODEL_PATH, MODEL_PATH):
+        try:
+            return load_compact_model(COMPACT_MODEL_PATH, verify=config.MODEL_VERIFY_CHECKSUM)
+        except CompactModelError as exc:
+            logger.warning("Compact model unusable (%s); falling back to %s", exc, MODEL_PATH.name)
+    return _load_pickle(MODEL_PATH)
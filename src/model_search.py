@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import product
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+from sklearn.naive_bayes import MultinomialNB
+
+from src import config
+from src.corpus_cache import corpus_key
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Each entry expands like sklearn's ParameterGrid: list values are searched,
+# scalars are fixed. Every vectorizer setting is crossed with every model
+# setting. Defaults stay within what the compact model format can export.
+DEFAULT_GRID: Dict[str, List[Dict[str, object]]] = {
+    "vectorizers": [
+        {"name": "tfidf", "max_features": [10000, 50000], "ngram_range": [[1, 1], [1, 2]]},
+    ],
+    "models": [
+        {"name": "logistic_regression", "C": [0.5, 1.0, 4.0]},
+        {"name": "naive_bayes", "alpha": [0.01, 0.1, 1.0]},
+    ],
+}
+
+VECTORIZERS = {
+    "tfidf": lambda params: TfidfVectorizer(**params),
+}
+
+MODELS = {
+    "logistic_regression": lambda params: LogisticRegression(**{"max_iter": 300, "random_state": 42, **params}),
+    "naive_bayes": lambda params: MultinomialNB(**params),
+    "sgd_logistic_regression": lambda params: SGDClassifier(
+        **{"loss": "log_loss", "alpha": 1e-5, "random_state": 42, **params}
+    ),
+}
+
+
+def load_grid(path: Optional[Path] = None) -> Dict[str, List[Dict[str, object]]]:
+    path = path or (Path(config.TRAIN_SEARCH_GRID) if config.TRAIN_SEARCH_GRID else None)
+    if path is None:
+        return DEFAULT_GRID
+    with open(ROOT / path, "r", encoding="utf-8") as f:
+        grid = json.load(f)
+    if not grid.get("vectorizers") or not grid.get("models"):
+        raise ValueError(f"{path}: a search grid needs non-empty 'vectorizers' and 'models' lists.")
+    return grid
+
+
+def _axis(key: str, value: object) -> List[object]:
+    # A flat [lo, hi] ngram_range is one setting; a list of them is searched.
+    if key == "ngram_range":
+        if isinstance(value, list) and value and isinstance(value[0], list):
+            return [tuple(item) for item in value]
+        return [tuple(value)]
+    return value if isinstance(value, list) else [value]
+
+
+def _expand(entries: Iterable[Dict[str, object]], factories: Dict[str, object]) -> List[Tuple[str, Dict[str, object]]]:
+    expanded = []
+    for entry in entries:
+        entry = dict(entry)
+        name = entry.pop("name")
+        if name not in factories:
+            raise ValueError(f"Unknown search entry {name!r}; expected one of {', '.join(sorted(factories))}.")
+        axes = {key: _axis(key, value) for key, value in entry.items()}
+        expanded.extend((name, params) for params in ParameterGrid(axes))
+    return expanded
+
+
+def _format_params(params: Dict[str, object]) -> str:
+    return ", ".join(f"{key}={params[key]}" for key in sorted(params))
+
+
+# --- worker side ------------------------------------------------------------------
+
+_texts: List[str] = []
+_labels: np.ndarray = np.empty(0, dtype=int)
+
+
+def _init_worker(texts: List[str], labels: np.ndarray) -> None:
+    global _texts, _labels
+    _texts, _labels = texts, labels
+
+
+def _write_matrix(path: Path, matrix: sp.csr_matrix) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        sp.save_npz(f, matrix, compressed=False)
+    os.replace(tmp_path, path)
+
+
+@lru_cache(maxsize=4)
+def _read_matrix(path: str) -> sp.csr_matrix:
+    # Candidates sharing a vectorizer and fold usually land on the same worker
+    # in a row, so the last few matrices are kept rather than re-read.
+    return sp.load_npz(path).tocsr()
+
+
+def _vectorize_fold(task: Tuple[str, Dict[str, object], np.ndarray, np.ndarray, str]) -> Dict[str, float]:
+    # Fits the vectorizer on the training part of one fold and stores both
+    # matrices; every model candidate then reads them instead of refitting.
+    name, params, train_idx, test_idx, prefix = task
+    train_path, test_path = Path(prefix + "-train.npz"), Path(prefix + "-test.npz")
+    timings_path = Path(prefix + ".json")
+    if train_path.exists() and test_path.exists() and timings_path.exists():
+        with open(timings_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    vectorizer = VECTORIZERS[name](params)
+    start = time.perf_counter()
+    X_train = vectorizer.fit_transform([_texts[i] for i in train_idx])
+    fitted = time.perf_counter()
+    X_test = vectorizer.transform([_texts[i] for i in test_idx])
+    timings = {"vectorize_fit_seconds": fitted - start, "transform_seconds": time.perf_counter() - fitted}
+    _write_matrix(train_path, X_train.tocsr())
+    _write_matrix(test_path, X_test.tocsr())
+    with open(timings_path, "w", encoding="utf-8") as f:
+        json.dump(timings, f)
+    return timings
+
+
+def _fit_fold(task: Tuple[str, Dict[str, object], np.ndarray, np.ndarray, str]) -> Dict[str, object]:
+    from src.train import evaluate_model
+
+    name, params, train_idx, test_idx, prefix = task
+    X_train = _read_matrix(prefix + "-train.npz")
+    X_test = _read_matrix(prefix + "-test.npz")
+    model = MODELS[name](params)
+    start = time.perf_counter()
+    model.fit(X_train, _labels[train_idx])
+    fitted = time.perf_counter()
+    preds = model.predict(X_test)
+    predicted = time.perf_counter()
+    metrics = evaluate_model(_labels[test_idx], preds)
+    metrics.update({"fit_seconds": fitted - start, "predict_seconds": predicted - fitted, "preds": preds})
+    return metrics
+
+
+# --- driver -----------------------------------------------------------------------
+
+
+def _folds(labels: np.ndarray, n_folds: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    # Capped by the rarest class so every fold sees both labels.
+    smallest = int(np.bincount(labels).min()) if len(labels) else 0
+    n_folds = min(n_folds, smallest)
+    if n_folds < 2:
+        raise ValueError("Model search needs at least two examples of each label for cross-validation.")
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=42)
+    return list(splitter.split(np.zeros(len(labels)), labels))
+
+
+def _feature_prefix(cache_dir: Path, data_key: str, name: str, params: Dict[str, object], n_folds: int, fold: int) -> str:
+    spec = json.dumps([data_key, name, sorted((k, str(v)) for k, v in params.items()), n_folds], sort_keys=True)
+    digest = hashlib.sha1(spec.encode("utf-8")).hexdigest()[:16]
+    return str(cache_dir / f"{name}-{digest}-fold{fold}of{n_folds}")
+
+
+def _map(executor: Optional[ProcessPoolExecutor], fn, tasks: Sequence[object]) -> List[object]:
+    if executor is None:
+        return [fn(task) for task in tasks]
+    return list(executor.map(fn, tasks))
+
+
+def _mark_pareto(results: pd.DataFrame) -> pd.Series:
+    # A candidate is on the front when no other one is both at least as
+    # accurate and at least as fast, and strictly better on one of the two.
+    f1 = results["f1_score"].to_numpy()
+    latency = results["latency_ms_per_1k"].to_numpy()
+    front = []
+    for i in range(len(results)):
+        dominated = ((f1 >= f1[i]) & (latency <= latency[i]) & ((f1 > f1[i]) | (latency < latency[i]))).any()
+        front.append(not dominated)
+    return pd.Series(front, index=results.index)
+
+
+def search_models(
+    processed: Sequence[str],
+    labels: Sequence[int],
+    grid: Optional[Dict[str, List[Dict[str, object]]]] = None,
+    n_folds: Optional[int] = None,
+    workers: Optional[int] = None,
+    use_cache: bool = True,
+    cache_dir: Optional[Path] = None,
+) -> Tuple[pd.DataFrame, Dict[str, object], np.ndarray]:
+    # Returns one row per candidate (fold means), the winning setting and its
+    # out-of-fold predictions. Feature matrices are built once per vectorizer
+    # setting and fold, in parallel, then shared by every model on top of them.
+    grid = grid or load_grid()
+    processed = list(processed)
+    labels = np.asarray(labels, dtype=int)
+    vectorizers = _expand(grid["vectorizers"], VECTORIZERS)
+    models = _expand(grid["models"], MODELS)
+    folds = _folds(labels, n_folds or config.TRAIN_CV_FOLDS)
+    workers = workers or config.TRAIN_WORKERS
+
+    if use_cache:
+        cache_dir = Path(cache_dir or ROOT / config.PREPROCESS_CACHE_DIR) / "features"
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        scratch = None
+    else:
+        cache_dir = scratch = Path(tempfile.mkdtemp(prefix="fnd-features-"))
+    data_key = corpus_key(processed + [",".join(map(str, labels))])
+
+    prefixes = {
+        (v, fold): _feature_prefix(cache_dir, data_key, name, params, len(folds), fold)
+        for v, (name, params) in enumerate(vectorizers)
+        for fold in range(len(folds))
+    }
+    vectorize_tasks = [
+        (name, params, folds[fold][0], folds[fold][1], prefixes[(v, fold)])
+        for v, (name, params) in enumerate(vectorizers)
+        for fold in range(len(folds))
+    ]
+    # Ordered by vectorizer and fold so consecutive tasks reuse a worker's matrices.
+    fit_keys = [(v, m, fold) for v in range(len(vectorizers)) for fold in range(len(folds)) for m in range(len(models))]
+    fit_tasks = [
+        (models[m][0], models[m][1], folds[fold][0], folds[fold][1], prefixes[(v, fold)]) for v, m, fold in fit_keys
+    ]
+    print(
+        f"  searching {len(vectorizers)} vectorizer x {len(models)} model settings, "
+        f"{len(folds)}-fold CV, {workers} worker(s)",
+        flush=True,
+    )
+
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(processed, labels))
+    else:
+        _init_worker(processed, labels)
+    try:
+        vectorized = dict(zip(prefixes, _map(executor, _vectorize_fold, vectorize_tasks)))
+        print(f"  feature matrices ready for {len(vectorize_tasks)} vectorizer/fold pairs", flush=True)
+        fitted = dict(zip(fit_keys, _map(executor, _fit_fold, fit_tasks)))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        _read_matrix.cache_clear()
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    rows = []
+    oof: Dict[Tuple[int, int], np.ndarray] = {}
+    for v, m in product(range(len(vectorizers)), range(len(models))):
+        runs = [fitted[(v, m, fold)] for fold in range(len(folds))]
+        timings = [vectorized[(v, fold)] for fold in range(len(folds))]
+        test_rows = sum(len(test_idx) for _, test_idx in folds)
+        predictions = np.empty(len(labels), dtype=int)
+        for (_, test_idx), run in zip(folds, runs):
+            predictions[test_idx] = run["preds"]
+        oof[(v, m)] = predictions
+        transform_total = sum(t["transform_seconds"] for t in timings)
+        predict_total = sum(run["predict_seconds"] for run in runs)
+        rows.append(
+            {
+                "accuracy": float(np.mean([run["accuracy"] for run in runs])),
+                "precision": float(np.mean([run["precision"] for run in runs])),
+                "recall": float(np.mean([run["recall"] for run in runs])),
+                "f1_score": float(np.mean([run["f1_score"] for run in runs])),
+                "f1_std": float(np.std([run["f1_score"] for run in runs])),
+                "fit_seconds": float(np.mean([run["fit_seconds"] for run in runs])),
+                "predict_seconds": float(np.mean([run["predict_seconds"] for run in runs])),
+                "vectorize_fit_seconds": float(np.mean([t["vectorize_fit_seconds"] for t in timings])),
+                # Serving cost of one text: TF-IDF transform plus prediction.
+                "latency_ms_per_1k": (transform_total + predict_total) * 1000.0 / test_rows * 1000.0,
+                "vectorizer": vectorizers[v][0],
+                "vectorizer_params": _format_params(vectorizers[v][1]),
+                "model": models[m][0],
+                "model_params": _format_params(models[m][1]),
+                "folds": len(folds),
+                "_key": (v, m),
+            }
+        )
+
+    results = pd.DataFrame(rows)
+    results["pareto"] = _mark_pareto(results)
+    results = results.sort_values(by=["f1_score", "latency_ms_per_1k"], ascending=[False, True])
+    v, m = results.iloc[0]["_key"]
+    best = {
+        "vectorizer_name": vectorizers[v][0],
+        "vectorizer_params": vectorizers[v][1],
+        "model_name": models[m][0],
+        "model_params": models[m][1],
+    }
+    return results.drop(columns="_key").reset_index(drop=True), best, oof[(v, m)]
+
+
+def refit_best(processed: Sequence[str], labels: Sequence[int], best: Dict[str, object]) -> Dict[str, object]:
+    # The served model is trained on every row once the setting is chosen.
+    vectorizer = VECTORIZERS[best["vectorizer_name"]](best["vectorizer_params"])
+    model = MODELS[best["model_name"]](best["model_params"])
+    model.fit(vectorizer.fit_transform(list(processed)), np.asarray(labels, dtype=int))
+    return {
+        "vectorizer_name": best["vectorizer_name"],
+        "model_name": best["model_name"],
+        "vectorizer": vectorizer,
+        "model": model,
+        "label_map": {0: "Fake", 1: "Real"},
+    }
@@ -1,16 +1,29 @@
 from __future__ import annotations
 
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
-from typing import List
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
 from urllib.parse import quote_plus
 
 import feedparser
 import requests
+from requests.adapters import HTTPAdapter
 
-from src.preprocess import extract_keywords
+from src import config
+from src.cache import TTLCache
+from src.domain_reputation import domain_index
+from src.metrics import PORTAL_FETCH_SECONDS, PORTAL_FETCHES, PORTAL_HEDGES, registry
+from src.preprocess import TextAnalysis, extract_keywords
+from src.upstream import CircuitBreaker, LatencyTracker
 
 
-OFFICIAL_DOMAINS = ["bbc.com", "reuters.com", "thehindu.com", "ndtv.com"]
+ROOT = Path(__file__).resolve().parents[1]
+# Ceiling for a single Google News fetch; adaptive timeouts only go below it.
+DEFAULT_TIMEOUT = 8.0
 
 
 @dataclass
@@ -25,35 +38,152 @@ class OfficialArticle:
         return f"{self.title} {self.summary}".strip()
 
 
-def _build_google_news_query(news_text: str) -> str:
-    keywords = extract_keywords(news_text, top_k=6)
-    term = " ".join(keywords) if keywords else news_text[:120]
-    site_filter = " OR ".join(f"site:{domain}" for domain in OFFICIAL_DOMAINS)
+def _cache_path() -> Optional[Path]:
+    if not config.RSS_CACHE_PATH:
+        return None
+    path = Path(config.RSS_CACHE_PATH)
+    return path if path.is_absolute() else ROOT / path
+
+
+rss_cache: TTLCache[List[OfficialArticle]] = TTLCache(
+    maxsize=config.RSS_CACHE_SIZE,
+    ttl=config.RSS_CACHE_TTL,
+    stale_ttl=config.RSS_CACHE_STALE_TTL,
+    persist_path=_cache_path(),
+)
+
+
+# A transport takes (url, timeout) and returns the response body, raising on
+# failure. Tests and benchmarks swap it to point at a local fixture server.
+Transport = Callable[[str, float], bytes]
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_HEDGE_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+def _breaker_state_path() -> Optional[Path]:
+    if not config.PORTAL_BREAKER_STATE_PATH:
+        return None
+    path = Path(config.PORTAL_BREAKER_STATE_PATH)
+    return path if path.is_absolute() else ROOT / path
+
+
+portal_breaker = CircuitBreaker(
+    "google_news",
+    failure_threshold=config.PORTAL_BREAKER_FAILURES,
+    cooldown=config.PORTAL_BREAKER_COOLDOWN,
+    state_path=_breaker_state_path(),
+    probe_timeout=DEFAULT_TIMEOUT,
+    enabled=config.PORTAL_BREAKER_ENABLED,
+)
+portal_latency = LatencyTracker(config.PORTAL_LATENCY_WINDOW, config.PORTAL_LATENCY_MIN_SAMPLES)
+
+
+def _session() -> requests.Session:
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=config.HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _SESSION = session
+    return _SESSION
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _SESSION_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(
+                    max_workers=config.PORTAL_FETCH_WORKERS,
+                    thread_name_prefix="portal-fetch",
+                )
+    return _EXECUTOR
+
+
+def _hedge_executor() -> ThreadPoolExecutor:
+    # Separate from _executor(): per-source fetches already run there, and a
+    # hedge queued behind them would fire too late to help.
+    global _HEDGE_EXECUTOR
+    if _HEDGE_EXECUTOR is None:
+        with _SESSION_LOCK:
+            if _HEDGE_EXECUTOR is None:
+                _HEDGE_EXECUTOR = ThreadPoolExecutor(
+                    max_workers=2 * config.PORTAL_FETCH_WORKERS,
+                    thread_name_prefix="portal-hedge",
+                )
+    return _HEDGE_EXECUTOR
+
+
+def requests_transport(url: str, timeout: float) -> bytes:
+    response = _session().get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.content
+
+
+_transport: Transport = requests_transport
+
+
+def set_transport(transport: Optional[Transport]) -> None:
+    global _transport
+    _transport = transport or requests_transport
+
+
+def fetch_url(url: str, timeout: float) -> bytes:
+    # Through the current transport, so set_transport() also redirects callers
+    # outside this module (the ingester).
+    return _transport(url, timeout)
+
+
+def official_domains() -> List[str]:
+    # Entries marked "official" in the domain reputation list (hot-reloaded).
+    return domain_index().official_domains()
+
+
+def _search_terms(news_text: str, analysis: Optional[TextAnalysis] = None) -> str:
+    keywords = extract_keywords(news_text, top_k=6, analysis=analysis)
+    return " ".join(keywords) if keywords else news_text[:120]
+
+
+def _build_google_news_query(
+    news_text: str,
+    analysis: Optional[TextAnalysis] = None,
+    domains: Optional[Sequence[str]] = None,
+) -> str:
+    term = _search_terms(news_text, analysis=analysis)
+    site_filter = " OR ".join(f"site:{domain}" for domain in (domains or official_domains()))
     return f"{term} ({site_filter})"
 
 
-def _google_news_rss_url(query: str) -> str:
+def normalize_query(query: str) -> str:
+    # Google News ignores term order and case, so claims that reduce to the same
+    # keyword set share a cache entry.
+    return " ".join(sorted(set(query.lower().split())))
+
+
+def google_news_rss_url(query: str) -> str:
     encoded_query = quote_plus(query)
-    return f"https://news.google.com/rss/search?q={encoded_query}&hl=en-IN&gl=IN&ceid=IN:en"
+    return f"{config.GOOGLE_NEWS_RSS_URL}?q={encoded_query}&hl=en-IN&gl=IN&ceid=IN:en"
 
 
-def fetch_official_articles(news_text: str, timeout: int = 8, limit: int = 12) -> List[OfficialArticle]:
-    query = _build_google_news_query(news_text)
-    rss_url = _google_news_rss_url(query)
+def feed_url_for(domain: str) -> str:
+    # Google News search feed of one site, for portals without their own RSS.
+    return google_news_rss_url(f"site:{domain}")
 
-    try:
-        response = requests.get(rss_url, timeout=timeout)
-        response.raise_for_status()
-    except requests.RequestException:
-        return []
 
-    parsed = feedparser.parse(response.content)
+def parse_feed(content: bytes, limit: int, default_domain: str = "") -> List[OfficialArticle]:
+    parsed = feedparser.parse(content)
     results: List[OfficialArticle] = []
     for entry in parsed.entries[:limit]:
         link = getattr(entry, "link", "") or ""
         title = getattr(entry, "title", "") or ""
         summary = getattr(entry, "summary", "") or ""
-        source_domain = ""
+        source_domain = default_domain
         if getattr(entry, "source", None):
             source_domain = (entry.source.get("href") or entry.source.get("title") or "").lower()
         results.append(
@@ -66,3 +196,168 @@ def fetch_official_articles(news_text: str, timeout: int = 8, limit: int = 12) -
         )
     return results
 
+
+def effective_timeout(ceiling: float = DEFAULT_TIMEOUT) -> float:
+    # Factor x p99 of recent fetches, clamped to [PORTAL_TIMEOUT_MIN, ceiling].
+    if not config.PORTAL_ADAPTIVE_TIMEOUT:
+        return ceiling
+    p99 = portal_latency.percentile(99)
+    if p99 is None:
+        return ceiling
+    return min(ceiling, max(config.PORTAL_TIMEOUT_MIN, p99 * config.PORTAL_TIMEOUT_FACTOR))
+
+
+def _hedged_transport(url: str, timeout: float) -> bytes:
+    # Sends a second identical request once the first is slower than the
+    # recent p95 and returns whichever answers first. Both share the deadline.
+    delay = portal_latency.percentile(95) if config.PORTAL_HEDGE_ENABLED else None
+    if delay is None or delay >= timeout:
+        return _transport(url, timeout)
+    executor = _hedge_executor()
+    primary = executor.submit(_transport, url, timeout)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+    hedge = executor.submit(_transport, url, timeout - delay)
+    deadline = time.perf_counter() + timeout - delay
+    pending = {primary, hedge}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, deadline - time.perf_counter()), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            if future.exception() is None:
+                PORTAL_HEDGES.inc(winner="hedge" if future is hedge else "primary")
+                return future.result()
+            error = future.exception()
+    PORTAL_HEDGES.inc(winner="none")
+    if error is not None and not pending:
+        raise error
+    raise requests.Timeout(f"No RSS response within {timeout:.2f}s")
+
+
+def _fetch_query(query: str, timeout: float, limit: int) -> Optional[List[OfficialArticle]]:
+    # None signals a failed or refused fetch, which must not be cached.
+    if not portal_breaker.allow():
+        PORTAL_FETCHES.inc(outcome="short_circuit")
+        return None
+    timeout = effective_timeout(timeout)
+    start = time.perf_counter()
+    try:
+        content = _hedged_transport(google_news_rss_url(query), timeout)
+    except requests.Timeout:
+        PORTAL_FETCHES.inc(outcome="timeout")
+        portal_latency.observe(timeout)
+        portal_breaker.record_failure()
+        return None
+    except (requests.RequestException, OSError):
+        PORTAL_FETCHES.inc(outcome="error")
+        portal_breaker.record_failure()
+        return None
+    finally:
+        PORTAL_FETCH_SECONDS.observe(time.perf_counter() - start)
+    portal_latency.observe(time.perf_counter() - start)
+    portal_breaker.record_success()
+    PORTAL_FETCHES.inc(outcome="success")
+    return parse_feed(content, limit)
+
+
+def _fetch_query_cached(query: str, timeout: float, limit: int, use_cache: bool) -> List[OfficialArticle]:
+    if not (use_cache and config.RSS_CACHE_ENABLED):
+        return _fetch_query(query, timeout, limit) or []
+    key = f"{normalize_query(query)}|{limit}"
+    return rss_cache.get_or_load(key, lambda: _fetch_query(query, timeout, limit)) or []
+
+
+def merge_articles(groups: Sequence[List[OfficialArticle]], limit: int) -> List[OfficialArticle]:
+    # Round-robin across sources so one prolific portal cannot crowd out the
+    # others, dropping duplicate links.
+    merged: List[OfficialArticle] = []
+    seen = set()
+    for rank in range(max((len(group) for group in groups), default=0)):
+        for group in groups:
+            if rank >= len(group):
+                continue
+            article = group[rank]
+            key = article.link or article.combined_text
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(article)
+            if len(merged) >= limit:
+                return merged
+    return merged
+
+
+def _fetch_per_source(
+    term: str,
+    timeout: float,
+    limit: int,
+    use_cache: bool,
+    domains: Sequence[str],
+) -> List[OfficialArticle]:
+    deadline = min(float(timeout), config.PORTAL_SOURCE_DEADLINE)
+    executor = _executor()
+    futures = [
+        executor.submit(_fetch_query_cached, f"{term} (site:{domain})", timeout, limit, use_cache)
+        for domain in domains
+    ]
+    done, _ = wait(futures, timeout=deadline)
+    # Sources that miss the deadline are left to finish in the background (their
+    # result still lands in the cache) and the request proceeds with the rest.
+    groups = [future.result() for future in futures if future in done and future.exception() is None]
+    return merge_articles(groups, limit)
+
+
+def fetch_official_articles(
+    news_text: str,
+    timeout: float = DEFAULT_TIMEOUT,
+    limit: int = 12,
+    analysis: Optional[TextAnalysis] = None,
+    use_cache: bool = True,
+    mode: Optional[str] = None,
+) -> List[OfficialArticle]:
+    if (mode or config.PORTAL_FETCH_MODE) == "per_source":
+        term = _search_terms(news_text, analysis=analysis)
+        return _fetch_per_source(term, timeout, limit, use_cache, official_domains())
+
+    query = _build_google_news_query(news_text, analysis=analysis)
+    return _fetch_query_cached(query, timeout, limit, use_cache)
+
+
+def rss_cache_stats() -> Dict[str, int]:
+    return rss_cache.stats()
+
+
+def portal_health() -> Dict[str, object]:
+    p95 = portal_latency.percentile(95)
+    return {
+        "breaker": portal_breaker.snapshot(),
+        "timeout_seconds": round(effective_timeout(), 3),
+        "latency_p95_ms": None if p95 is None else round(p95 * 1000, 3),
+        "latency_samples": len(portal_latency),
+        "hedging": config.PORTAL_HEDGE_ENABLED,
+    }
+
+
+def _upstream_gauges():
+    # The breaker state is shared, so every worker reports the same value;
+    # the timeout is the answering worker's own.
+    state = portal_breaker.snapshot()
+    yield (
+        "fnd_portal_breaker_state",
+        "Google News circuit breaker state: 0 closed, 1 open, 2 half-open.",
+        {},
+        state["state_code"],
+    )
+    yield "fnd_portal_breaker_opens", "Times the Google News breaker opened since startup.", {}, state["opens_total"]
+    yield (
+        "fnd_portal_timeout_seconds",
+        "Adaptive Google News timeout of the scraped worker.",
+        {"pid": os.getpid()},
+        effective_timeout(),
+    )
+
+
+registry.add_collector(_upstream_gauges)
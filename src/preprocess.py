@@ -1,14 +1,32 @@
+import hashlib
 import re
+import threading
 from collections import Counter
-from typing import List
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
 import nltk
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
 from nltk.tokenize import word_tokenize
 
+from src import config
+from src.cache import TTLCache
+
+
+# Bump whenever preprocess_text output changes; cached training corpora are keyed by it.
+PREPROCESS_VERSION = 1
+
+_NLTK_READY = False
+_NLTK_LOCK = threading.Lock()
+
 
 def ensure_nltk_resources() -> None:
+    global _NLTK_READY
+    if _NLTK_READY:
+        return
+
     resources = {
         "tokenizers/punkt": "punkt",
         "corpora/stopwords": "stopwords",
@@ -18,11 +36,15 @@ def ensure_nltk_resources() -> None:
         "chunkers/maxent_ne_chunker": "maxent_ne_chunker",
         "corpora/words": "words",
     }
-    for resource_path, resource_name in resources.items():
-        try:
-            nltk.data.find(resource_path)
-        except LookupError:
-            nltk.download(resource_name, quiet=True)
+    with _NLTK_LOCK:
+        if _NLTK_READY:
+            return
+        for resource_path, resource_name in resources.items():
+            try:
+                nltk.data.find(resource_path)
+            except LookupError:
+                nltk.download(resource_name, quiet=True)
+        _NLTK_READY = True
 
 
 def clean_text(text: str) -> str:
@@ -41,40 +63,129 @@ def tokenize_and_lemmatize(text: str, stop_words: set, lemmatizer: WordNetLemmat
     return lemmatized
 
 
+@dataclass
+class TextAnalysis:
+    cleaned: str
+    tokens: List[str]
+    keyword_counts: Counter = field(repr=False)
+
+    @property
+    def processed(self) -> str:
+        return " ".join(self.tokens)
+
+    def keywords(self, top_k: int = 8) -> List[str]:
+        return [word for word, _ in self.keyword_counts.most_common(top_k)]
+
+
+class TextAnalyzer:
+    # Loads NLTK resources once per process; a single analyze() call produces the
+    # TextAnalysis that every stage of a request shares.
+    def __init__(self, lemma_cache_size: int = 50_000) -> None:
+        ensure_nltk_resources()
+        self.stop_words = frozenset(stopwords.words("english"))
+        self.lemmatizer = WordNetLemmatizer()
+        self._lemmatize = lru_cache(maxsize=lemma_cache_size)(self.lemmatizer.lemmatize)
+        # WordNet loads lazily and its first load is not thread-safe; force it here.
+        self.lemmatizer.lemmatize("warmup")
+
+    def tokens(self, cleaned: str) -> List[str]:
+        # clean_text strips all punctuation, so punkt sentence splitting would
+        # always yield a single sentence; skip it and run the word tokenizer only.
+        stop_words = self.stop_words
+        lemmatize = self._lemmatize
+        return [
+            lemmatize(token)
+            for token in word_tokenize(cleaned, preserve_line=True)
+            if token not in stop_words and len(token) > 2
+        ]
+
+    def analyze(self, text: str) -> TextAnalysis:
+        cleaned = clean_text(text or "")
+        tokens = self.tokens(cleaned)
+        return TextAnalysis(cleaned=cleaned, tokens=tokens, keyword_counts=Counter(tokens))
+
+
+_ANALYZER: Optional[TextAnalyzer] = None
+_ANALYZER_LOCK = threading.Lock()
+
+
+def get_analyzer() -> TextAnalyzer:
+    global _ANALYZER
+    if _ANALYZER is None:
+        with _ANALYZER_LOCK:
+            if _ANALYZER is None:
+                _ANALYZER = TextAnalyzer()
+    return _ANALYZER
+
+
+def analyze_text(text: str) -> TextAnalysis:
+    return get_analyzer().analyze(text)
+
+
 def preprocess_text(text: str) -> str:
-    ensure_nltk_resources()
-    stop_words = set(stopwords.words("english"))
-    lemmatizer = WordNetLemmatizer()
-    cleaned = clean_text(text)
-    tokens = tokenize_and_lemmatize(cleaned, stop_words, lemmatizer)
-    return " ".join(tokens)
+    return analyze_text(text).processed
 
 
-def extract_keywords(text: str, top_k: int = 8) -> List[str]:
-    processed = preprocess_text(text)
-    tokens = processed.split()
-    if not tokens:
-        return []
-    frequencies = Counter(tokens)
-    return [word for word, _ in frequencies.most_common(top_k)]
+def extract_keywords(text: str, top_k: int = 8, analysis: Optional[TextAnalysis] = None) -> List[str]:
+    if analysis is None:
+        analysis = analyze_text(text)
+    return analysis.keywords(top_k)
 
 
-def extract_entities(text: str) -> List[str]:
-    ensure_nltk_resources()
-    text_for_ner = re.sub(r"\s+", " ", text).strip()
-    if not text_for_ner:
-        return []
+ENTITY_MODES = config.ENTITY_MODES
 
-    tokens = word_tokenize(text_for_ner)
-    tagged = nltk.pos_tag(tokens)
-    chunks = nltk.ne_chunk(tagged, binary=False)
+# Lowercase words allowed inside a capitalized name ("Bank of England").
+_NAME_CONNECTORS = {"of", "the", "and", "for", "de", "da", "del", "van", "von", "al"}
+_SENTENCE_END = {".", "!", "?"}
+_ENTITY_TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z'&-]*|[^\sA-Za-z]")
 
-    entities = []
-    for chunk in chunks:
-        if hasattr(chunk, "label"):
-            entity = " ".join(c[0] for c in chunk)
-            entities.append(entity)
+# Small built-in gazetteer; extend it with FND_ENTITY_GAZETTEER_PATH (one name per line).
+_BUILTIN_GAZETTEER = [
+    "United Nations",
+    "European Union",
+    "Reserve Bank of India",
+    "United States",
+    "United Kingdom",
+    "India",
+    "China",
+    "Russia",
+    "Ukraine",
+    "NASA",
+    "BBC",
+    "Reuters",
+    "NDTV",
+]
+
+_entity_cache: TTLCache[List[str]] = TTLCache(maxsize=config.ENTITY_CACHE_SIZE, ttl=float("inf"))
+_GAZETTEER: Optional[Dict[Tuple[str, ...], str]] = None
 
+
+def _gazetteer() -> Dict[Tuple[str, ...], str]:
+    global _GAZETTEER
+    if _GAZETTEER is None:
+        names = list(_BUILTIN_GAZETTEER)
+        if config.ENTITY_GAZETTEER_PATH:
+            try:
+                with open(config.ENTITY_GAZETTEER_PATH, "r", encoding="utf-8") as f:
+                    names.extend(line.strip() for line in f if line.strip())
+            except OSError:
+                pass
+        _GAZETTEER = {tuple(name.lower().split()): name for name in names}
+    return _GAZETTEER
+
+
+def _entity_window(text: str, max_chars: int) -> str:
+    # Tagging cost grows with length and the entities that matter for display
+    # are nearly always in the opening paragraphs, so only a bounded prefix
+    # (cut at a word boundary) is tagged.
+    window = re.sub(r"\s+", " ", text or "").strip()
+    if len(window) > max_chars:
+        cut = window.rfind(" ", 0, max_chars)
+        window = window[: cut if cut > 0 else max_chars]
+    return window
+
+
+def _dedupe_entities(entities: List[str]) -> List[str]:
     # Keep unique entities while preserving order.
     seen = set()
     deduped = []
@@ -84,3 +195,114 @@ def extract_entities(text: str) -> List[str]:
             seen.add(key)
             deduped.append(item)
     return deduped[:10]
+
+
+def _nltk_entities(text: str) -> List[str]:
+    ensure_nltk_resources()
+    tokens = word_tokenize(text)
+    tagged = nltk.pos_tag(tokens)
+    chunks = nltk.ne_chunk(tagged, binary=False)
+
+    entities = []
+    for chunk in chunks:
+        if hasattr(chunk, "label"):
+            entity = " ".join(c[0] for c in chunk)
+            entities.append(entity)
+    return entities
+
+
+def _fast_entities(text: str) -> List[str]:
+    # Runs of capitalized words (acronyms included), bridged by connectors such as
+    # "of", plus gazetteer phrases matched case-insensitively. A lone capitalized
+    # word at the start of a sentence is usually just capitalized prose, so it is
+    # kept only if it is an acronym or also appears capitalized mid-sentence.
+    stop_words = get_analyzer().stop_words
+    tokens = _ENTITY_TOKEN_RE.findall(text)
+    mid_sentence_caps = set()
+    covered = set()
+    found: List[Tuple[int, str]] = []
+    run: List[str] = []
+    run_start = 0
+    run_at_sentence_start = False
+    connector: List[str] = []
+
+    def flush() -> None:
+        words = list(run)
+        if words and words[0].lower() in stop_words:
+            words = words[1:]
+        if not words:
+            return
+        if run_at_sentence_start and len(run) == 1 and not words[0].isupper():
+            found.append((-run_start - 1, words[0]))  # provisional, resolved below
+        else:
+            found.append((run_start, " ".join(words)))
+            covered.update(range(run_start, run_start + len(run)))
+
+    sentence_start = True
+    for position, token in enumerate(tokens):
+        if token[0].isalpha():
+            if token[0].isupper():
+                if not run:
+                    run_start = position
+                    run_at_sentence_start = sentence_start
+                if not sentence_start:
+                    mid_sentence_caps.add(token)
+                run.extend(connector)
+                connector = []
+                run.append(token)
+            elif run and not connector and token in _NAME_CONNECTORS:
+                connector = [token]
+            else:
+                flush()
+                run, connector = [], []
+            sentence_start = False
+        else:
+            flush()
+            run, connector = [], []
+            sentence_start = token in _SENTENCE_END
+    flush()
+
+    entities = []
+    for position, name in found:
+        if position < 0:
+            if name not in mid_sentence_caps:
+                continue
+            position = -position - 1
+        entities.append((position, name))
+
+    gazetteer = _gazetteer()
+    longest = max((len(key) for key in gazetteer), default=0)
+    words = [(i, t) for i, t in enumerate(tokens) if t[0].isalpha()]
+    lowered = [t.lower() for _, t in words]
+    for i in range(len(words)):
+        if words[i][0] in covered:
+            continue
+        for size in range(min(longest, len(words) - i), 0, -1):
+            name = gazetteer.get(tuple(lowered[i : i + size]))
+            if name is not None:
+                entities.append((words[i][0], name))
+                break
+
+    entities.sort(key=lambda item: item[0])
+    return [name for _, name in entities]
+
+
+def extract_entities(text: str, mode: Optional[str] = None) -> List[str]:
+    mode = (mode or config.ENTITY_MODE).lower()
+    if mode not in ENTITY_MODES:
+        raise ValueError(f"Unknown entity mode {mode!r}; expected one of {ENTITY_MODES}")
+    if mode == "off":
+        return []
+
+    text_for_ner = _entity_window(text, config.ENTITY_WINDOW_CHARS)
+    if not text_for_ner:
+        return []
+
+    key = (mode, hashlib.sha1(text_for_ner.encode("utf-8")).hexdigest())
+    cached = _entity_cache.get(key)
+    if cached is not None:
+        return list(cached)
+    extractor = _fast_entities if mode == "fast" else _nltk_entities
+    entities = _dedupe_entities(extractor(text_for_ner))
+    _entity_cache.set(key, entities)
+    return list(entities)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import threading
+import time
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+from src import config
+from src.cache import TTLCache
+from src.preprocess import clean_text
+from src.source_verifier import normalize_domain
+
+
+SIMHASH_BITS = 64
+# 64-bit SimHash split into 16-bit bands: two fingerprints within Hamming
+# distance 3 must agree exactly on at least one band (pigeonhole), so a band
+# lookup finds every near-duplicate candidate.
+BAND_BITS = 16
+BAND_COUNT = SIMHASH_BITS // BAND_BITS
+
+CacheKey = Tuple[str, str, bool]
+
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(cleaned: str) -> int:
+    words = cleaned.split()
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if not features:
+        return 0
+    weights = [0] * SIMHASH_BITS
+    for feature in features:
+        value = _hash64(feature)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _bands(signature: int) -> List[Tuple[int, int]]:
+    mask = (1 << BAND_BITS) - 1
+    return [(band, signature >> (band * BAND_BITS) & mask) for band in range(BAND_COUNT)]
+
+
+class ResultCache:
+    # Caches analysis results by the cleaned text (clean_text drops case, URLs,
+    # punctuation and whitespace differences) plus the source domain. When
+    # near-duplicate matching is on, a SimHash band index also finds cached
+    # claims within ``max_distance`` bits of the query.
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: float = 3600.0,
+        near_duplicates: bool = True,
+        max_distance: int = 3,
+    ) -> None:
+        self.near_duplicates = near_duplicates
+        self.max_distance = min(max_distance, BAND_COUNT - 1)
+        self._entries: TTLCache[Dict[str, object]] = TTLCache(maxsize=maxsize, ttl=ttl, on_evict=self._forget)
+        self._signatures: Dict[Hashable, int] = {}
+        self._bands: Dict[Tuple[int, int, str, bool], Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.near_hits = 0
+
+    @staticmethod
+    def key_for(text: str, source_url: str, full_explanation: bool = False) -> Tuple[CacheKey, str]:
+        cleaned = clean_text(text or "")
+        domain = normalize_domain(source_url) if source_url else ""
+        digest = hashlib.sha1(cleaned.encode("utf-8")).hexdigest()
+        return (digest, domain, full_explanation), cleaned
+
+    def _forget(self, key: Hashable, _value: object) -> None:
+        with self._lock:
+            signature = self._signatures.pop(key, None)
+            if signature is None:
+                return
+            _, domain, full = key
+            for band, value in _bands(signature):
+                members = self._bands.get((band, value, domain, full))
+                if members is not None:
+                    members.discard(key)
+                    if not members:
+                        del self._bands[(band, value, domain, full)]
+
+    def _near_candidates(self, key: CacheKey, signature: int) -> List[Tuple[int, Hashable]]:
+        _, domain, full = key
+        with self._lock:
+            seen: Set[Hashable] = set()
+            for band, value in _bands(signature):
+                seen.update(self._bands.get((band, value, domain, full), ()))
+            scored = [(hamming_distance(signature, self._signatures[k]), k) for k in seen if k in self._signatures]
+        return sorted(item for item in scored if item[0] <= self.max_distance)
+
+    def get(self, text: str, source_url: str, full_explanation: bool = False) -> Optional[Dict[str, object]]:
+        key, cleaned = self.key_for(text, source_url, full_explanation)
+        entry = self._entries.get(key)
+        if entry is not None:
+            return self._hit(entry, "exact", 0)
+        if not self.near_duplicates or not cleaned:
+            return None
+
+        for distance, candidate in self._near_candidates(key, simhash(cleaned)):
+            entry = self._entries.get(candidate)
+            if entry is not None:
+                with self._lock:
+                    self.near_hits += 1
+                return self._hit(entry, "near_duplicate", distance)
+        return None
+
+    @staticmethod
+    def _hit(entry: Dict[str, object], match: str, distance: int) -> Dict[str, object]:
+        result = copy.deepcopy(entry["result"])
+        result["cache"] = {
+            "hit": True,
+            "match": match,
+            "distance": distance,
+            "age_seconds": round(time.time() - float(entry["stored_at"]), 1),
+        }
+        return result
+
+    def put(self, text: str, source_url: str, result: Dict[str, object], full_explanation: bool = False) -> None:
+        key, cleaned = self.key_for(text, source_url, full_explanation)
+        stored = {"result": copy.deepcopy(result), "stored_at": time.time()}
+        self._entries.set(key, stored)
+        if not self.near_duplicates or not cleaned:
+            return
+        signature = simhash(cleaned)
+        _, domain, full = key
+        with self._lock:
+            # Evictions pop the entry before _forget takes this lock, so a key
+            # that is gone here was evicted after set() and must not be
+            # re-registered. set() may have evicted this key's old signature.
+            if key not in self._entries:
+                return
+            self._signatures[key] = signature
+            for band, value in _bands(signature):
+                self._bands.setdefault((band, value, domain, full), set()).add(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        stats = self._entries.stats()
+        stats["near_hits"] = self.near_hits
+        return stats
+
+
+result_cache = ResultCache(
+    maxsize=config.RESULT_CACHE_SIZE,
+    ttl=config.RESULT_CACHE_TTL,
+    near_duplicates=config.RESULT_CACHE_NEAR_DUPLICATES,
+    max_distance=config.RESULT_CACHE_MAX_DISTANCE,
+)
@@ -1,17 +1,100 @@
 from __future__ import annotations
 
-from typing import List, Tuple
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
+from src import config
+
 try:
     from sentence_transformers import SentenceTransformer
 except Exception:  # Optional dependency.
     SentenceTransformer = None
 
 
+TimingHook = Callable[[str, str, float], None]
+
+
+class EmbeddingModelRegistry:
+    # Process-wide cache of sentence-transformer models. Each model is loaded at
+    # most once; a failed load is remembered so requests do not retry it.
+    def __init__(self) -> None:
+        self._models: Dict[str, object] = {}
+        self._failed: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._timing_hook: Optional[TimingHook] = None
+        self.load_seconds: Dict[str, float] = {}
+
+    def set_timing_hook(self, hook: Optional[TimingHook]) -> None:
+        self._timing_hook = hook
+
+    def _report(self, stage: str, model_name: str, seconds: float) -> None:
+        if self._timing_hook is not None:
+            try:
+                self._timing_hook(stage, model_name, seconds)
+            except Exception:
+                pass
+
+    def is_loaded(self, model_name: Optional[str] = None) -> bool:
+        return (model_name or config.EMBEDDING_MODEL_NAME) in self._models
+
+    def get(self, model_name: Optional[str] = None):
+        name = model_name or config.EMBEDDING_MODEL_NAME
+        model = self._models.get(name)
+        if model is not None or SentenceTransformer is None or name in self._failed:
+            return model
+
+        with self._lock:
+            model = self._models.get(name)
+            if model is not None or name in self._failed:
+                return model
+            start = time.perf_counter()
+            try:
+                model = SentenceTransformer(name, device=config.EMBEDDING_DEVICE)
+            except Exception as exc:
+                self._failed[name] = str(exc)
+                return None
+            elapsed = time.perf_counter() - start
+            self._models[name] = model
+            self.load_seconds[name] = elapsed
+        self._report("load", name, elapsed)
+        return model
+
+    def warm(self, model_name: Optional[str] = None) -> bool:
+        return self.get(model_name) is not None
+
+    def encode(
+        self,
+        texts: Sequence[str],
+        model_name: Optional[str] = None,
+        batch_size: Optional[int] = None,
+    ) -> Optional[np.ndarray]:
+        model = self.get(model_name)
+        if model is None:
+            return None
+        start = time.perf_counter()
+        embeddings = model.encode(
+            list(texts),
+            batch_size=batch_size or config.EMBEDDING_BATCH_SIZE,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        self._report("encode", model_name or config.EMBEDDING_MODEL_NAME, time.perf_counter() - start)
+        return np.asarray(embeddings, dtype=np.float32)
+
+
+embedding_registry = EmbeddingModelRegistry()
+
+
+def warm_embedding_model(model_name: Optional[str] = None) -> bool:
+    return embedding_registry.warm(model_name)
+
+
 def tfidf_similarity_score(text: str, candidates: List[str]) -> Tuple[float, int]:
     if not text.strip() or not candidates:
         return 0.0, -1
@@ -29,8 +112,9 @@ def embedding_similarity_score(text: str, candidates: List[str]) -> Tuple[float,
         return 0.0, -1
 
     try:
-        model = SentenceTransformer("all-MiniLM-L6-v2")
-        embeddings = model.encode([text] + candidates, normalize_embeddings=True)
+        embeddings = embedding_registry.encode([text] + candidates)
+        if embeddings is None:
+            return 0.0, -1
         source = embeddings[0]
         targets = embeddings[1:]
         scores = np.dot(targets, source)
@@ -38,4 +122,3 @@ def embedding_similarity_score(text: str, candidates: List[str]) -> Tuple[float,
         return float(scores[idx]), idx
     except Exception:
         return 0.0, -1
-
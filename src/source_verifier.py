@@ -1,27 +1,16 @@
-from urllib.parse import urlparse
+from __future__ import annotations
 
-
-TRUSTED_DOMAINS = {
-    "bbc.com",
-    "reuters.com",
-    "ndtv.com",
-    "thehindu.com",
-}
+from src.domain_reputation import TRUSTED, domain_reputation, normalize_host
 
 
 def normalize_domain(url: str) -> str:
-    raw = (url or "").strip().lower()
-    if not raw:
-        return ""
-    if "://" not in raw:
-        raw = "https://" + raw
-    parsed = urlparse(raw)
-    domain = parsed.netloc.replace("www.", "")
-    return domain
+    return normalize_host(url)
+
+
+def source_reputation(url: str) -> str:
+    # "trusted", "untrusted" or "known_fake", from the domain reputation index.
+    return domain_reputation(url).status
 
 
 def is_trusted_source(url: str) -> bool:
-    domain = normalize_domain(url)
-    if not domain:
-        return False
-    return any(domain == trusted or domain.endswith("." + trusted) for trusted in TRUSTED_DOMAINS)
+    return source_reputation(url) == TRUSTED
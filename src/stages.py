@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, TypeVar
+
+from src.metrics import observe_stage
+
+
+T = TypeVar("T")
+
+STAGE_ORDER = [
+    "result_cache",
+    "preprocess",
+    "source_check",
+    "entities",
+    "portal_fetch",
+    "tfidf_similarity",
+    "embedding_similarity",
+    "ml_inference",
+    "decision",
+]
+
+
+class StageRecorder:
+    # Records which pipeline stages ran for one analysis and how long each took.
+    # Stages may finish out of order (async path), so as_list() reports them in
+    # pipeline order.
+    def __init__(self) -> None:
+        self._stages: Dict[str, Dict[str, object]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, ran: bool = True, **extra: object) -> None:
+        entry: Dict[str, object] = {"name": name, "ran": ran, "ms": round(seconds * 1000, 3)}
+        entry.update(extra)
+        with self._lock:
+            self._stages[name] = entry
+        if ran:
+            observe_stage(name, seconds)
+
+    def skip(self, name: str, reason: str) -> None:
+        self.record(name, 0.0, ran=False, reason=reason)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name: str, fn: Callable[..., T]) -> Callable[..., T]:
+        def wrapper(*args: object, **kwargs: object) -> T:
+            with self.stage(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    def merge(self, other: "StageRecorder") -> None:
+        with other._lock:
+            entries = dict(other._stages)
+        with self._lock:
+            self._stages.update(entries)
+
+    def ran(self, name: str) -> bool:
+        entry = self._stages.get(name)
+        return bool(entry and entry["ran"])
+
+    def as_list(self) -> List[Dict[str, object]]:
+        with self._lock:
+            order = {name: i for i, name in enumerate(STAGE_ORDER)}
+            return sorted(self._stages.values(), key=lambda e: order.get(str(e["name"]), len(order)))
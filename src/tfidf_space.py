@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import math
+import os
+import pickle
+import threading
+from collections import Counter, OrderedDict, deque
+from pathlib import Path
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from src import config
+from src.portal_verifier import OfficialArticle
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# The vocabulary is compacted once it holds this many terms and at least half
+# of them no longer occur in any corpus document.
+COMPACT_MIN_TERMS = 4096
+
+# (term indices, term counts) for one document; independent of the IDF weights so
+# it stays valid while the corpus statistics change.
+TermCounts = Tuple[np.ndarray, np.ndarray]
+
+
+class PortalTfidfSpace:
+    # TF-IDF space over a rolling corpus of official articles. IDF statistics are
+    # kept as document frequencies, so new articles are folded in (and the oldest
+    # evicted) without refitting, and candidate term vectors are cached by link.
+    def __init__(self, corpus_size: int = 5000, cache_size: int = 20000) -> None:
+        self.corpus_size = corpus_size
+        self.cache_size = cache_size
+        self._analyzer = TfidfVectorizer(stop_words="english").build_analyzer()
+        self.vocabulary: Dict[str, int] = {}
+        self._doc_freq = np.zeros(1024, dtype=np.float64)
+        self._corpus: Deque[Tuple[str, TermCounts]] = deque()
+        self._corpus_links: Dict[str, int] = {}
+        self._vectors: "OrderedDict[str, TermCounts]" = OrderedDict()
+        self._idf: Optional[np.ndarray] = None
+        self._lock = threading.RLock()
+        self._unsaved = 0
+        # st_mtime_ns of the file this space was last loaded from or saved to.
+        self.file_mtime_ns: Optional[int] = None
+
+    @property
+    def n_docs(self) -> int:
+        return len(self._corpus)
+
+    def _term_counts(self, text: str, grow: bool) -> Tuple[TermCounts, int]:
+        counts = Counter(self._analyzer(text or ""))
+        indices: List[int] = []
+        values: List[float] = []
+        unknown_sq = 0.0
+        for term, count in counts.items():
+            idx = self.vocabulary.get(term)
+            if idx is None and grow:
+                idx = len(self.vocabulary)
+                self.vocabulary[term] = idx
+                if idx >= len(self._doc_freq):
+                    self._doc_freq = np.concatenate([self._doc_freq, np.zeros_like(self._doc_freq)])
+            if idx is None:
+                unknown_sq += float(count) ** 2
+                continue
+            indices.append(idx)
+            values.append(float(count))
+        order = np.argsort(indices)
+        vector = (np.asarray(indices, dtype=np.int64)[order], np.asarray(values, dtype=np.float64)[order])
+        return vector, unknown_sq
+
+    def _vector_for(self, article: OfficialArticle) -> TermCounts:
+        key = article.link or article.combined_text
+        vector = self._vectors.get(key)
+        if vector is not None:
+            self._vectors.move_to_end(key)
+            return vector
+        vector, _ = self._term_counts(article.combined_text, grow=True)
+        self._vectors[key] = vector
+        while len(self._vectors) > self.cache_size:
+            self._vectors.popitem(last=False)
+        return vector
+
+    def _add_document(self, key: str, vector: TermCounts) -> None:
+        self._corpus.append((key, vector))
+        self._corpus_links[key] = self._corpus_links.get(key, 0) + 1
+        self._doc_freq[vector[0]] += 1
+        while len(self._corpus) > self.corpus_size:
+            old_key, old_vector = self._corpus.popleft()
+            self._doc_freq[old_vector[0]] -= 1
+            remaining = self._corpus_links[old_key] - 1
+            if remaining:
+                self._corpus_links[old_key] = remaining
+            else:
+                del self._corpus_links[old_key]
+
+    def fit(self, articles: Iterable[OfficialArticle]) -> "PortalTfidfSpace":
+        with self._lock:
+            self.vocabulary = {}
+            self._doc_freq = np.zeros(1024, dtype=np.float64)
+            self._corpus.clear()
+            self._corpus_links.clear()
+            self._vectors.clear()
+            self._idf = None
+            self.refresh(articles)
+        return self
+
+    def refresh(self, articles: Iterable[OfficialArticle]) -> int:
+        added = 0
+        with self._lock:
+            for article in articles:
+                key = article.link or article.combined_text
+                if not key or key in self._corpus_links:
+                    continue
+                self._add_document(key, self._vector_for(article))
+                added += 1
+            if added:
+                self._idf = None
+                self._unsaved += added
+                self._maybe_compact()
+        return added
+
+    def _maybe_compact(self) -> None:
+        # Evicted documents lower document frequencies but leave their terms in
+        # the vocabulary; without this the column space only ever grows.
+        size = len(self.vocabulary)
+        live = int(np.count_nonzero(self._doc_freq[:size]))
+        if size < COMPACT_MIN_TERMS or live * 2 > size:
+            return
+        keep = np.flatnonzero(self._doc_freq[:size])
+        remap = np.full(size, -1, dtype=np.int64)
+        remap[keep] = np.arange(len(keep), dtype=np.int64)
+        # remap is increasing, so remapped term indices stay sorted.
+        self._corpus = deque((key, (remap[idx], counts)) for key, (idx, counts) in self._corpus)
+        # Cached vectors of evicted documents may use dropped terms; they are
+        # rebuilt on demand.
+        self._vectors = OrderedDict(
+            (key, (remap[idx], counts)) for key, (idx, counts) in self._vectors.items() if key in self._corpus_links
+        )
+        self.vocabulary = {term: int(remap[idx]) for term, idx in self.vocabulary.items() if remap[idx] >= 0}
+        doc_freq = np.zeros(max(1024, 2 * len(keep)), dtype=np.float64)
+        doc_freq[: len(keep)] = self._doc_freq[keep]
+        self._doc_freq = doc_freq
+        self._idf = None
+
+    def idf(self) -> np.ndarray:
+        with self._lock:
+            if self._idf is None or len(self._idf) != len(self.vocabulary):
+                n = len(self._corpus)
+                df = self._doc_freq[: len(self.vocabulary)]
+                # Same smoothing as TfidfVectorizer(smooth_idf=True).
+                self._idf = np.log((1.0 + n) / (1.0 + df)) + 1.0
+            return self._idf
+
+    def _weighted_rows(self, vectors: Sequence[TermCounts], idf: np.ndarray) -> sparse.csr_matrix:
+        indptr = np.zeros(len(vectors) + 1, dtype=np.int64)
+        np.cumsum([len(v[0]) for v in vectors], out=indptr[1:])
+        indices = np.concatenate([v[0] for v in vectors]) if vectors else np.zeros(0, dtype=np.int64)
+        data = np.concatenate([v[1] for v in vectors]) if vectors else np.zeros(0)
+        data = data * idf[indices]
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(vectors), len(idf)))
+
+    def score(self, text: str, articles: Sequence[OfficialArticle]) -> Tuple[float, int]:
+        if not (text or "").strip() or not articles:
+            return 0.0, -1
+
+        with self._lock:
+            vectors = [self._vector_for(article) for article in articles]
+            idf = self.idf()
+            (q_idx, q_counts), unknown_sq = self._term_counts(text, grow=False)
+            n = len(self._corpus)
+
+        query_weights = q_counts * idf[q_idx]
+        # Query-only terms are absent from every candidate but still count toward
+        # the query norm, as they would in a fit over the query plus candidates.
+        unknown_idf = math.log(1.0 + n) + 1.0
+        query_norm = math.sqrt(float(np.dot(query_weights, query_weights)) + unknown_sq * unknown_idf**2)
+        if query_norm == 0.0:
+            return 0.0, -1
+
+        candidates = self._weighted_rows(vectors, idf)
+        row_norms = np.sqrt(np.asarray(candidates.multiply(candidates).sum(axis=1)).ravel())
+        dots = np.asarray(candidates[:, q_idx] @ query_weights).ravel()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(row_norms > 0, dots / (row_norms * query_norm), 0.0)
+        idx = int(np.argmax(scores))
+        return float(scores[idx]), idx
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        target = Path(path) if path else _default_path()
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            state = {
+                "corpus_size": self.corpus_size,
+                "vocabulary": self.vocabulary,
+                "doc_freq": self._doc_freq[: len(self.vocabulary)].copy(),
+                "corpus": list(self._corpus),
+            }
+            self._unsaved = 0
+        tmp_path = target.with_suffix(target.suffix + f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # The rename keeps the mtime, so this matches the published file.
+        self.file_mtime_ns = os.stat(tmp_path).st_mtime_ns
+        os.replace(tmp_path, target)
+        return target
+
+    def maybe_save(self, path: Optional[Path] = None) -> None:
+        if self._unsaved >= config.TFIDF_SAVE_EVERY:
+            try:
+                self.save(path)
+            except OSError:
+                pass
+
+    @classmethod
+    def load(cls, path: Path, cache_size: int = 20000) -> "PortalTfidfSpace":
+        with open(path, "rb") as f:
+            mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            state = pickle.load(f)
+        space = cls(corpus_size=state["corpus_size"], cache_size=cache_size)
+        space.file_mtime_ns = mtime_ns
+        space.vocabulary = state["vocabulary"]
+        space._doc_freq = np.array(state["doc_freq"], dtype=np.float64)
+        if len(space._doc_freq) == 0:
+            space._doc_freq = np.zeros(1024, dtype=np.float64)
+        for key, vector in state["corpus"]:
+            space._corpus.append((key, vector))
+            space._corpus_links[key] = space._corpus_links.get(key, 0) + 1
+            space._vectors[key] = vector
+        return space
+
+
+def _default_path() -> Path:
+    path = Path(config.TFIDF_SPACE_PATH)
+    return path if path.is_absolute() else ROOT / path
+
+
+_SPACE: Optional[PortalTfidfSpace] = None
+_SPACE_LOCK = threading.Lock()
+
+
+def _file_mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def get_tfidf_space() -> PortalTfidfSpace:
+    # Only the ingest leader folds feed articles in and saves after each pass;
+    # other processes pick up the new statistics when the file's mtime moves.
+    global _SPACE
+    path = _default_path()
+    mtime_ns = _file_mtime_ns(path)
+    if _SPACE is None or (mtime_ns is not None and mtime_ns != _SPACE.file_mtime_ns):
+        with _SPACE_LOCK:
+            if _SPACE is None or (mtime_ns is not None and mtime_ns != _SPACE.file_mtime_ns):
+                space = None
+                if mtime_ns is not None:
+                    try:
+                        space = PortalTfidfSpace.load(path, cache_size=config.TFIDF_VECTOR_CACHE_SIZE)
+                        space.corpus_size = config.TFIDF_CORPUS_SIZE
+                    except (OSError, pickle.UnpicklingError, KeyError, EOFError):
+                        space = None
+                if space is None and _SPACE is None:
+                    space = PortalTfidfSpace(
+                        corpus_size=config.TFIDF_CORPUS_SIZE,
+                        cache_size=config.TFIDF_VECTOR_CACHE_SIZE,
+                    )
+                if space is not None:
+                    _SPACE = space
+                elif mtime_ns is not None:
+                    # Unreadable file: keep the current space rather than
+                    # retrying the load on every call.
+                    _SPACE.file_mtime_ns = mtime_ns
+    return _SPACE
+
+
+def portal_tfidf_similarity(text: str, articles: Sequence[OfficialArticle]) -> Tuple[float, int]:
+    space = get_tfidf_space()
+    # Fold freshly fetched articles into the rolling corpus before scoring so a
+    # cold space still has IDF statistics for the candidates.
+    space.refresh(articles)
+    score = space.score(text, articles)
+    space.maybe_save()
+    return score
@@ -1,13 +1,19 @@
 from __future__ import annotations
+import argparse
 import pickle
+import shutil
+import time
+import zlib
+from itertools import zip_longest
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
 import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.metrics import (
     accuracy_score,
     confusion_matrix,
@@ -18,7 +24,11 @@ from sklearn.metrics import (
 from sklearn.model_selection import train_test_split
 from sklearn.naive_bayes import MultinomialNB
 
-from src.preprocess import ensure_nltk_resources, preprocess_text
+from src import config
+from src.compact_model import PARITY_TOLERANCE, CompactModelError, check_parity, export_compact_model, load_compact_model
+from src.corpus_cache import load_or_preprocess, preprocess_corpus, preprocess_pool, timed_stage
+from src.model_search import load_grid, refit_best, search_models
+from src.preprocess import ensure_nltk_resources
 
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -27,6 +37,24 @@ MODELS_DIR = ROOT / "models"
 FIGURES_DIR = ROOT / "docs" / "figures"
 
 
+LABEL_MAP = {
+    "FAKE": 0,
+    "REAL": 1,
+    "fake": 0,
+    "real": 1,
+    0: 0,
+    1: 1,
+}
+
+
+def _combine_title_text(df: pd.DataFrame) -> pd.Series:
+    text_col = "text" if "text" in df.columns else df.columns[0]
+    title_col = "title" if "title" in df.columns else None
+    if title_col:
+        return (df[title_col].fillna("") + " " + df[text_col].fillna("")).str.strip()
+    return df[text_col].fillna("")
+
+
 def load_dataset() -> pd.DataFrame:
     fake_path = DATA_DIR / "Fake.csv"
     true_path = DATA_DIR / "True.csv"
@@ -38,12 +66,7 @@ def load_dataset() -> pd.DataFrame:
         fake_df["label"] = 0
         true_df["label"] = 1
         df = pd.concat([fake_df, true_df], ignore_index=True)
-        text_col = "text" if "text" in df.columns else df.columns[0]
-        title_col = "title" if "title" in df.columns else None
-        if title_col:
-            df["combined_text"] = (df[title_col].fillna("") + " " + df[text_col].fillna("")).str.strip()
-        else:
-            df["combined_text"] = df[text_col].fillna("")
+        df["combined_text"] = _combine_title_text(df)
         df = df[["combined_text", "label"]].rename(columns={"combined_text": "text"})
         return df.dropna()
 
@@ -51,16 +74,7 @@ def load_dataset() -> pd.DataFrame:
         df = pd.read_csv(sample_path)
         if "text" not in df.columns or "label" not in df.columns:
             raise ValueError("sample_fake_news.csv must contain 'text' and 'label' columns.")
-        df["label"] = df["label"].map(
-            {
-                "FAKE": 0,
-                "REAL": 1,
-                "fake": 0,
-                "real": 1,
-                0: 0,
-                1: 1,
-            }
-        )
+        df["label"] = df["label"].map(LABEL_MAP)
         return df[["text", "label"]].dropna()
 
     raise FileNotFoundError(
@@ -69,6 +83,51 @@ def load_dataset() -> pd.DataFrame:
     )
 
 
+def _labeled_chunks(path: Path, chunk_size: int, label: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    # With a fixed label (Fake.csv / True.csv) the whole file is one class;
+    # otherwise the file needs its own 'label' column.
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        if label is None:
+            if "label" not in chunk.columns:
+                raise ValueError(f"{path} must contain a 'label' column.")
+            labels = chunk["label"].map(LABEL_MAP)
+        else:
+            labels = pd.Series(label, index=chunk.index)
+        out = pd.DataFrame({"text": _combine_title_text(chunk), "label": labels}).dropna()
+        if not out.empty:
+            out["label"] = out["label"].astype(int)
+            yield out
+
+
+def iter_dataset_chunks(chunk_size: int, paths: Optional[Sequence[Path]] = None) -> Iterator[pd.DataFrame]:
+    # Streams the dataset without loading it whole. Fake.csv and True.csv are
+    # read in alternation so every partial_fit step sees both classes.
+    if paths:
+        for path in paths:
+            yield from _labeled_chunks(Path(path), chunk_size)
+        return
+
+    fake_path = DATA_DIR / "Fake.csv"
+    true_path = DATA_DIR / "True.csv"
+    if fake_path.exists() and true_path.exists():
+        fake_chunks = _labeled_chunks(fake_path, max(1, chunk_size // 2), label=0)
+        true_chunks = _labeled_chunks(true_path, max(1, chunk_size // 2), label=1)
+        for fake_chunk, true_chunk in zip_longest(fake_chunks, true_chunks):
+            parts = [part for part in (fake_chunk, true_chunk) if part is not None]
+            yield pd.concat(parts, ignore_index=True)
+        return
+
+    sample_path = DATA_DIR / "sample_fake_news.csv"
+    if sample_path.exists():
+        yield from _labeled_chunks(sample_path, chunk_size)
+        return
+
+    raise FileNotFoundError(
+        "Dataset not found. Add Kaggle files data/Fake.csv and data/True.csv "
+        "or use data/sample_fake_news.csv."
+    )
+
+
 def run_eda(df: pd.DataFrame) -> None:
     FIGURES_DIR.mkdir(parents=True, exist_ok=True)
     sns.set_style("whitegrid")
@@ -115,10 +174,14 @@ def save_confusion_matrix(y_true, y_pred, model_key: str) -> None:
     plt.close()
 
 
-def train_and_compare(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, object]]:
+def train_and_compare(
+    df: pd.DataFrame, use_cache: bool = True, workers: Optional[int] = None
+) -> Tuple[pd.DataFrame, Dict[str, object]]:
     df = df.copy()
-    print("Preprocessing text. This can take a few minutes on full Kaggle data...")
-    df["processed_text"] = df["text"].astype(str).apply(preprocess_text)
+    with timed_stage("preprocess"):
+        df["processed_text"] = load_or_preprocess(
+            df["text"].astype(str).tolist(), use_cache=use_cache, workers=workers
+        )
 
     X_train, X_test, y_train, y_test = train_test_split(
         df["processed_text"], df["label"], test_size=0.2, random_state=42, stratify=df["label"]
@@ -135,15 +198,23 @@ def train_and_compare(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, object]
     best_bundle: Dict[str, object] = {}
     best_f1 = -1.0
 
-    X_train_vec = vectorizer.fit_transform(X_train)
-    X_test_vec = vectorizer.transform(X_test)
+    with timed_stage("vectorize"):
+        X_train_vec = vectorizer.fit_transform(X_train)
+        X_test_vec = vectorizer.transform(X_test)
 
     for model_name, model in models.items():
-        model.fit(X_train_vec, y_train)
+        with timed_stage(f"fit {model_name}"):
+            start = time.perf_counter()
+            model.fit(X_train_vec, y_train)
+            fit_seconds = time.perf_counter() - start
+        start = time.perf_counter()
         preds = model.predict(X_test_vec)
+        predict_seconds = time.perf_counter() - start
         model_key = f"tfidf_{model_name}"
         metrics = evaluate_model(y_test, preds)
-        metrics.update({"vectorizer": "tfidf", "model": model_name})
+        metrics.update(
+            {"fit_seconds": fit_seconds, "predict_seconds": predict_seconds, "vectorizer": "tfidf", "model": model_name}
+        )
         results.append(metrics)
         save_confusion_matrix(y_test, preds, model_key)
 
@@ -169,23 +240,261 @@ def train_and_compare(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, object]
     return results_df, best_bundle
 
 
-def main() -> None:
+def search_and_train(
+    df: pd.DataFrame,
+    use_cache: bool = True,
+    workers: Optional[int] = None,
+    grid_path: Optional[Path] = None,
+    folds: Optional[int] = None,
+) -> Tuple[pd.DataFrame, Dict[str, object]]:
+    # k-fold CV over the configured grid, then the best setting is refit on all rows.
+    with timed_stage("preprocess"):
+        processed = load_or_preprocess(df["text"].astype(str).tolist(), use_cache=use_cache, workers=workers)
+    labels = df["label"].astype(int).to_numpy()
+
+    with timed_stage("search"):
+        results_df, best, oof_preds = search_models(
+            processed, labels, load_grid(grid_path), n_folds=folds, workers=workers, use_cache=use_cache
+        )
+    save_confusion_matrix(labels, oof_preds, f"{best['vectorizer_name']}_{best['model_name']}_cv")
+    for row in results_df.head(10).itertuples(index=False):
+        print(
+            f"{row.vectorizer}({row.vectorizer_params}) + {row.model}({row.model_params}): "
+            f"f1={row.f1_score:.4f}±{row.f1_std:.4f}, fit={row.fit_seconds:.3f}s, "
+            f"latency={row.latency_ms_per_1k:.1f}ms/1k{' *' if row.pareto else ''}"
+        )
+
+    with timed_stage("refit best"):
+        best_bundle = refit_best(processed, labels, best)
+    return results_df, best_bundle
+
+
+def make_hashing_vectorizer() -> HashingVectorizer:
+    # Stateless, so chunks can be vectorized independently and new data needs no
+    # refit. alternate_sign=False keeps features non-negative for MultinomialNB.
+    return HashingVectorizer(
+        n_features=2**config.TRAIN_HASH_FEATURES_LOG2,
+        ngram_range=(1, 2),
+        alternate_sign=False,
+        norm="l2",
+    )
+
+
+def make_streaming_models() -> Dict[str, object]:
+    return {
+        "sgd_logistic_regression": SGDClassifier(loss="log_loss", alpha=1e-5, random_state=42),
+        "naive_bayes": MultinomialNB(alpha=0.01),
+    }
+
+
+def _is_holdout(text: str, holdout_mod: int = 5) -> bool:
+    # Deterministic 20% split by content hash, so reruns and updates agree on it.
+    return zlib.crc32(text.encode("utf-8")) % holdout_mod == 0
+
+
+def _stream_fit(
+    models: Dict[str, object],
+    vectorizer: HashingVectorizer,
+    chunks: Iterator[pd.DataFrame],
+    holdout_limit: int,
+    workers: Optional[int] = None,
+) -> Tuple[Optional[sp.csr_matrix], List[int], int]:
+    # Only one chunk plus a capped holdout matrix is held in memory at a time.
+    classes = [0, 1]
+    holdout_X: List[sp.csr_matrix] = []
+    holdout_y: List[int] = []
+    trained = 0
+    # One preprocessing pool for the whole stream, not one per chunk.
+    with preprocess_pool(workers) as pool:
+        for chunk_no, chunk in enumerate(chunks, start=1):
+            texts = chunk["text"].astype(str).tolist()
+            # Split each stream chunk across every pool process.
+            split = min(config.TRAIN_CHUNK_SIZE, -(-len(texts) // (workers or config.TRAIN_WORKERS)))
+            processed = preprocess_corpus(texts, workers=workers, chunk_size=split, executor=pool)
+            X = vectorizer.transform(processed)
+            labels = chunk["label"].to_numpy()
+            holdout = [_is_holdout(text) for text in texts]
+            train_rows = [i for i, flag in enumerate(holdout) if not flag]
+            test_rows = [i for i, flag in enumerate(holdout) if flag]
+            room = holdout_limit - len(holdout_y)
+            if room < len(test_rows):
+                train_rows.extend(test_rows[max(room, 0) :])
+                test_rows = test_rows[: max(room, 0)]
+            if test_rows:
+                holdout_X.append(X[test_rows])
+                holdout_y.extend(int(label) for label in labels[test_rows])
+            if train_rows:
+                for model in models.values():
+                    model.partial_fit(X[train_rows], labels[train_rows], classes=classes)
+                trained += len(train_rows)
+            print(f"  chunk {chunk_no}: trained on {trained} rows, holdout {len(holdout_y)}", flush=True)
+    X_test = sp.vstack(holdout_X).tocsr() if holdout_X else None
+    return X_test, holdout_y, trained
+
+
+def _evaluate_streaming(
+    models: Dict[str, object], vectorizer: HashingVectorizer, X_test, y_test: List[int]
+) -> Tuple[pd.DataFrame, Dict[str, object]]:
+    results = []
+    best_bundle: Dict[str, object] = {}
+    best_f1 = -1.0
+    for model_name, model in models.items():
+        model_key = f"hashing_{model_name}"
+        if X_test is not None and y_test:
+            preds = model.predict(X_test)
+            metrics = evaluate_model(y_test, preds)
+            save_confusion_matrix(y_test, preds, model_key)
+        else:
+            metrics = {"accuracy": 0.0, "precision": 0.0, "recall": 0.0, "f1_score": 0.0}
+        metrics.update({"vectorizer": "hashing", "model": model_name})
+        results.append(metrics)
+        if metrics["f1_score"] > best_f1:
+            best_f1 = metrics["f1_score"]
+            best_bundle = {
+                "vectorizer_name": "hashing",
+                "model_name": model_name,
+                "vectorizer": vectorizer,
+                "model": model,
+                "label_map": {0: "Fake", 1: "Real"},
+                # Every partial_fit model is kept so --update can continue all of them.
+                "streaming_models": models,
+            }
+        print(
+            f"{model_key}: "
+            f"acc={metrics['accuracy']:.4f}, "
+            f"precision={metrics['precision']:.4f}, "
+            f"recall={metrics['recall']:.4f}, "
+            f"f1={metrics['f1_score']:.4f}"
+        )
+    results_df = pd.DataFrame(results).sort_values(by="f1_score", ascending=False)
+    return results_df, best_bundle
+
+
+def train_streaming(
+    chunk_size: Optional[int] = None,
+    paths: Optional[Sequence[Path]] = None,
+    bundle: Optional[Dict[str, object]] = None,
+    workers: Optional[int] = None,
+) -> Tuple[pd.DataFrame, Dict[str, object]]:
+    # Out-of-core training. Passing an existing streaming bundle continues its
+    # models on the new data instead of starting from scratch.
+    chunk_size = chunk_size or config.TRAIN_STREAM_CHUNK_SIZE
+    if bundle is not None:
+        if "streaming_models" not in bundle:
+            raise ValueError("Only bundles produced by streaming training can be updated incrementally.")
+        vectorizer = bundle["vectorizer"]
+        models = bundle["streaming_models"]
+    else:
+        vectorizer = make_hashing_vectorizer()
+        models = make_streaming_models()
+
+    with timed_stage("stream fit"):
+        X_test, y_test, trained = _stream_fit(
+            models, vectorizer, iter_dataset_chunks(chunk_size, paths), config.TRAIN_STREAM_HOLDOUT_MAX, workers
+        )
+    if not trained:
+        raise ValueError("No labeled rows found to train on.")
+    with timed_stage("evaluate"):
+        return _evaluate_streaming(models, vectorizer, X_test, y_test)
+
+
+def parity_texts(
+    paths: Optional[Sequence[Path]] = None, limit: int = 2000, workers: Optional[int] = None
+) -> List[str]:
+    # Preprocessed rows of the deterministic hash holdout (all rows when the
+    # dataset is too small to have one), for checking the compact export.
+    holdout: List[str] = []
+    fallback: List[str] = []
+    for chunk in iter_dataset_chunks(config.TRAIN_STREAM_CHUNK_SIZE, paths):
+        for text in chunk["text"].astype(str):
+            (holdout if _is_holdout(text) else fallback).append(text)
+        if len(holdout) >= limit:
+            break
+    return preprocess_corpus((holdout or fallback)[:limit], workers=workers)
+
+
+def export_and_check(bundle: Dict[str, object], out_dir: Path, texts: Sequence[str]) -> None:
+    # A compact export that does not predict exactly like the bundle it came
+    # from is removed, so model_loader falls back to the pickle.
+    try:
+        export_compact_model(bundle, out_dir)
+    except CompactModelError as exc:
+        print(f"Compact export skipped: {exc}")
+        return
+    try:
+        diff = check_parity(bundle, load_compact_model(out_dir), texts)
+        if diff > PARITY_TOLERANCE:
+            raise CompactModelError(f"probability difference {diff:.3e} exceeds {PARITY_TOLERANCE:.1e}")
+    except CompactModelError as exc:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        raise SystemExit(f"Compact model failed the parity check and was removed: {exc}")
+    print(f"Saved compact model: {out_dir} (parity on {len(texts)} held-out texts, max |dp| = {diff:.3e})")
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Train and compare fake news classifiers.")
+    parser.add_argument(
+        "--mode",
+        choices=["batch", "stream", "search"],
+        default="batch",
+        help=(
+            "batch: TF-IDF on the full corpus in memory; stream: chunked HashingVectorizer + partial_fit; "
+            "search: k-fold CV over a grid of vectorizer and model settings"
+        ),
+    )
+    parser.add_argument("--folds", type=int, default=None, help="Cross-validation folds in search mode")
+    parser.add_argument("--grid", type=Path, default=None, help="JSON search grid (default: FND_TRAIN_SEARCH_GRID)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Rows per chunk in stream mode")
+    parser.add_argument("--workers", type=int, default=None, help="Preprocessing and search processes")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore the preprocessed-corpus and feature caches")
+    parser.add_argument(
+        "--update",
+        nargs="+",
+        type=Path,
+        metavar="CSV",
+        help="Continue training the saved streaming model on new labeled CSVs (text/title + label columns)",
+    )
+    parser.add_argument("--skip-eda", action="store_true", help="Do not render EDA plots")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
     MODELS_DIR.mkdir(parents=True, exist_ok=True)
     FIGURES_DIR.mkdir(parents=True, exist_ok=True)
     ensure_nltk_resources()
 
-    df = load_dataset()
-    print(f"Loaded dataset shape: {df.shape}")
-    run_eda(df)
-    print(f"EDA plots saved to: {FIGURES_DIR}")
+    best_path = MODELS_DIR / "best_model.pkl"
+    if args.update:
+        with open(best_path, "rb") as f:
+            bundle = pickle.load(f)
+        results_df, best_bundle = train_streaming(args.chunk_size, args.update, bundle=bundle, workers=args.workers)
+    elif args.mode == "stream":
+        results_df, best_bundle = train_streaming(args.chunk_size, workers=args.workers)
+    else:
+        with timed_stage("load"):
+            df = load_dataset()
+        print(f"Loaded dataset shape: {df.shape}")
+        if not args.skip_eda:
+            with timed_stage("eda"):
+                run_eda(df)
+            print(f"EDA plots saved to: {FIGURES_DIR}")
+        if args.mode == "search":
+            results_df, best_bundle = search_and_train(
+                df, use_cache=not args.no_cache, workers=args.workers, grid_path=args.grid, folds=args.folds
+            )
+        else:
+            results_df, best_bundle = train_and_compare(df, use_cache=not args.no_cache, workers=args.workers)
 
-    results_df, best_bundle = train_and_compare(df)
     results_path = MODELS_DIR / "model_comparison.csv"
     results_df.to_csv(results_path, index=False)
 
-    best_path = MODELS_DIR / "best_model.pkl"
     with open(best_path, "wb") as f:
         pickle.dump(best_bundle, f)
+    with timed_stage("compact export"):
+        export_and_check(
+            best_bundle, ROOT / config.COMPACT_MODEL_DIR, parity_texts(args.update, workers=args.workers)
+        )
 
     print("\nModel comparison (top 6):")
     print(results_df.head(6).to_string(index=False))
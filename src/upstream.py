@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: the breaker state stays per process.
+    fcntl = None
+
+
+CLOSED, OPEN, HALF_OPEN = 0, 1, 2
+STATE_NAMES = {CLOSED: "closed", OPEN: "open", HALF_OPEN: "half_open"}
+
+# state, consecutive failures, opened_at, probe_started_at, opens since start
+_LAYOUT = struct.Struct("<iiddq")
+
+
+class CircuitBreaker:
+    # Closed: calls go through, and `failure_threshold` consecutive failures
+    # open the breaker. Open: calls are refused until `cooldown` seconds have
+    # passed, then a single probe is let through (half-open). The probe's
+    # success closes the breaker and its failure opens it again.
+    #
+    # With a state path the state lives in a small memory-mapped file that
+    # every gunicorn worker maps, so failures seen by one worker stop the
+    # others from queueing on a dead upstream. Updates hold an flock on the
+    # file; without a path (or without fcntl) the state is per process.
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        cooldown: float,
+        state_path: Optional[Path] = None,
+        probe_timeout: float = 10.0,
+        enabled: bool = True,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state_path = state_path
+        self.probe_timeout = probe_timeout
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._pid = 0
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+
+    def _mapping(self) -> mmap.mmap:
+        # Opened again in each process: flock is tied to the open file, which
+        # a forked child would otherwise share with its parent.
+        if self._map is not None and self._pid == os.getpid():
+            return self._map
+        if self.state_path is not None and fcntl is not None:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(fd).st_size < _LAYOUT.size:
+                os.ftruncate(fd, _LAYOUT.size)
+            self._fd = fd
+            self._map = mmap.mmap(fd, _LAYOUT.size)
+        else:
+            self._fd = None
+            self._map = mmap.mmap(-1, _LAYOUT.size)
+        self._pid = os.getpid()
+        return self._map
+
+    @contextmanager
+    def _state(self) -> Iterator[List[object]]:
+        with self._lock:
+            mapping = self._mapping()
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                values = list(_LAYOUT.unpack_from(mapping, 0))
+                yield values
+                _LAYOUT.pack_into(mapping, 0, *values)
+            finally:
+                if self._fd is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def allow(self) -> bool:
+        if not self.enabled:
+            return True
+        now = time.time()
+        with self._state() as s:
+            if s[0] == CLOSED:
+                return True
+            if s[0] == OPEN:
+                if now - s[2] < self.cooldown:
+                    return False
+                s[0], s[3] = HALF_OPEN, now
+                return True
+            # Half-open: one probe at a time; a probe that never reported
+            # back (its worker died) is presumed lost after probe_timeout.
+            if now - s[3] < self.probe_timeout:
+                return False
+            s[3] = now
+            return True
+
+    def record_success(self) -> None:
+        if not self.enabled:
+            return
+        with self._state() as s:
+            s[0], s[1] = CLOSED, 0
+
+    def record_failure(self) -> None:
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._state() as s:
+            s[1] += 1
+            if s[0] == HALF_OPEN or (s[0] == CLOSED and s[1] >= self.failure_threshold):
+                s[0], s[2] = OPEN, now
+                s[4] += 1
+
+    def is_open(self) -> bool:
+        # True while calls are being refused; does not start a probe.
+        if not self.enabled:
+            return False
+        with self._state() as s:
+            return s[0] == OPEN and time.time() - s[2] < self.cooldown
+
+    def reset(self) -> None:
+        with self._state() as s:
+            s[:] = [CLOSED, 0, 0.0, 0.0, 0]
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._state() as s:
+            state, failures, opened_at, _, opens = s
+        retry_in = max(0.0, opened_at + self.cooldown - time.time()) if state == OPEN else 0.0
+        return {
+            "state": STATE_NAMES[state] if self.enabled else "disabled",
+            "state_code": state,
+            "consecutive_failures": failures,
+            "opened_at": opened_at or None,
+            "retry_in_seconds": round(retry_in, 3),
+            "opens_total": opens,
+            "shared": self._fd is not None,
+        }
+
+
+class LatencyTracker:
+    # Recent upstream latencies of this process, in seconds. Timeouts are
+    # recorded at the timeout value, so when the upstream slows down the
+    # percentiles, and the timeouts derived from them, climb back up.
+    def __init__(self, window: int, min_samples: int) -> None:
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        # None until enough samples have been seen to trust the estimate.
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+    def __len__(self) -> int:
+        return len(self._samples)
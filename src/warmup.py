@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from src import config
+from src.domain_reputation import domain_index
+from src.history_db import close_connection, init_db
+from src.ingest import start_background_ingester
+from src.model_loader import load_model
+from src.preprocess import ensure_nltk_resources, get_analyzer
+from src.similarity import embedding_registry
+from src.tfidf_space import get_tfidf_space
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Set by gunicorn.conf.py: the worker phase then runs in post_worker_init
+# instead of at import time, so nothing thread- or fork-unsafe is created in
+# the preloading master.
+DEFER_WORKER_WARMUP_ENV = "FND_DEFER_WORKER_WARMUP"
+
+
+@dataclass
+class ComponentStatus:
+    phase: str
+    required: bool
+    seconds: float = 0.0
+    ok: bool = False
+    error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, object]:
+        payload: Dict[str, object] = {
+            "phase": self.phase,
+            "ok": self.ok,
+            "required": self.required,
+            "seconds": round(self.seconds, 4),
+        }
+        if self.error:
+            payload["error"] = self.error
+        return payload
+
+
+class StartupState:
+    # Startup happens in two phases. "shared" loads everything that is safe to
+    # inherit through fork (NLTK corpora, model, DB schema, TF-IDF space) and
+    # runs once in the gunicorn master when preload_app is on. "worker" starts
+    # per-process resources (embedding model, ingester thread) after the fork.
+    def __init__(self) -> None:
+        self.components: Dict[str, ComponentStatus] = {}
+        self.phases_done: List[str] = []
+        self._lock = threading.Lock()
+
+    def run(self, name: str, phase: str, fn: Callable[[], T], required: bool = True) -> Optional[T]:
+        status = ComponentStatus(phase=phase, required=required)
+        start = time.perf_counter()
+        try:
+            value = fn()
+            status.ok = value is not False
+            if not status.ok:
+                status.error = "unavailable"
+            return value
+        except Exception as exc:
+            status.error = f"{type(exc).__name__}: {exc}"
+            logger.exception("Warm-up of %s failed", name)
+            return None
+        finally:
+            status.seconds = time.perf_counter() - start
+            with self._lock:
+                self.components[name] = status
+
+    def finish_phase(self, phase: str) -> None:
+        with self._lock:
+            if phase not in self.phases_done:
+                self.phases_done.append(phase)
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            phases_ok = "shared" in self.phases_done and "worker" in self.phases_done
+            return phases_ok and all(s.ok for s in self.components.values() if s.required)
+
+    def as_dict(self) -> Dict[str, object]:
+        with self._lock:
+            components = {name: status.as_dict() for name, status in self.components.items()}
+            phases = list(self.phases_done)
+        return {
+            "ready": self.ready,
+            "pid": os.getpid(),
+            "phases_done": phases,
+            "startup_seconds": round(sum(c["seconds"] for c in components.values()), 4),
+            "components": components,
+        }
+
+
+startup_state = StartupState()
+
+
+def _warm_nltk() -> bool:
+    ensure_nltk_resources()
+    get_analyzer()
+    return True
+
+
+def _warm_db() -> bool:
+    init_db()
+    # SQLite connections must not cross fork; workers open their own.
+    close_connection()
+    return True
+
+
+def warm_shared() -> Optional[Dict[str, object]]:
+    # Returns the model bundle (None when it could not be loaded).
+    startup_state.run("nltk", "shared", _warm_nltk)
+    bundle = startup_state.run("model", "shared", load_model)
+    startup_state.run("history_db", "shared", _warm_db)
+    startup_state.run("tfidf_space", "shared", get_tfidf_space, required=False)
+    # Built or mapped here so forked workers inherit one shared mapping.
+    startup_state.run("domain_reputation", "shared", domain_index().stats, required=False)
+    startup_state.finish_phase("shared")
+    return bundle
+
+
+def warm_worker() -> None:
+    # The embedding model is loaded per worker: torch thread pools do not
+    # survive fork, so it cannot be shared from the master.
+    if config.WARM_EMBEDDING_MODEL:
+        startup_state.run("embedding_model", "worker", embedding_registry.warm, required=False)
+    if config.INGEST_ENABLED:
+        startup_state.run("ingester", "worker", start_background_ingester, required=False)
+    startup_state.finish_phase("worker")
+
+
+def worker_warmup_deferred() -> bool:
+    return os.environ.get(DEFER_WORKER_WARMUP_ENV, "") == "1"
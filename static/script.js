@@ -12,6 +12,8 @@ const nextPageBtn = document.getElementById("nextPageBtn");
 const pageInfo = document.getElementById("pageInfo");
 
 let currentPage = 1;
+// pageCursors[n - 1] is the keyset cursor that loads page n.
+let pageCursors = [null];
 const pageSize = 10;
 let currentFilter = "";
 
@@ -57,10 +59,12 @@ function renderHistory(items) {
 }
 
 async function loadHistory(page = 1) {
+  if (page === 1) pageCursors = [null];
   const params = new URLSearchParams({
     page: String(page),
     limit: String(pageSize),
   });
+  if (pageCursors[page - 1]) params.set("cursor", pageCursors[page - 1]);
   if (currentFilter) params.set("result", currentFilter);
 
   const response = await fetch(`/history?${params.toString()}`);
@@ -69,7 +73,8 @@ async function loadHistory(page = 1) {
   currentPage = data.page || page;
   pageInfo.textContent = `Page ${currentPage}`;
   prevPageBtn.disabled = currentPage <= 1;
-  nextPageBtn.disabled = !(data.items && data.items.length === pageSize);
+  pageCursors[currentPage] = data.next_cursor || null;
+  nextPageBtn.disabled = !data.next_cursor;
 }
 
 checkBtn.addEventListener("click", async () => {